@@ -1,21 +1,113 @@
+import ast
+import importlib
+import importlib.util
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type
+from logger import info_logger, warning_logger
 
-from typing import Dict, Type
-from base_agent import BaseAgent
+if TYPE_CHECKING:
+    from base_agent import BaseAgent
 
 class AgentRegistry:
-    _agents: Dict[str, Type[BaseAgent]] = {}
+    _agents: Dict[str, Type["BaseAgent"]] = {}
+    _metadata: Dict[str, Dict[str, Any]] = {}
+    # Agents known by module path only; imported on first use
+    _declared: Dict[str, Tuple[str, str]] = {}
+    _import_times: Dict[str, float] = {}
+    _import_lock = threading.Lock()
 
     @classmethod
-    def register(cls, agent_class: Type[BaseAgent]) -> None:
+    def register(cls, agent_class: Type["BaseAgent"]) -> None:
         """Register a new agent class"""
         cls._agents[agent_class.__name__] = agent_class
-        
+        cls._metadata[agent_class.__name__] = agent_class.get_class_metadata()
+
+    @classmethod
+    def declare(cls, agent_name: str, module_path: str) -> None:
+        """Declare an agent without importing its module.
+
+        The module is imported the first time the agent class is requested,
+        so heavy dependencies are only loaded by agents that actually run.
+        Until then its metadata is read from the class's name and
+        description attributes in the module source.
+        """
+        cls._declared[agent_name] = (module_path, agent_name)
+
+    @staticmethod
+    def _source_metadata(module_path: str, class_name: str) -> Dict[str, Any]:
+        """Metadata from string class attributes in a module's source, without running it"""
+        attributes: Dict[str, str] = {}
+        try:
+            spec = importlib.util.find_spec(module_path)
+            with open(spec.origin, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=spec.origin)
+        except (AttributeError, ImportError, OSError, SyntaxError, TypeError) as e:
+            warning_logger.warning(f"Could not read metadata of {module_path}.{class_name}: {str(e)}")
+            tree = ast.Module(body=[], type_ignores=[])
+        for node in tree.body:
+            if not (isinstance(node, ast.ClassDef) and node.name == class_name):
+                continue
+            for statement in node.body:
+                if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+                    target = statement.targets[0]
+                elif isinstance(statement, ast.AnnAssign):
+                    target = statement.target
+                else:
+                    continue
+                value = statement.value
+                if isinstance(target, ast.Name) and isinstance(value, ast.Constant) and isinstance(value.value, str):
+                    attributes[target.id] = value.value
+        # Same fields as BaseAgent.get_class_metadata
+        return {
+            "name": attributes.get("name") or class_name,
+            "description": attributes.get("description", ""),
+            "type": class_name
+        }
+
     @classmethod
-    def get_agent(cls, agent_name: str) -> Type[BaseAgent]:
-        """Get agent class by name"""
+    def get_agent(cls, agent_name: str) -> Optional[Type["BaseAgent"]]:
+        """Get agent class by name, importing its module if it was only declared"""
+        agent_class = cls._agents.get(agent_name)
+        if agent_class is not None or agent_name not in cls._declared:
+            return agent_class
+
+        with cls._import_lock:
+            if agent_name not in cls._agents:
+                module_path, class_name = cls._declared[agent_name]
+                started = time.perf_counter()
+                module = importlib.import_module(module_path)
+                cls._import_times[agent_name] = time.perf_counter() - started
+                info_logger.info(f"Imported {module_path} in {cls._import_times[agent_name]:.2f}s")
+                if agent_name not in cls._agents:
+                    cls.register(getattr(module, class_name))
         return cls._agents.get(agent_name)
     
     @classmethod
-    def get_all_agents(cls) -> Dict[str, Type[BaseAgent]]:
-        """Get all registered agents"""
-        return cls._agents
\ No newline at end of file
+    def get_all_agents(cls) -> Dict[str, Type["BaseAgent"]]:
+        """Get the agents whose modules are loaded; declared ones load through get_agent"""
+        return dict(cls._agents)
+
+    @classmethod
+    def get_metadata(cls, agent_name: str) -> Optional[Dict[str, Any]]:
+        """Get agent metadata by name, without importing declared agents"""
+        metadata = cls._metadata.get(agent_name)
+        if metadata is None and agent_name in cls._declared:
+            module_path, class_name = cls._declared[agent_name]
+            metadata = cls._metadata.setdefault(agent_name, cls._source_metadata(module_path, class_name))
+        return metadata
+
+    @classmethod
+    def get_all_metadata(cls) -> Dict[str, Dict[str, Any]]:
+        """Get metadata for all registered and declared agents"""
+        for agent_name in list(cls._declared):
+            cls.get_metadata(agent_name)
+        return cls._metadata
+
+    @classmethod
+    def get_import_times(cls) -> Dict[str, Any]:
+        """Seconds spent importing each lazily loaded agent, and which are still pending"""
+        return {
+            "imported": dict(cls._import_times),
+            "pending": [name for name in cls._declared if name not in cls._agents]
+        }
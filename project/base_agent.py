@@ -1,34 +1,34 @@
-import yaml
 import jsonschema
 from typing import Any, Dict, Optional
 from abc import ABC, abstractmethod
 from langchain_core.callbacks import CallbackManager  # Updated import path
+from schema_registry import schema_registry
 from logger import debug_logger, info_logger, warning_logger, error_logger
 
 class BaseAgent(ABC):
     """Base class for all agents and tools"""
+
+    # Class-level metadata, readable without instantiating the agent
+    name: str = ""
+    description: str = ""
     
     def __init__(
         self,
-        name: str,
-        description: str,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
         callback_manager: Optional[CallbackManager] = None,  # Fixed bracket syntax here
         **kwargs
     ):
-        self.name = name
-        self.description = description
+        self.name = name or self.name
+        self.description = description or self.description
         self.callback_manager = callback_manager
         self.kwargs = kwargs
         info_logger.info(f"Initialized {self.name} agent")
         self._load_schema()
 
     def _load_schema(self):
-        """Load schema for this agent"""
-        with open('schema.yml', 'r') as f:
-            schemas = yaml.safe_load(f)
-            agent_schema = schemas['schemas'].get(self.__class__.__name__, {})
-            self.input_schema = agent_schema.get('input', {})
-            self.output_schema = agent_schema.get('output', {})
+        """Load schema for this agent from the shared registry"""
+        self.input_schema, self.output_schema = schema_registry.get_schemas(self.__class__.__name__)
 
     @abstractmethod
     def run(self, *args, **kwargs) -> Any:
@@ -38,7 +38,7 @@ class BaseAgent(ABC):
     def validate_inputs(self, input_data: Dict) -> bool:
         """Validate input data against schema"""
         try:
-            jsonschema.validate(instance=input_data, schema=self.input_schema)
+            schema_registry.validate(self.__class__.__name__, 'input', input_data)
             return True
         except jsonschema.exceptions.ValidationError as e:
             error_logger.error(f"Input validation error: {str(e)}")
@@ -47,7 +47,7 @@ class BaseAgent(ABC):
     def validate_output(self, output_data: Dict) -> bool:
         """Validate output data against schema"""
         try:
-            jsonschema.validate(instance=output_data, schema=self.output_schema)
+            schema_registry.validate(self.__class__.__name__, 'output', output_data)
             return True
         except jsonschema.exceptions.ValidationError as e:
             error_logger.error(f"Output validation error: {str(e)}")
@@ -67,4 +67,13 @@ class BaseAgent(ABC):
             "name": self.name,
             "description": self.description,
             "type": self.__class__.__name__
+        }
+
+    @classmethod
+    def get_class_metadata(cls) -> Dict[str, Any]:
+        """Get agent metadata without creating an instance"""
+        return {
+            "name": cls.name or cls.__name__,
+            "description": cls.description,
+            "type": cls.__name__
         }
\ No newline at end of file
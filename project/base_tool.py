@@ -1,45 +1,58 @@
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
-import yaml
+from typing import Any, Dict, Optional, Tuple
 import jsonschema
+from schema_registry import schema_registry
 from logger import debug_logger, info_logger, error_logger
 
 class BaseTool(ABC):
+    # Class-level metadata, readable without instantiating the tool
+    name: str = ""
+    description: str = ""
+    # Input fields that may arrive as raw bytes (memoryview) instead of base64 strings
+    binary_fields: Tuple[str, ...] = ()
+
     def __init__(
         self,
-        name: str,
-        description: str,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
         **kwargs
     ):
-        self.name = name
-        self.description = description
+        self.name = name or self.name
+        self.description = description or self.description
         self.kwargs = kwargs
         info_logger.info(f"Initialized {self.name} tool")
         self._load_schema()
 
     def _load_schema(self):
-        with open('schema.yml', 'r') as f:
-            schemas = yaml.safe_load(f)
-            tool_schema = schemas['schemas'].get(self.__class__.__name__, {})
-            self.input_schema = tool_schema.get('input', {})
-            self.output_schema = tool_schema.get('output', {})
+        self.input_schema, self.output_schema = schema_registry.get_schemas(self.__class__.__name__)
 
     @abstractmethod
     def execute(self, *args, **kwargs) -> Any:
         pass
 
     def validate_inputs(self, input_data: Dict) -> bool:
+        if isinstance(input_data, dict) and self.binary_fields:
+            # The schema describes the base64 form; raw buffers stand in for it
+            input_data = {
+                key: "" if key in self.binary_fields and not isinstance(value, str) else value
+                for key, value in input_data.items()
+            }
         try:
-            jsonschema.validate(instance=input_data, schema=self.input_schema)
+            schema_registry.validate(self.__class__.__name__, 'input', input_data)
             return True
         except jsonschema.exceptions.ValidationError as e:
             error_logger.error(f"Tool input validation error: {str(e)}")
             return False
 
     def validate_output(self, output_data: Dict) -> bool:
+        if isinstance(output_data, dict):
+            output_data = {
+                key: "" if isinstance(value, (bytes, bytearray, memoryview)) else value
+                for key, value in output_data.items()
+            }
         try:
-            jsonschema.validate(instance=output_data, schema=self.output_schema)
+            schema_registry.validate(self.__class__.__name__, 'output', output_data)
             return True
         except jsonschema.exceptions.ValidationError as e:
             error_logger.error(f"Tool output validation error: {str(e)}")
@@ -50,4 +63,12 @@ class BaseTool(ABC):
             "name": self.name,
             "description": self.description,
             "type": self.__class__.__name__
+        }
+
+    @classmethod
+    def get_class_metadata(cls) -> Dict[str, Any]:
+        return {
+            "name": cls.name or cls.__name__,
+            "description": cls.description,
+            "type": cls.__name__
         }
\ No newline at end of file
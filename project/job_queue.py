@@ -0,0 +1,239 @@
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from logger import debug_logger, info_logger, error_logger
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+
+class Job:
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._cancel_event = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def publish(self, event_type: str, **data) -> None:
+        """Record an event and wake up any subscribers"""
+        with self._changed:
+            self.events.append({"type": event_type, "time": time.time(), **data})
+            self._changed.notify_all()
+
+    def wait_for_events(self, since: int, timeout: float) -> List[Dict[str, Any]]:
+        """Block until events newer than index since exist, or timeout"""
+        with self._changed:
+            if len(self.events) <= since and not self.finished:
+                self._changed.wait(timeout)
+            return self.events[since:]
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["message"] = self.error
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """Bounded job queue served by a fixed pool of worker threads.
+
+    The handler is called as handler(job) on a worker thread and returns the
+    job result. Handlers should check job.cancelled between expensive steps.
+    on_finish(job) is called once for every job that reaches a final state,
+    including jobs cancelled while queued, whose handler never runs; use it
+    to release what the payload holds.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Dict[str, Any]],
+        max_workers: int = 1,
+        max_queue_depth: int = 8,
+        retention_s: float = 3600,
+        name: str = "jobs",
+        on_finish: Optional[Callable[[Job], None]] = None
+    ):
+        self.handler = handler
+        self.on_finish = on_finish
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_s = retention_s
+        self.name = name
+        self._queue: "queue.Queue[Job]" = queue.Queue()
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._workers: List[threading.Thread] = []
+
+    def start(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"{self.name}-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        info_logger.info(f"Started {self.max_workers} {self.name} workers (queue depth {self.max_queue_depth})")
+
+    def is_full(self) -> bool:
+        with self._lock:
+            return self._pending >= self.max_queue_depth
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        self.start()
+        job = Job(payload)
+        with self._lock:
+            if self._pending >= self.max_queue_depth:
+                raise QueueFullError(f"{self.name} queue is full ({self.max_queue_depth} pending)")
+            self._pending += 1
+            self._jobs[job.id] = job
+        self._prune()
+        job.publish("status", status=QUEUED)
+        self._queue.put(job)
+        debug_logger.debug("Queued job %s", job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; queued jobs are finished right away and never start"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job._cancel_event.set()
+        with self._lock:
+            dropped = job.status == QUEUED
+            if dropped:
+                # Claimed here, so no worker starts it; its queue slot is free again
+                job.status = CANCELLED
+                self._pending -= 1
+        if dropped:
+            self._finish(job, CANCELLED, error="Cancelled before start")
+        else:
+            job.publish("cancel_requested")
+        return job
+
+    def subscribe(self, job_id: str, poll_timeout: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """Yield job events as they happen until the job finishes.
+
+        A heartbeat event is yielded whenever poll_timeout passes without news.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        seen = 0
+        while True:
+            events = job.wait_for_events(seen, poll_timeout)
+            if not events:
+                if job.finished:
+                    return
+                yield {"type": "heartbeat", "time": time.time()}
+                continue
+            seen += len(events)
+            for event in events:
+                yield event
+            if job.finished and seen >= len(job.events):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.status] = states.get(job.status, 0) + 1
+            return {
+                "workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "pending": self._pending,
+                "jobs": states,
+            }
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                with self._lock:
+                    if job.status != QUEUED:
+                        # Cancelled while queued; cancel() already finished it
+                        continue
+                    job.status = RUNNING
+                try:
+                    self._run_job(job)
+                finally:
+                    with self._lock:
+                        self._pending -= 1
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: Job) -> None:
+        job.started_at = time.time()
+        job.publish("status", status=RUNNING)
+        try:
+            result = self.handler(job)
+            if job.cancelled:
+                self._finish(job, CANCELLED, error="Cancelled")
+            elif result is None:
+                self._finish(job, FAILED, error="Job ended without a result")
+            elif result.get("status") == "error":
+                self._finish(job, FAILED, result=result, error=result.get("message"))
+            else:
+                self._finish(job, SUCCEEDED, result=result)
+        except Exception as e:
+            error_logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            self._finish(job, FAILED, error=str(e))
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.status = status
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                error_logger.error(f"on_finish failed for job {job.id}: {str(e)}", exc_info=True)
+        job.publish("status", status=status)
+        debug_logger.debug("Job %s finished with status %s", job.id, status)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_s
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -1,35 +1,117 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+
+_listener = None
+_listener_running = False
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry)
 
 def setup_loggers():
-    """Setup multiple loggers for different log levels"""
+    """Setup multiple loggers for different log levels.
+
+    Callers only enqueue records; a single QueueListener thread formats
+    them and writes the size-rotated files, so request threads and the
+    audio pipeline never block on disk I/O.
+    """
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    formatter = logging.Formatter(log_format)
-    
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(log_format)
+    min_level = logging.getLevelName(LOG_LEVEL)
+    if not isinstance(min_level, int):
+        min_level = logging.DEBUG
+
     # Ensure logs directory exists
     os.makedirs('logs', exist_ok=True)
-    
+
+    log_queue = queue.SimpleQueue()
+    file_handlers = []
+
     # Create different loggers for each level
-    loggers = {
-        'debug': setup_level_logger('debug', 'logs/debug.log', logging.DEBUG, formatter),
-        'info': setup_level_logger('info', 'logs/info.log', logging.INFO, formatter),
-        'warning': setup_level_logger('warning', 'logs/warning.log', logging.WARNING, formatter),
-        'error': setup_level_logger('error', 'logs/error.log', logging.ERROR, formatter),
-        'critical': setup_level_logger('critical', 'logs/critical.log', logging.CRITICAL, formatter)
-    }
-    
+    loggers = {}
+    for name, level in [
+        ('debug', logging.DEBUG),
+        ('info', logging.INFO),
+        ('warning', logging.WARNING),
+        ('error', logging.ERROR),
+        ('critical', logging.CRITICAL)
+    ]:
+        logger, file_handler = setup_level_logger(
+            name, f'logs/{name}.log', max(level, min_level), formatter, log_queue
+        )
+        loggers[name] = logger
+        if file_handler is not None:
+            file_handlers.append(file_handler)
+
+    if file_handlers:
+        _start_listener(log_queue, file_handlers)
+        atexit.register(shutdown_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener)
+
     return loggers
 
-def setup_level_logger(name, log_file, level, formatter):
-    """Setup individual logger for specific level"""
-    handler = logging.FileHandler(log_file)
-    handler.setFormatter(formatter)
-    
+def _start_listener(log_queue, handlers):
+    global _listener, _listener_running
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_running = True
+
+def _restart_listener():
+    # The listener thread does not survive fork(); forked workers get a new listener on the same queue
+    if _listener is not None:
+        _start_listener(_listener.queue, _listener.handlers)
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener_running
+    if _listener is not None and _listener_running:
+        _listener_running = False
+        _listener.stop()
+
+def setup_level_logger(name, log_file, level, formatter, log_queue):
+    """Setup individual logger for specific level.
+
+    Returns the logger and the file handler the queue listener should
+    write its records to, or None if the logger was already set up.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(handler)
-    
-    return logger
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers):
+        return logger, None
+
+    handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+    # The listener hands every record to every handler; keep only this logger's
+    handler.addFilter(logging.Filter(name))
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return logger, handler
 
 # Create logger instances
 loggers = setup_loggers()
@@ -37,4 +119,4 @@ debug_logger = loggers['debug']
 info_logger = loggers['info']
 warning_logger = loggers['warning']
 error_logger = loggers['error']
-critical_logger = loggers['critical']
\ No newline at end of file
+critical_logger = loggers['critical']
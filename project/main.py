@@ -1,62 +1,87 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+import time
+_import_started = time.perf_counter()
+
+import hashlib
+from io import BytesIO
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, jsonify, stream_with_context
+import json
 import os
-import subprocess
+import threading
 from logger import debug_logger, info_logger, warning_logger, error_logger, critical_logger
-from collections import defaultdict
 from agent_registry import AgentRegistry
 from tools_registry import ToolRegistry
-from werkzeug.utils import secure_filename
-import requests
 from urllib.parse import urlparse
+from model_pool import model_pool
+from job_queue import JobQueue, QueueFullError
+from result_cache import ResultCache
+from script_index import script_index
+from worker_pool import WorkerPool
+from tool_transport import iter_multipart, new_boundary, parse_tool_request, split_binary
+from markupsafe import escape
+from utils.audio_utils import SAMPLE_RATE, load_or_decode_pcm, read_stream
+
+# Declare your agents; each module is imported on the agent's first run
+AgentRegistry.declare("LiveCaptionAgent", "tools.ai_runners.live_caption.main")
+AgentRegistry.declare("TranscribeAudioAgent", "tools.ai_runners.transcribe_audio.main")
+AgentRegistry.declare("SpeakerDiarizationAgent", "tools.ai_runners.speaker_diarization.main")
+
+# Tools register themselves when their module is imported
+import tools.audio.audio_processing.main  # noqa: F401
 
-# Register your agents
-from tools.ai_runners.live_caption.main import LiveCaptionAgent
-from tools.ai_runners.transcribe_audio.main import TranscribeAudioAgent
-from tools.ai_runners.speaker_diarization.main import SpeakerDiarizationAgent
+class InMemoryUploadRequest(Request):
+    """Keeps uploaded files in memory instead of spooling them to temp files"""
 
-AgentRegistry.register(LiveCaptionAgent)
-AgentRegistry.register(TranscribeAudioAgent)
-AgentRegistry.register(SpeakerDiarizationAgent)  # Add this line
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BytesIO()
 
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 app.config['DEBUG'] = True
+# Uploads are held in memory until decoded, so they are capped; 0 disables the limit
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', '512'))
+if MAX_UPLOAD_MB:
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'flac'}
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Build the script index up front so the first request does not pay for the walk
+script_index.refresh(force=True)
+
+# Warm processes for /run/<script>; workers pre-import RUN_PRELOAD modules
+script_workers = WorkerPool(
+    size=int(os.getenv('RUN_WORKERS', '2')),
+    max_concurrent=int(os.getenv('RUN_MAX_CONCURRENT', '4')),
+    preload=[m.strip() for m in os.getenv('RUN_PRELOAD', 'logger,base_agent,agent_registry').split(',') if m.strip()],
+    timeout_s=float(os.getenv('RUN_TIMEOUT_S', '60')),
+    memory_limit_mb=int(os.getenv('RUN_MEMORY_LIMIT_MB', '0')) or None
+)
+
+def start_model_warmup():
+    """Load diarization models into the shared pool in the background"""
+    if os.getenv('MODEL_POOL_WARMUP', '1') == '0':
+        return
+    languages = [code.strip() for code in os.getenv('MODEL_POOL_WARMUP_LANGUAGES', 'en').split(',') if code.strip()]
+
+    def _warm_up():
+        try:
+            AgentRegistry.get_agent('SpeakerDiarizationAgent')().warm_up(languages)
+        except Exception as e:
+            error_logger.error(f"Model warm-up failed: {str(e)}", exc_info=True)
+
+    threading.Thread(target=_warm_up, name="model-warmup", daemon=True).start()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def discover_scripts():
-    script_tree = defaultdict(list)
-    debug_logger.debug("Starting script discovery")
-    
-    for root, dirs, files in os.walk('tools'):
-        for file in files:
-            if not file.endswith('.py') or file == '__init__.py':
-                continue
-            script_path = os.path.relpath(os.path.join(root, file)).replace('\\', '/')
-            category = script_path.split('/')[1]
-            script_tree[category].append(script_path)
-            debug_logger.debug(f"Found script: {script_path}")
-    return script_tree
+    return script_index.tree()
 
 def get_agent_metadata():
-    agents = {}
-    for agent_name, agent_class in AgentRegistry.get_all_agents().items():
-        agent_instance = agent_class()
-        agents[agent_name] = agent_instance.get_metadata()
-    return agents
+    # Precomputed at registration; agents are only constructed when they run
+    return AgentRegistry.get_all_metadata()
 
 def get_tool_metadata():
-    tools = {}
-    for tool_name, tool_class in ToolRegistry.get_all_tools().items():
-        tool_instance = tool_class()
-        tools[tool_name] = tool_instance.get_metadata()
-    return tools
+    return ToolRegistry.get_all_metadata()
 
 @app.route('/')
 def index():
@@ -80,7 +105,7 @@ def validate_script(script):
     script = script.replace('\\', '/').replace('//', '/')
     if not script.endswith('.py'):
         return False, "Not a Python script"
-    if not os.path.exists(script):
+    if not script_index.contains(script):
         return False, "Script not found"
     return True, ""
 
@@ -90,16 +115,38 @@ def run_script(script):
     if not is_valid:
         return error
 
-    try:
-        result = subprocess.run(['python', script], capture_output=True, text=True)
-        return f"<pre>{result.stdout}</pre>"
-    except Exception as e:
-        error_logger.error(f"Script error: {str(e)}")
-        return f"<pre>Error: {str(e)}</pre>"
+    def generate():
+        yield "<pre>"
+        try:
+            # Output is streamed back as the script produces it; stderr is merged in so tracebacks show
+            for stream, payload in script_workers.run(script):
+                if stream in ("stdout", "stderr"):
+                    yield escape(payload)
+                elif stream == "exit" and payload == "timeout":
+                    yield f"\nError: script timed out after {script_workers.timeout_s:.0f}s"
+                elif stream == "exit" and payload != 0:
+                    yield f"\nError: script exited with code {payload}"
+        except Exception as e:
+            error_logger.error(f"Script error: {str(e)}")
+            yield f"Error: {escape(str(e))}"
+        yield "</pre>"
+
+    return Response(stream_with_context(generate()), mimetype='text/html')
+
+@app.route('/workers/stats')
+def worker_stats():
+    return jsonify(script_workers.stats())
+
+@app.route('/metrics/startup')
+def startup_metrics():
+    return jsonify({
+        "import_s": startup_times["import_s"],
+        "agents": AgentRegistry.get_import_times()
+    })
 
 @app.route('/run_agent/<agent_name>', methods=['POST'])
 def run_agent(agent_name):
-    debug_logger.debug(f"Attempting to run agent: {agent_name}")
+    debug_logger.debug("Attempting to run agent: %s", agent_name)
     
     agent_class = AgentRegistry.get_agent(agent_name)
     if not agent_class:
@@ -116,7 +163,7 @@ def run_agent(agent_name):
 
 @app.route('/run_tool/<tool_name>', methods=['POST'])
 def run_tool(tool_name):
-    debug_logger.debug(f"Attempting to run tool: {tool_name}")
+    debug_logger.debug("Attempting to run tool: %s", tool_name)
     
     tool_class = ToolRegistry.get_tool(tool_name)
     if not tool_class:
@@ -124,27 +171,157 @@ def run_tool(tool_name):
         return "Tool not found", 404
         
     try:
+        input_data = parse_tool_request(request, tool_class.binary_fields)
         tool = tool_class()
-        result = tool.execute(request.json)
-        return jsonify({"status": "success", "result": result})
+        result = tool.execute(input_data)
+        metadata, binary = split_binary(result)
+        if not binary:
+            return jsonify({"status": "success", "result": result})
+        # JSON carries only the metadata; binary fields follow as raw parts
+        boundary = new_boundary()
+        return Response(
+            stream_with_context(iter_multipart({"status": "success", "result": metadata}, binary, boundary)),
+            mimetype=f"multipart/mixed; boundary={boundary}"
+        )
     except Exception as e:
         error_logger.error(f"Failed to run tool {tool_name}: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+diarization_cache = ResultCache(
+    os.getenv('DIARIZATION_CACHE_DIR', 'cache/diarization'),
+    max_bytes=int(os.getenv('DIARIZATION_CACHE_MAX_MB', '512')) * 1024 * 1024
+)
+
+def diarization_cache_key(audio_hash, language):
+    from tools.ai_runners.speaker_diarization.main import ASR_MODEL, PIPELINE_VERSION, TRIM_SILENCE
+    return ResultCache.make_key(audio_hash, language=language, model=ASR_MODEL, pipeline=PIPELINE_VERSION,
+                                trim_silence=TRIM_SILENCE)
+
+# Decoded uploads are kept here as .npy files and memory-mapped, so a job pages in one
+# window at a time. Empty keeps each decoded waveform in memory for the whole job
+# (about 230 MB per hour of audio) in exchange for no disk use.
+DIARIZATION_PCM_DIR = os.getenv('DIARIZATION_PCM_DIR', 'cache/pcm')
+DIARIZATION_PCM_MAX_BYTES = int(os.getenv('DIARIZATION_PCM_MAX_MB', '2048')) * 1024 * 1024
+
+# Finished transcripts are chunked by speaker turn and indexed for RAG retrieval
+INDEX_TRANSCRIPTS = os.getenv('RAG_INDEX_TRANSCRIPTS', '0') == '1'
+TRANSCRIPT_INDEX_DIR = os.getenv('RAG_TRANSCRIPT_INDEX_DIR', 'cache/transcript_index')
+EMBEDDING_MODEL = os.getenv('RAG_EMBEDDING_MODEL', 'nomic-embed-text-v1.5')
+EMBEDDING_DIM = int(os.getenv('RAG_EMBEDDING_DIM', '768'))
+
+_embedding = None
+_embedding_lock = threading.Lock()
+_transcript_indexer = None
+_transcript_indexer_lock = threading.Lock()
+
+def get_embedding():
+    """Load the embedding model on first use; transcript indexing and /rag/ask share it"""
+    global _embedding
+    with _embedding_lock:
+        if _embedding is None:
+            from langchain_nomic.embeddings import NomicEmbeddings
+            from rag.embedding_cache import CachedEmbeddings
+            _embedding = CachedEmbeddings(NomicEmbeddings(model=EMBEDDING_MODEL, inference_mode="local"),
+                                          model=EMBEDDING_MODEL)
+        return _embedding
+
+def get_transcript_indexer():
+    """Open the transcript index on first use"""
+    global _transcript_indexer
+    with _transcript_indexer_lock:
+        if _transcript_indexer is None:
+            from rag.transcript_indexer import TranscriptIndexer, open_transcript_index
+            _transcript_indexer = TranscriptIndexer(open_transcript_index(TRANSCRIPT_INDEX_DIR, EMBEDDING_DIM),
+                                                    get_embedding())
+        return _transcript_indexer
+
+def run_transcript_index_job(job):
+    """Job handler: add one recording's segments to the transcript index"""
+    return get_transcript_indexer().index_segments(
+        job.payload["recording"], job.payload["segments"], job.payload.get("filename")
+    )
+
+# One worker: the app is the only process writing the transcript index
+transcript_index_jobs = JobQueue(
+    run_transcript_index_job,
+    max_workers=1,
+    max_queue_depth=int(os.getenv('RAG_INDEX_MAX_QUEUE', '32')),
+    name="transcript-index"
+)
+
+def queue_transcript_indexing(recording, segments, filename=None):
+    if not INDEX_TRANSCRIPTS or not segments:
+        return
+    try:
+        transcript_index_jobs.submit({"recording": recording, "segments": segments, "filename": filename})
+    except QueueFullError:
+        warning_logger.warning(f"Transcript index queue full, not indexing {recording}")
+
+def run_diarization_job(job):
+    """Job handler: decode the uploaded bytes and run the diarization agent on them"""
+    job.publish("progress", stage="decode")
+    audio_bytes = job.payload["audio_bytes"]
+    try:
+        audio = load_or_decode_pcm(audio_bytes, job.payload["audio_hash"], DIARIZATION_PCM_DIR,
+                                   max_bytes=DIARIZATION_PCM_MAX_BYTES)
+    finally:
+        # The encoded upload is no longer needed once decoded, or once decoding failed
+        job.payload["audio_bytes"] = audio_bytes = None
+    debug_logger.debug("Decoded %.1fs of audio for job %s", len(audio) / SAMPLE_RATE, job.id)
+
+    agent = AgentRegistry.get_agent('SpeakerDiarizationAgent')()
+    debug_logger.debug("Calling diarization agent with language: %s", job.payload['language'])
+    result = None
+    # Stream window by window so clients see segments long before the end of the file
+    for update in agent.run_stream(
+        {"audio": audio, "language": job.payload["language"]},
+        should_cancel=lambda: job.cancelled,
+        on_progress=lambda stage: job.publish("progress", stage=stage)
+    ):
+        if update.get("status") == "partial":
+            job.publish("segments", window=update["window"], end=update["end"],
+                        segments=update["segments"])
+        else:
+            result = update
+    if result is None:
+        return {"status": "error", "message": "Diarization ended without a final result"}
+    if result.get("status") == "success":
+        diarization_cache.put(job.payload["cache_key"], result)
+        queue_transcript_indexing(job.payload["audio_hash"], result["segments"], job.payload.get("filename"))
+    return result
+
+def release_upload(job):
+    """Drop the upload a job holds once it is over, including jobs cancelled before they ran"""
+    job.payload["audio_bytes"] = None
+
+diarization_jobs = JobQueue(
+    run_diarization_job,
+    max_workers=int(os.getenv('DIARIZATION_WORKERS', '1')),
+    max_queue_depth=int(os.getenv('DIARIZATION_MAX_QUEUE', '8')),
+    name="diarization",
+    on_finish=release_upload
+)
+
+def queue_full_response():
+    response = jsonify({"status": "error", "message": "Server busy, too many pending jobs"})
+    response.status_code = 429
+    response.headers['Retry-After'] = os.getenv('DIARIZATION_RETRY_AFTER', '10')
+    return response
+
 @app.route('/diarize', methods=['POST'])
 def diarize_audio():
     debug_logger.debug("Received diarization request")
     
     try:
         language = request.form.get('language', 'auto')
-        debug_logger.debug(f"Language selected: {language}")
+        debug_logger.debug("Language selected: %s", language)
         
         if 'audio' not in request.files:
             debug_logger.error("No file in request")
             return jsonify({"status": "error", "message": "No file uploaded"}), 400
         
         file = request.files['audio']
-        debug_logger.debug(f"Received file: {file.filename}")
+        debug_logger.debug("Received file: %s", file.filename)
         
         if file.filename == '':
             debug_logger.error("Empty filename")
@@ -156,43 +333,44 @@ def diarize_audio():
                 "status": "error", 
                 "message": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
+
+        # Reject early so we do not hash uploads we cannot process
+        if diarization_jobs.is_full():
+            warning_logger.warning("Diarization queue full, rejecting upload")
+            return queue_full_response()
             
         try:
-            # Use absolute paths
-            abs_upload_folder = os.path.abspath(app.config['UPLOAD_FOLDER'])
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(abs_upload_folder, filename)
-            
-            debug_logger.debug(f"Processing file: {filename}")
-            debug_logger.debug(f"Full filepath: {filepath}")
-            
-            # Ensure upload directory exists
-            os.makedirs(abs_upload_folder, exist_ok=True)
-            
-            # Save file
-            file.save(filepath)
-            
-            if not os.path.exists(filepath):
-                return jsonify({"status": "error", "message": "Failed to save file"}), 500
-            
-            debug_logger.debug(f"File saved successfully at {filepath}")
-            
-            # Process with absolute path
-            agent = SpeakerDiarizationAgent()
-            debug_logger.debug(f"Calling diarization agent with language: {language}")
-            result = agent.run({
-                "audio_path": filepath,
-                "language": language
-            })
-            
-            debug_logger.debug(f"Agent result status: {result.get('status')}")
-            
-            # Cleanup
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                debug_logger.debug("Cleaned up temporary file")
-            
-            return jsonify(result)
+            # The upload is already in memory; hash it so identical recordings hit the cache
+            audio_bytes = read_stream(file.stream)
+            if len(audio_bytes) == 0:
+                return jsonify({"status": "error", "message": "Uploaded file is empty"}), 400
+            audio_hash = hashlib.sha256(audio_bytes).hexdigest()
+
+            cache_key = diarization_cache_key(audio_hash, language)
+            cached = diarization_cache.get(cache_key)
+            if cached is not None:
+                info_logger.info(f"Serving cached diarization for {file.filename}")
+                # Indexing is a no-op for chunks already indexed
+                queue_transcript_indexing(audio_hash, cached.get("segments"), file.filename)
+                return jsonify({**cached, "cached": True})
+
+            try:
+                job = diarization_jobs.submit({
+                    "audio_bytes": audio_bytes,
+                    "audio_hash": audio_hash,
+                    "language": language,
+                    "cache_key": cache_key,
+                    "filename": file.filename
+                })
+            except QueueFullError:
+                warning_logger.warning("Diarization queue full, rejecting upload")
+                return queue_full_response()
+
+            info_logger.info(f"Queued diarization job {job.id} for {file.filename}")
+            response = jsonify({"status": "queued", "job_id": job.id})
+            response.status_code = 202
+            response.headers['Location'] = url_for('get_job', job_id=job.id)
+            return response
             
         except Exception as e:
             error_logger.error(f"File handling error: {str(e)}", exc_info=True)
@@ -202,15 +380,169 @@ def diarize_audio():
         error_logger.error(f"Diarization error: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = diarization_jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = diarization_jobs.cancel(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job.to_dict(include_result=False))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream job events to the browser as Server-Sent Events"""
+    job = diarization_jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+
+    def generate():
+        for event in diarization_jobs.subscribe(job_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        # The job may be pruned from the queue while the stream is open, so use the one looked up above
+        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/stats')
+def job_stats():
+    return jsonify(diarization_jobs.stats())
+
+@app.route('/rag/transcripts/stats')
+def transcript_index_stats():
+    stats = {"enabled": INDEX_TRANSCRIPTS, "jobs": transcript_index_jobs.stats()}
+    if _transcript_indexer is not None:
+        stats["index"] = _transcript_indexer.index.stats()
+    return jsonify(stats)
+
+# The RAG graph of rag_example.ipynb, served by /rag/ask; the notebook builds the document index
+RAG_LLM_MODEL = os.getenv('RAG_LLM_MODEL', 'llama3.2:3b-instruct-q8_0')
+RAG_INDEX_DIR = os.getenv('RAG_INDEX_DIR', 'cache/rag_index')
+RAG_SEARX_HOST = os.getenv('RAG_SEARX_HOST', 'http://localhost:8080')
+RAG_MAX_RETRIES = int(os.getenv('RAG_MAX_RETRIES', '3'))
+
+_rag = None
+_rag_lock = threading.Lock()
+
+def get_rag():
+    """Build the RAG graph and its components on first use"""
+    global _rag
+    with _rag_lock:
+        if _rag is None:
+            from langchain_community.tools.searx_search.tool import SearxSearchResults, SearxSearchWrapper
+            from langchain_ollama import ChatOllama
+            from rag.bm25 import BM25Index
+            from rag.graph import DOC_GRADER_INSTRUCTIONS, DOC_GRADER_PROMPT, build_rag_graph, llm_router
+            from rag.grading import DocumentGrader
+            from rag.llm_cache import LLMResponseCache
+            from rag.retriever import HybridRetriever
+            from rag.router import EmbeddingRouter
+            from rag.transcript_indexer import refers_to_transcripts, transcript_filters
+            from rag.vector_index import VectorIndex
+
+            llm = ChatOllama(model=RAG_LLM_MODEL, temperature=0)
+            llm_cache = LLMResponseCache()
+            llm_json_mode = ChatOllama(model=RAG_LLM_MODEL, temperature=0, format="json", cache=llm_cache)
+            embedding = get_embedding()
+            index = VectorIndex(RAG_INDEX_DIR, EMBEDDING_DIM)
+            retriever = HybridRetriever(index=index, embedding=embedding, bm25=BM25Index(), k=3)
+            extra_retrievers = []
+            if INDEX_TRANSCRIPTS:
+                extra_retrievers.append(HybridRetriever(
+                    index=get_transcript_indexer().index, embedding=embedding, bm25=BM25Index(), k=3,
+                    filter_parser=transcript_filters, query_gate=refers_to_transcripts
+                ))
+            router = EmbeddingRouter(embedding, index, fallback=llm_router(llm_json_mode),
+                                     extra_indexes=[get_transcript_indexer().index] if INDEX_TRANSCRIPTS else [])
+            grader = DocumentGrader(llm_json_mode, DOC_GRADER_INSTRUCTIONS, DOC_GRADER_PROMPT)
+            web_search_tool = SearxSearchResults(
+                num_results=3, wrapper=SearxSearchWrapper(searx_host=RAG_SEARX_HOST, unsecure=True)
+            )
+            graph = build_rag_graph(llm, llm_json_mode, retriever, router, grader, web_search_tool, extra_retrievers)
+            _rag = {"graph": graph, "router": router, "llm_cache": llm_cache}
+            info_logger.info(f"RAG graph ready with {index.count} indexed documents")
+        return _rag
+
+@app.route('/rag/ask', methods=['GET', 'POST'])
+def rag_ask():
+    """Answer a question with the RAG graph, streamed as Server-Sent Events.
+
+    Events: node (a graph node finished), token (answer text), grading
+    (the answer is complete but may be rejected), retry (it was; drop its
+    tokens), answer (final text and sources), failed and done.
+    """
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+    else:
+        params = request.args
+    question = (params.get('question') or '').strip()
+    if not question:
+        return jsonify({"status": "error", "message": "No question given"}), 400
+    try:
+        max_retries = int(params.get('max_retries', RAG_MAX_RETRIES))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "max_retries must be an integer"}), 400
+    # Every retry is another generation and grading round, so clients only get up to the server's limit
+    max_retries = min(max(max_retries, 0), RAG_MAX_RETRIES)
+    try:
+        from rag.graph import stream_answer
+        rag = get_rag()
+    except Exception as e:
+        error_logger.error(f"RAG setup failed: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 503
+
+    def generate():
+        started = time.perf_counter()
+        first_token_s = None
+        try:
+            for event, data in stream_answer(rag["graph"], question, max_retries):
+                if event == "token" and first_token_s is None:
+                    first_token_s = time.perf_counter() - started
+                    debug_logger.debug("First answer token after %.2fs", first_token_s)
+                elif event == "answer":
+                    data = {**data, "seconds": time.perf_counter() - started, "first_token_s": first_token_s}
+                    info_logger.info(f"Answered question in {data['seconds']:.2f}s after {data['attempts']} attempt(s)")
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            error_logger.error(f"RAG error: {str(e)}", exc_info=True)
+            yield f"event: failed\ndata: {json.dumps({'message': str(e)})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/rag/stats')
+def rag_stats():
+    if _rag is None:
+        return jsonify({"ready": False})
+    return jsonify({"ready": True, "router": _rag["router"].stats(), "llm_cache": _rag["llm_cache"].stats()})
+
+@app.route('/view/rag')
+def view_rag():
+    return render_template("rag_ask.html", title="Ask the RAG Agent",
+                           description="Answers from the indexed documents and transcripts, or the web")
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(diarization_cache.stats())
+
+@app.route('/models/stats')
+def model_stats():
+    return jsonify(model_pool.stats())
+
 # Simplified view_agent route - only returns the form
 @app.route('/view/agent/<agent_name>')
 def view_agent(agent_name):
-    agent_class = AgentRegistry.get_agent(agent_name)
-    if not agent_class:
+    metadata = AgentRegistry.get_metadata(agent_name)
+    if not metadata:
         return "Agent not found", 404
-        
-    agent = agent_class()
-    metadata = agent.get_metadata()
     
     template = "diarization_tool.html" if agent_name == "SpeakerDiarizationAgent" else "base_tool.html"
     return render_template(template, title=metadata['name'], description=metadata['description'])
@@ -226,6 +558,13 @@ def view_script(script):
                          title=script_name,
                          description=f"Script: {script}")
 
+startup_times = {"import_s": time.perf_counter() - _import_started}
+info_logger.info(f"Application module imported in {startup_times['import_s']:.3f}s")
+
 if __name__ == '__main__':
     info_logger.info("Starting Flask application")
+    # Only warm up in the serving process, not in the debug reloader's parent
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_model_warmup()
+        script_workers.start()
     app.run(debug=True)
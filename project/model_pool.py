@@ -0,0 +1,169 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from logger import debug_logger, info_logger
+
+# (kind, model name, device, compute_type, language)
+ModelKey = Tuple[str, str, str, str, str]
+
+# Rough resident sizes used when the real footprint cannot be measured
+DEFAULT_SIZES_MB = {
+    "asr": 3100,
+    "align": 400,
+    "diarize": 150,
+}
+
+
+class _PoolEntry:
+    def __init__(self, key: ModelKey):
+        self.key = key
+        self.model: Any = None
+        self.size_mb = 0.0
+        self.load_lock = threading.Lock()
+        self.use_lock = threading.RLock()
+        self.leases = 0
+
+
+class ModelPool:
+    """Process-wide pool that keeps loaded models resident between requests.
+
+    Entries are evicted in LRU order once the estimated resident size exceeds
+    the memory budget. Models that are currently leased are never evicted.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None):
+        if budget_mb is None:
+            budget_mb = float(os.getenv("MODEL_POOL_BUDGET_MB", "12000"))
+        self.budget_mb = budget_mb
+        self._entries: "OrderedDict[ModelKey, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def lease(self, key: ModelKey, loader: Callable[[], Any]) -> Iterator[Any]:
+        """Yield the model for key, loading it on first use.
+
+        The model is used exclusively by the caller for the duration of the
+        lease, since the underlying pipelines are not re-entrant.
+        """
+        entry = self._get_entry(key)
+        try:
+            self._ensure_loaded(entry, loader)
+            with entry.use_lock:
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.leases -= 1
+            self._evict_over_budget()
+
+    def preload(self, key: ModelKey, loader: Callable[[], Any]) -> None:
+        """Load a model into the pool without using it"""
+        with self.lease(key, loader):
+            pass
+
+    def _get_entry(self, key: ModelKey) -> _PoolEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(key)
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            entry.leases += 1
+            return entry
+
+    def _ensure_loaded(self, entry: _PoolEntry, loader: Callable[[], Any]) -> None:
+        # Per-entry lock: concurrent requests for the same model load it once,
+        # while loads of unrelated models proceed in parallel.
+        with entry.load_lock:
+            loaded = entry.model is not None
+            with self._lock:
+                if loaded:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if loaded:
+                return
+            info_logger.info(f"Loading model into pool: {entry.key}")
+            started = time.monotonic()
+            baseline = _cuda_allocated_mb()
+            entry.model = loader()
+            measured = _cuda_allocated_mb() - baseline
+            kind = entry.key[0]
+            entry.size_mb = measured if measured > 0 else DEFAULT_SIZES_MB.get(kind, 500)
+            debug_logger.debug(
+                f"Loaded {entry.key} in {time.monotonic() - started:.2f}s ({entry.size_mb:.0f} MB)"
+            )
+
+    def _evict_over_budget(self) -> None:
+        evicted = []
+        with self._lock:
+            total = sum(e.size_mb for e in self._entries.values() if e.model is not None)
+            for key in list(self._entries.keys()):
+                if total <= self.budget_mb:
+                    break
+                entry = self._entries[key]
+                if entry.leases > 0 or entry.model is None:
+                    continue
+                total -= entry.size_mb
+                del self._entries[key]
+                evicted.append(entry)
+                self.evictions += 1
+
+        for entry in evicted:
+            info_logger.info(f"Evicting model from pool: {entry.key}")
+            entry.model = None
+        if evicted:
+            _release_memory()
+
+    def clear(self) -> None:
+        """Drop every idle model from the pool"""
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if e.leases == 0]
+            for key in idle:
+                self._entries.pop(key).model = None
+        _release_memory()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = [e for e in self._entries.values() if e.model is not None]
+            return {
+                "budget_mb": self.budget_mb,
+                "resident_mb": sum(e.size_mb for e in loaded),
+                "models": [list(e.key) for e in loaded],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def keys(self) -> List[ModelKey]:
+        with self._lock:
+            return [k for k, e in self._entries.items() if e.model is not None]
+
+
+def _cuda_allocated_mb() -> float:
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return torch.cuda.memory_allocated() / (1024 * 1024)
+    except ImportError:
+        pass
+    return 0.0
+
+
+def _release_memory() -> None:
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+model_pool = ModelPool()
@@ -0,0 +1,80 @@
+import importlib
+import os
+import runpy
+import sys
+import traceback
+from typing import Optional, Sequence
+
+# Entry point of WorkerPool processes. It imports nothing from the app, so
+# the forkserver can preload it and workers start without loading main.py.
+
+
+class _PipeWriter:
+    """File-like object that forwards writes to the parent as they happen"""
+
+    def __init__(self, conn, stream: str):
+        self.conn = conn
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        if text:
+            self.conn.send((self.stream, text))
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]) -> None:
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def worker_main(conn, preload: Sequence[str], memory_limit_mb: Optional[int], cwd: str) -> None:
+    """Entry point of a pooled worker: warm up, then run exactly one script"""
+    os.chdir(cwd)
+    if cwd not in sys.path:
+        sys.path.insert(0, cwd)
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+    conn.send(("ready", os.getpid()))
+
+    message = conn.recv()
+    if message is None:
+        return
+    _, script = message
+
+    exit_code = 0
+    sys.stdout = _PipeWriter(conn, "stdout")
+    sys.stderr = _PipeWriter(conn, "stderr")
+    try:
+        _apply_memory_limit(memory_limit_mb)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+        sys.argv = [script]
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except MemoryError:
+        conn.send(("stderr", "MemoryError: worker memory limit exceeded\n"))
+        exit_code = 1
+    except BaseException:
+        conn.send(("stderr", traceback.format_exc()))
+        exit_code = 1
+    finally:
+        if "logger" in sys.modules:
+            sys.modules["logger"].shutdown_logging()
+        conn.send(("exit", exit_code))
+        conn.close()
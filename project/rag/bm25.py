@@ -0,0 +1,134 @@
+import math
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from logger import debug_logger
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its of on or that the this "
+    "to was we were what when where which who why will with you".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked row lists: each list adds 1 / (k + rank) to a row's score"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the rows of a VectorIndex.
+
+    Each term's postings are two array('i') buffers (rows, term counts)
+    that only grow, so indexing new rows is an append and a query reads
+    them as NumPy views without copying. sync() indexes the rows added
+    since the last call and rebuilds from scratch after compact().
+    Deleted rows stay in the postings; pass the index's live_mask() as
+    allowed to drop them from results.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        # Serializes sync() so concurrent callers cannot index the same rows twice
+        self._sync_lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("i")
+        self._total_length = 0
+        self._generation: Optional[int] = None
+
+    @property
+    def rows(self) -> int:
+        return len(self._lengths)
+
+    def add(self, texts: Sequence[str]) -> None:
+        """Index texts as the next rows"""
+        with self._lock:
+            for text in texts:
+                row = len(self._lengths)
+                tokens = tokenize(text)
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for term, count in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array("i"), array("i"))
+                    postings[0].append(row)
+                    postings[1].append(count)
+                self._lengths.append(len(tokens))
+                self._total_length += len(tokens)
+
+    def sync(self, index) -> int:
+        """Index the rows a VectorIndex gained since the last sync; returns how many"""
+        with self._sync_lock:
+            if self._generation != index.generation:
+                with self._lock:
+                    self.clear()
+                    self._generation = index.generation
+            texts = index.texts(self.rows)
+            if texts:
+                self.add(texts)
+                debug_logger.debug("BM25 indexed %d rows, %d terms", len(texts), len(self._postings))
+            return len(texts)
+
+    def search(self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return up to k (row, score) pairs for rows sharing a term with the query.
+
+        allowed is an optional boolean mask over rows; rows outside it or
+        past its end are never returned.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._lengths)
+            if not terms or not n:
+                return []
+            scores = self._score(terms, n)
+        if allowed is not None:
+            mask = np.zeros(n, dtype=bool)
+            mask[:min(n, len(allowed))] = allowed[:n]
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def _score(self, terms: Sequence[str], n: int) -> np.ndarray:
+        # The NumPy views of the postings are released on return, before add() can resize them
+        lengths = np.frombuffer(self._lengths, dtype=np.intc)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(self._total_length / n, 1e-9))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            rows = np.frombuffer(postings[0], dtype=np.intc)
+            counts = np.frombuffer(postings[1], dtype=np.intc).astype(np.float32)
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            # Rows are unique within a term's postings, so fancy-index += is safe
+            scores[rows] += idf * counts * (self.k1 + 1) / (counts + norm[rows])
+        return scores
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rows": self.rows,
+            "terms": len(self._postings),
+            "postings": sum(len(rows) for rows, _ in self._postings.values()),
+        }
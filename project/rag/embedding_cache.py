@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from logger import debug_logger, info_logger
+from utils.file_lock import file_lock
+
+DIGEST_SIZE = 32
+
+
+class EmbeddingCache:
+    """Disk cache of embedding vectors keyed by text hash, for one model.
+
+    Two append-only files per model: keys.bin holds 32-byte SHA-256
+    digests and vectors.f32 the float32 rows in the same order, read
+    through np.memmap. A lookup is a dict probe plus a row read. Appends
+    hold a file lock and first load rows other processes appended, so the
+    app and the notebook can share one cache directory.
+    """
+
+    def __init__(self, directory: str, model: str):
+        self.model = model
+        self.directory = os.path.join(directory, hashlib.sha256(model.encode("utf-8")).hexdigest()[:16])
+        self._keys_path = os.path.join(self.directory, "keys.bin")
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._lock_path = os.path.join(self.directory, "lock")
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        # Rows in the files, duplicates included; the next append goes here
+        self._count = 0
+        self._vectors: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(self._lock_path):
+            self._load()
+        if self._count:
+            info_logger.info(f"Loaded {self._count} cached embeddings for {self.model}")
+
+    def _load(self) -> None:
+        """Read rows appended since the last load; call with the file lock held"""
+        if self.dim is None:
+            if not os.path.exists(self._meta_path):
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model}, f)
+                return
+            with open(self._meta_path) as f:
+                self.dim = json.load(f).get("dim")
+        if not self.dim or not os.path.exists(self._keys_path):
+            return
+        # A crash between the two appends can leave one file longer; trust the shorter
+        rows = min(os.path.getsize(self._keys_path) // DIGEST_SIZE,
+                   os.path.getsize(self._vectors_path) // (4 * self.dim))
+        if rows <= self._count:
+            return
+        # Raw bytes: an "S32" dtype would strip digests that end in NUL bytes
+        keys = np.fromfile(self._keys_path, dtype=np.uint8, count=rows * DIGEST_SIZE).reshape(rows, DIGEST_SIZE)
+        for row in range(self._count, rows):
+            self._rows.setdefault(bytes(keys[row]), row)
+        self._count = rows
+        self._remap(rows)
+
+    def _remap(self, rows: int) -> None:
+        self._vectors = (np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+                         if rows else None)
+
+    @staticmethod
+    def key(kind: str, text: str) -> bytes:
+        return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            rows = [self._rows.get(key) for key in keys]
+            vectors = self._vectors
+        found = [None if row is None else np.array(vectors[row]) for row in rows]
+        hits = sum(vector is not None for vector in found)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, file_lock(self._lock_path):
+            self._load()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model, "dim": self.dim}, f)
+            fresh, seen = [], set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    fresh.append(i)
+                    seen.add(key)
+            if not fresh:
+                return
+            first = self._count
+            # Drop a torn tail left by a crash so both files end at row first
+            for path, row_size in ((self._vectors_path, 4 * self.dim), (self._keys_path, DIGEST_SIZE)):
+                with open(path, "ab") as f:
+                    f.truncate(first * row_size)
+                    f.write((vectors[fresh].tobytes() if path == self._vectors_path
+                             else b"".join(keys[i] for i in fresh)))
+            for offset, i in enumerate(fresh):
+                self._rows[keys[i]] = first + offset
+            self._count = first + len(fresh)
+            self._remap(self._count)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self._rows),
+            "rows": self._count,
+            "dim": self.dim,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only computes vectors for texts it has not seen.
+
+    Misses of one embed_documents call are deduplicated and sent to the
+    wrapped model in a single batch. Documents and queries are cached
+    separately because models such as Nomic embed them with different
+    task prefixes.
+    """
+
+    def __init__(self, embedding: Embeddings, model: str, directory: str = "cache/embeddings"):
+        self.embedding = embedding
+        self.cache = EmbeddingCache(directory, model)
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.key(kind, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text, vector in zip(keys, texts, found):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            if kind == "query":
+                computed = [self.embedding.embed_query(text) for text in missing.values()]
+            else:
+                computed = self.embedding.embed_documents(list(missing.values()))
+            computed = np.asarray(computed, dtype=np.float32)
+            self.cache.put_many(list(missing), computed)
+            by_key = dict(zip(missing, computed))
+            found = [by_key[key] if vector is None else vector for key, vector in zip(keys, found)]
+            debug_logger.debug("Embedded %d of %d texts (%s)", len(missing), len(texts), kind)
+        return [vector.tolist() for vector in found]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.messages import HumanMessage, SystemMessage
+from logger import debug_logger, info_logger, warning_logger
+
+GRADING_WORKERS = int(os.getenv('RAG_GRADING_WORKERS', '4'))
+
+
+class DocumentGrader:
+    """Grades retrieved documents for relevance with concurrent LLM calls.
+
+    At most max_workers grading calls are in flight at once (Ollama queues
+    the rest anyway; OLLAMA_NUM_PARALLEL decides how many it really runs
+    together). With short_circuit, grading stops at the first irrelevant
+    document, since that alone decides the route to web search: queued
+    calls are cancelled and calls already running are not waited for.
+    Documents left ungraded are kept; only a "no" drops a document.
+    """
+
+    def __init__(
+        self,
+        llm,
+        instructions: str,
+        prompt: str,
+        max_workers: int = GRADING_WORKERS,
+        callbacks: Optional[List[Any]] = None
+    ):
+        self.llm = llm
+        self.instructions = instructions
+        self.prompt = prompt
+        self.max_workers = max_workers
+        self.callbacks = callbacks or []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="grader")
+
+    def _grade_one(self, question: str, document) -> Dict[str, Any]:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {}
+        try:
+            result = self.llm.invoke(
+                [SystemMessage(content=self.instructions)]
+                + [HumanMessage(content=self.prompt.format(document=document.page_content, question=question))],
+                config={"callbacks": self.callbacks},
+            )
+            record["relevant"] = json.loads(result.content)["binary_score"].lower() == "yes"
+        except Exception as e:
+            # An unreadable grade counts as not relevant, as a "no" would
+            warning_logger.warning(f"Document grading failed: {str(e)}")
+            record["relevant"] = False
+            record["error"] = str(e)
+        record["seconds"] = time.perf_counter() - started
+        return record
+
+    def grade(self, question: str, documents: Sequence[Any], short_circuit: bool = False) -> Dict[str, Any]:
+        """Grade documents against a question.
+
+        Returns {"documents": documents not graded irrelevant, in retrieval
+        order, "web_search": "Yes" | "No", "timings": one record per
+        document with index, relevant, seconds (or skipped), "seconds":
+        wall time, "short_circuited": bool}.
+        """
+        started = time.perf_counter()
+        futures = {self._executor.submit(self._grade_one, question, document): index
+                   for index, document in enumerate(documents)}
+        records: Dict[int, Dict[str, Any]] = {}
+        short_circuited = False
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                records[futures[future]] = future.result()
+            if short_circuit and pending and any(not record["relevant"] for record in records.values()):
+                for future in pending:
+                    future.cancel()
+                short_circuited = True
+                break
+
+        timings = []
+        for index in range(len(documents)):
+            record = records.get(index, {"skipped": True})
+            timings.append({"index": index, **record})
+            debug_logger.debug("Graded document %d: %s", index, record)
+        relevant = sum(1 for record in records.values() if record["relevant"])
+        # Skipped documents were never judged, so they stay for generation
+        kept = [documents[i] for i in range(len(documents)) if records.get(i, {}).get("relevant", True)]
+        web_search = "Yes" if relevant < len(records) else "No"
+        elapsed = time.perf_counter() - started
+        info_logger.info(f"Graded {len(records)}/{len(documents)} documents in {elapsed:.2f}s, "
+                         f"{relevant} relevant, {len(documents) - len(records)} ungraded")
+        return {
+            "documents": kept,
+            "web_search": web_search,
+            "timings": timings,
+            "seconds": elapsed,
+            "short_circuited": short_circuited,
+        }
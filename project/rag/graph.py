@@ -0,0 +1,278 @@
+import json
+import operator
+from typing import Annotated, Any, Dict, Iterator, List, Sequence, Tuple
+from typing_extensions import TypedDict
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.graph import END, StateGraph
+from logger import debug_logger, info_logger
+
+# Tag of the answer-generating LLM call; only its tokens are streamed to clients
+ANSWER_TAG = "rag_answer"
+
+# Prompts, as in rag_example.ipynb
+ROUTER_INSTRUCTIONS = """You are an expert at routing a user question to a vectorstore or web search.
+
+The vectorstore contains documents related to refine.dev framework.
+
+Use the vectorstore for questions on these topics. For all else, and especially for current events, use web-search.
+
+Return JSON with single key, datasource, that is 'websearch' or 'vectorstore' depending on the question."""
+
+DOC_GRADER_INSTRUCTIONS = """You are a grader assessing relevance of a retrieved document to a user question.
+
+If the document contains keyword(s) or semantic meaning related to the question, grade it as relevant."""
+
+DOC_GRADER_PROMPT = """Here is the retrieved document: \n\n {document} \n\n Here is the user question: \n\n {question}. 
+
+This carefully and objectively assess whether the document contains at least some information that is relevant to the question.
+
+Return JSON with single key, binary_score, that is 'yes' or 'no' score to indicate whether the document contains at least some information that is relevant to the question."""
+
+RAG_PROMPT = """You are an assistant for question-answering tasks. 
+
+Here is the context to use to answer the question:
+
+{context} 
+
+Think carefully about the above context. 
+
+Now, review the user question:
+
+{question}
+
+Provide an answer to this questions using only the above context. 
+
+Use three sentences maximum and keep the answer concise.
+
+Answer:"""
+
+HALLUCINATION_GRADER_INSTRUCTIONS = """
+
+You are a teacher grading a quiz. 
+
+You will be given FACTS and a STUDENT ANSWER. 
+
+Here is the grade criteria to follow:
+
+(1) Ensure the STUDENT ANSWER is grounded in the FACTS. 
+
+(2) Ensure the STUDENT ANSWER does not contain "hallucinated" information outside the scope of the FACTS.
+
+Score:
+
+A score of yes means that the student's answer meets all of the criteria. This is the highest (best) score. 
+
+A score of no means that the student's answer does not meet all of the criteria. This is the lowest possible score you can give.
+
+Explain your reasoning in a step-by-step manner to ensure your reasoning and conclusion are correct. 
+
+Avoid simply stating the correct answer at the outset."""
+
+HALLUCINATION_GRADER_PROMPT = """FACTS: \n\n {documents} \n\n STUDENT ANSWER: {generation}. 
+
+Return JSON with two two keys, binary_score is 'yes' or 'no' score to indicate whether the STUDENT ANSWER is grounded in the FACTS. And a key, explanation, that contains an explanation of the score."""
+
+ANSWER_GRADER_INSTRUCTIONS = """You are a teacher grading a quiz. 
+
+You will be given a QUESTION and a STUDENT ANSWER. 
+
+Here is the grade criteria to follow:
+
+(1) The STUDENT ANSWER helps to answer the QUESTION
+
+Score:
+
+A score of yes means that the student's answer meets all of the criteria. This is the highest (best) score. 
+
+The student can receive a score of yes if the answer contains extra information that is not explicitly asked for in the question.
+
+A score of no means that the student's answer does not meet all of the criteria. This is the lowest possible score you can give.
+
+Explain your reasoning in a step-by-step manner to ensure your reasoning and conclusion are correct. 
+
+Avoid simply stating the correct answer at the outset."""
+
+ANSWER_GRADER_PROMPT = """QUESTION: \n\n {question} \n\n STUDENT ANSWER: {generation}. 
+
+Return JSON with two two keys, binary_score is 'yes' or 'no' score to indicate whether the STUDENT ANSWER meets the criteria. And a key, explanation, that contains an explanation of the score."""
+
+
+class GraphState(TypedDict):
+    """
+    Graph state is a dictionary that contains information we want to propagate to, and modify in, each graph node.
+    """
+
+    question: str  # User question
+    generation: str  # LLM generation
+    web_search: str  # Binary decision to run web search
+    max_retries: int  # Max number of retries for answer generation
+    answers: int  # Number of answers generated
+    loop_step: Annotated[int, operator.add]
+    documents: List[str]  # List of retrieved documents
+    generation_grade: str  # Verdict on the last generation, set by grade_generation
+
+
+def format_docs(docs) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def llm_router(llm_json_mode, callbacks: Sequence[Any] = ()):
+    """LLM routing call returning "websearch" or "vectorstore", for EmbeddingRouter's fallback"""
+    def route(question: str) -> str:
+        result = llm_json_mode.invoke(
+            [SystemMessage(content=ROUTER_INSTRUCTIONS)] + [HumanMessage(content=question)],
+            config={"callbacks": list(callbacks)},
+        )
+        return json.loads(result.content)["datasource"]
+    return route
+
+
+def build_rag_graph(
+    llm,
+    llm_json_mode,
+    retriever,
+    router,
+    document_grader,
+    web_search_tool,
+    extra_retrievers: Sequence[Any] = (),
+    callbacks: Sequence[Any] = ()
+):
+    """Compile the adaptive RAG graph of rag_example.ipynb from its components.
+
+    router is an EmbeddingRouter and document_grader a DocumentGrader.
+    Documents from extra_retrievers (e.g. the transcript retriever, which
+    only searches when the question refers to recordings) are appended to
+    the main retriever's. Unlike the notebook, grading the
+    answer is a node of its own rather than part of generate's outgoing
+    edge, so the answer is streamed as finished before the graders run.
+    """
+    config = {"callbacks": list(callbacks)}
+
+    def retrieve(state):
+        documents = retriever.invoke(state["question"])
+        for extra in extra_retrievers:
+            documents = documents + extra.invoke(state["question"])
+        debug_logger.debug("Retrieved %d documents", len(documents))
+        return {"documents": documents}
+
+    def generate(state):
+        docs_txt = format_docs(state["documents"])
+        prompt = RAG_PROMPT.format(context=docs_txt, question=state["question"])
+        generation = llm.invoke([HumanMessage(content=prompt)], config={**config, "tags": [ANSWER_TAG]})
+        # loop_step is summed by its reducer, so return the increment
+        return {"generation": generation, "loop_step": 1}
+
+    def grade_documents(state):
+        graded = document_grader.grade(state["question"], state["documents"], short_circuit=True)
+        return {"documents": graded["documents"], "web_search": graded["web_search"]}
+
+    def web_search(state):
+        documents = state.get("documents", [])
+        docs = web_search_tool.invoke({"query": state["question"]})
+        documents.append(Document(page_content="\n".join(d["snippet"] for d in docs)))
+        return {"documents": documents}
+
+    def route_question(state):
+        decision = router.route(state["question"])
+        info_logger.info(f"Routed question to {decision['route']} in {decision['seconds']:.3f}s"
+                         f"{' (asked LLM)' if decision['escalated'] else ''}")
+        return decision["route"]
+
+    def decide_to_generate(state):
+        return "websearch" if state["web_search"] == "Yes" else "generate"
+
+    def grade_generation(state):
+        return {"generation_grade": grade_generation_v_documents_and_question(state)}
+
+    def grade_generation_v_documents_and_question(state):
+        generation = state["generation"]
+        max_retries = state.get("max_retries", 3)
+        result = llm_json_mode.invoke(
+            [SystemMessage(content=HALLUCINATION_GRADER_INSTRUCTIONS)]
+            + [HumanMessage(content=HALLUCINATION_GRADER_PROMPT.format(
+                documents=format_docs(state["documents"]), generation=generation.content))],
+            config=config,
+        )
+        if json.loads(result.content)["binary_score"] != "yes":
+            return "not supported" if state["loop_step"] <= max_retries else "max retries"
+        result = llm_json_mode.invoke(
+            [SystemMessage(content=ANSWER_GRADER_INSTRUCTIONS)]
+            + [HumanMessage(content=ANSWER_GRADER_PROMPT.format(
+                question=state["question"], generation=generation.content))],
+            config=config,
+        )
+        if json.loads(result.content)["binary_score"] == "yes":
+            return "useful"
+        return "not useful" if state["loop_step"] <= max_retries else "max retries"
+
+    workflow = StateGraph(GraphState)
+    workflow.add_node("websearch", web_search)
+    workflow.add_node("retrieve", retrieve)
+    workflow.add_node("grade_documents", grade_documents)
+    workflow.add_node("generate", generate)
+    workflow.add_node("grade_generation", grade_generation)
+    workflow.set_conditional_entry_point(
+        route_question,
+        {"websearch": "websearch", "vectorstore": "retrieve"},
+    )
+    workflow.add_edge("websearch", "generate")
+    workflow.add_edge("retrieve", "grade_documents")
+    workflow.add_conditional_edges(
+        "grade_documents",
+        decide_to_generate,
+        {"websearch": "websearch", "generate": "generate"},
+    )
+    workflow.add_edge("generate", "grade_generation")
+    workflow.add_conditional_edges(
+        "grade_generation",
+        lambda state: state["generation_grade"],
+        {"not supported": "generate", "useful": END, "not useful": "websearch", "max retries": END},
+    )
+    return workflow.compile()
+
+
+def _node_summary(node: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"node": node}
+    if "documents" in update:
+        summary["documents"] = len(update["documents"])
+    if "web_search" in update:
+        summary["web_search"] = update["web_search"]
+    if "generation_grade" in update:
+        summary["grade"] = update["generation_grade"]
+    return summary
+
+
+def stream_answer(graph, question: str, max_retries: int = 3) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Run the graph and yield (event, data) pairs as it goes.
+
+    Events: "node" when a node finishes; "token" for each chunk of the
+    answer being generated; "grading" once an answer is complete and the
+    graders start on it (may_retry says whether they can still reject
+    it); "retry" when they did, so the client discards that attempt's
+    tokens; "answer" with the final text and sources.
+    """
+    inputs = {"question": question, "max_retries": max_retries}
+    attempt = 0
+    generation = None
+    sources: List[Dict[str, Any]] = []
+    for mode, chunk in graph.stream(inputs, stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if ANSWER_TAG in (metadata.get("tags") or []) and message.content:
+                yield "token", {"text": message.content, "attempt": attempt + 1}
+            continue
+
+        for node, update in chunk.items():
+            update = update or {}
+            yield "node", _node_summary(node, update)
+            if "documents" in update:
+                sources = [dict(document.metadata) for document in update["documents"]]
+            if node == "generate":
+                attempt += 1
+                generation = update["generation"].content
+                yield "grading", {"attempt": attempt, "may_retry": attempt <= max_retries}
+            elif node == "grade_generation" and update.get("generation_grade") in ("not supported", "not useful"):
+                yield "retry", {"attempt": attempt, "reason": update["generation_grade"]}
+
+    yield "answer", {"text": generation, "attempts": attempt, "sources": sources}
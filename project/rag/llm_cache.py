@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from result_cache import ResultCache
+from logger import debug_logger, warning_logger
+
+LLM_CACHE_DIR = os.getenv('RAG_LLM_CACHE_DIR', 'cache/llm')
+LLM_CACHE_MAX_BYTES = int(os.getenv('RAG_LLM_CACHE_MAX_MB', '64')) * 1024 * 1024
+LLM_CACHE_TTL_S = float(os.getenv('RAG_LLM_CACHE_TTL_S', str(7 * 24 * 3600)))
+# Keys the router and graders read from a JSON answer
+JSON_ANSWER_KEYS = ("binary_score", "datasource")
+
+
+def is_json_answer(text: str, keys: Sequence[str] = JSON_ANSWER_KEYS) -> bool:
+    """Whether text is a JSON object with a string value for at least one of keys"""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(value, dict) and any(isinstance(value.get(key), str) for key in keys)
+
+
+class LLMResponseCache(BaseCache):
+    """Persistent LangChain cache for deterministic LLM calls.
+
+    LangChain passes the serialized message list as prompt and the model
+    name and parameters (temperature, format, ...) as llm_string, so both
+    go into the key. Entries are ResultCache files with LRU size eviction
+    and a TTL. Pass it as cache= to a ChatOllama whose answers should be
+    reused, such as the temperature=0 JSON router and graders.
+
+    Only answers that pass validate are stored, so a malformed answer is
+    asked again next time instead of being replayed for the whole TTL;
+    entries that fail it on lookup are removed.
+    """
+
+    def __init__(
+        self,
+        directory: str = LLM_CACHE_DIR,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_s: Optional[float] = LLM_CACHE_TTL_S,
+        validate: Optional[Callable[[str], bool]] = is_json_answer
+    ):
+        self.store = ResultCache(directory, max_bytes, ttl_s=ttl_s)
+        self.validate = validate
+        self.rejected = 0
+
+    def _valid(self, generations: Sequence[Generation]) -> bool:
+        return self.validate is None or all(self.validate(generation.text) for generation in generations)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return ResultCache.make_key(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), llm=llm_string)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        generations = [loads(generation) for generation in entry["generations"]]
+        if not self._valid(generations):
+            warning_logger.warning(f"Dropping invalid LLM cache entry {key}")
+            self.store.delete(key)
+            return None
+        debug_logger.debug("LLM cache hit")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not self._valid(return_val):
+            self.rejected += 1
+            debug_logger.debug("Not caching an invalid LLM answer")
+            return
+        self.store.put(self._key(prompt, llm_string), {"generations": [dumps(g) for g in return_val]})
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "rejected": self.rejected}
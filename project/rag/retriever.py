@@ -0,0 +1,133 @@
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+import numpy as np
+from rag.bm25 import reciprocal_rank_fusion
+from rag.vector_index import VectorIndex
+from logger import debug_logger, info_logger
+
+
+def document_id(document: Document) -> str:
+    """Stable id from a document's source and content, so re-adding it is a no-op"""
+    source = str(document.metadata.get("source", ""))
+    return hashlib.sha256(f"{source}\0{document.page_content}".encode("utf-8")).hexdigest()
+
+
+def add_documents(index: VectorIndex, embedding: Embeddings, documents: Sequence[Document]) -> List[str]:
+    """Embed and index the documents that are not in the index yet"""
+    ids = [document_id(document) for document in documents]
+    new = [(doc_id, document) for doc_id, document in zip(ids, documents) if doc_id not in index]
+    if not new:
+        return []
+    vectors = embedding.embed_documents([document.page_content for _, document in new])
+    added = index.add(
+        [doc_id for doc_id, _ in new],
+        vectors,
+        [document.page_content for _, document in new],
+        [dict(document.metadata) for _, document in new]
+    )
+    info_logger.info(f"Indexed {len(added)} new documents ({len(documents) - len(added)} already present)")
+    return added
+
+
+def indexed_sources(index: VectorIndex) -> set:
+    """Sources that already have documents in the index"""
+    return {meta.get("source") for meta in index.metadatas() if meta.get("source")}
+
+
+class VectorIndexRetriever(BaseRetriever):
+    """LangChain retriever over a VectorIndex; drop-in for vectorstore.as_retriever()"""
+
+    index: Any
+    embedding: Any
+    k: int = 4
+    # IVF lists to probe; None searches exactly
+    nprobe: Optional[int] = None
+    # Metadata filter applied to every query (see VectorIndex.rows_where)
+    where: Optional[Dict[str, Any]] = None
+    # Builds an extra filter from the query text, e.g. transcript_filters
+    filter_parser: Optional[Callable[[str], Dict[str, Any]]] = None
+    # Queries it rejects get no documents without a search, e.g. refers_to_transcripts
+    query_gate: Optional[Callable[[str], bool]] = None
+
+    def _skip(self, query: str) -> bool:
+        if self.query_gate is None or self.query_gate(query):
+            return False
+        debug_logger.debug("Query gate skipped retrieval for: %s", query)
+        return True
+
+    def _where(self, query: str) -> Dict[str, Any]:
+        where = dict(self.where or {})
+        if self.filter_parser:
+            where.update(self.filter_parser(query))
+        return where
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self._skip(query):
+            return []
+        where = self._where(query)
+        vector = self.embedding.embed_query(query)
+        return [
+            Document(page_content=hit["text"], metadata={**hit["metadata"], "id": hit["id"], "score": hit["score"]})
+            for hit in self.index.search(vector, k=self.k, nprobe=self.nprobe, where=where or None)
+        ]
+
+
+class HybridRetriever(VectorIndexRetriever):
+    """Fuses BM25 and vector rankings over one VectorIndex with reciprocal-rank fusion.
+
+    Exact term matches (API names, error strings, speaker labels) that
+    embeddings rank poorly still make the top k. The BM25 index is brought
+    up to date with the vector index on every query. On indexes larger
+    than prefilter_size, dense scoring is limited to the prefilter_size
+    best lexical matches when the query matches at least fetch_k rows;
+    otherwise the dense side is the usual full search.
+    """
+
+    bm25: Any
+    # Candidates taken from each ranking before fusion
+    fetch_k: int = 20
+    rrf_k: int = 60
+    # None disables the lexical prefilter
+    prefilter_size: Optional[int] = 2000
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self._skip(query):
+            return []
+        self.index.refresh()
+        self.bm25.sync(self.index)
+        where = self._where(query)
+        allowed = self.index.live_mask()
+        if where:
+            allowed[:] = False
+            allowed[self.index.rows_where(where)] = True
+
+        prefilter = self.prefilter_size is not None and self.index.count > self.prefilter_size
+        lexical = self.bm25.search(query, k=self.prefilter_size if prefilter else self.fetch_k, allowed=allowed)
+        vector = self.embedding.embed_query(query)
+        if prefilter and len(lexical) >= self.fetch_k:
+            rows = np.fromiter((row for row, _ in lexical), dtype=np.int64, count=len(lexical))
+            dense = self.index.search_vectors(vector, k=self.fetch_k, rows=rows)
+        else:
+            prefilter = False
+            dense = self.index.search_vectors(vector, k=self.fetch_k, nprobe=self.nprobe, where=where or None)
+
+        lexical_ranks = {row: rank for rank, (row, _) in enumerate(lexical[:self.fetch_k], start=1)}
+        dense_ranks = {row: rank for rank, (row, _) in enumerate(dense, start=1)}
+        fused = reciprocal_rank_fusion([list(lexical_ranks), list(dense_ranks)], k=self.rrf_k)[:self.k]
+        debug_logger.debug("Hybrid search: %d lexical, %d dense candidates, prefilter %s",
+                           len(lexical), len(dense), prefilter)
+        documents = []
+        for row, score in fused:
+            hit = self.index.hit(row, score)
+            metadata = {**hit["metadata"], "id": hit["id"], "score": score,
+                        "lexical_rank": lexical_ranks.get(row), "dense_rank": dense_ranks.get(row)}
+            documents.append(Document(page_content=hit["text"], metadata=metadata))
+        return documents
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import numpy as np
+from rag.vector_index import VectorIndex, spherical_kmeans
+from logger import debug_logger, info_logger, warning_logger
+
+VECTORSTORE = "vectorstore"
+WEBSEARCH = "websearch"
+
+# Minimum gap between the two routes' similarities to answer without the LLM
+ROUTER_MARGIN = float(os.getenv('RAG_ROUTER_MARGIN', '0.05'))
+# Corpus centroids describing the vectorstore side, per index
+ROUTER_CENTROIDS = int(os.getenv('RAG_ROUTER_CENTROIDS', '16'))
+# Leading characters of each centroid's nearest chunk that are embedded as a query
+ROUTER_PROBE_CHARS = 300
+# Refit the centroids once the corpus has changed by this fraction
+ROUTER_REFIT_FRACTION = 0.1
+# Questions the LLM routed that are kept as examples, per route
+MAX_LEARNED_EXAMPLES = 256
+LATENCY_WINDOW = 1000
+
+# Questions the vectorstore cannot answer; the other side is the corpus itself
+DEFAULT_WEB_EXAMPLES = (
+    "What happened in the news today?",
+    "Who won the game last night?",
+    "What is the weather forecast for tomorrow?",
+    "What are the latest models released this week?",
+    "What is the current stock price of Apple?",
+    "Who is favored to win the championship this season?",
+    "When is the next election?",
+    "What are today's top headlines?",
+)
+
+
+class EmbeddingRouter:
+    """Routes questions to "vectorstore" or "websearch" by embedding similarity.
+
+    Both sides are compared in query space. The vectorstore side is its
+    example questions plus one probe per k-means centroid of each index
+    (the main corpus and any extra_indexes, e.g. transcripts): the opening
+    text of the chunk nearest the centroid, embedded as a query. Raw
+    corpus vectors are document embeddings, which score systematically
+    lower against a query than other queries do. The web side is example
+    questions only. A question goes to the side it is most similar to
+    when the gap is at least margin; otherwise it is escalated to fallback
+    (the LLM router) and, with learn=True, the LLM's answer is kept as a
+    new example so similar questions are routed without it next time.
+    """
+
+    def __init__(
+        self,
+        embedding,
+        index: VectorIndex,
+        fallback: Callable[[str], str],
+        margin: float = ROUTER_MARGIN,
+        n_centroids: int = ROUTER_CENTROIDS,
+        web_examples: Sequence[str] = DEFAULT_WEB_EXAMPLES,
+        vectorstore_examples: Sequence[str] = (),
+        learn: bool = True,
+        extra_indexes: Sequence[VectorIndex] = ()
+    ):
+        self.embedding = embedding
+        self.index = index
+        self.indexes = [index, *extra_indexes]
+        self.fallback = fallback
+        self.margin = margin
+        self.n_centroids = n_centroids
+        self.learn = learn
+        self._lock = threading.Lock()
+        self._probes = np.zeros((0, index.dim), dtype=np.float32)
+        self._fitted_counts = [-1] * len(self.indexes)
+        self._fitted_generations = [-1] * len(self.indexes)
+        self._examples: Dict[str, List[np.ndarray]] = {VECTORSTORE: [], WEBSEARCH: []}
+        self._learned: Dict[str, int] = {VECTORSTORE: 0, WEBSEARCH: 0}
+        self._add_examples(VECTORSTORE, vectorstore_examples)
+        self._add_examples(WEBSEARCH, web_examples)
+        self._decisions = {"fast": 0, "escalated": 0, "fallback_errors": 0}
+        self._routes = {VECTORSTORE: 0, WEBSEARCH: 0}
+        self._fast_latency: deque = deque(maxlen=LATENCY_WINDOW)
+        self._escalated_latency: deque = deque(maxlen=LATENCY_WINDOW)
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _add_examples(self, route: str, questions: Sequence[str]) -> None:
+        # Embedded as queries, like the questions they are compared with
+        self._examples[route].extend(self._unit(self.embedding.embed_query(question)) for question in questions)
+
+    def _probe_texts(self, index: VectorIndex) -> List[str]:
+        sample = index.sample_vectors(max(self.n_centroids * 256, 4096))
+        if not len(sample):
+            return []
+        texts = []
+        for centroid in spherical_kmeans(sample, self.n_centroids):
+            nearest = index.search_vectors(centroid, k=1)
+            if nearest:
+                texts.append(index.hit(nearest[0][0])["text"][:ROUTER_PROBE_CHARS])
+        return list(dict.fromkeys(texts))
+
+    def fit(self) -> None:
+        """Recompute the corpus probes from the centroids of every index"""
+        counts = [index.count for index in self.indexes]
+        generations = [index.generation for index in self.indexes]
+        texts = [text for index in self.indexes for text in self._probe_texts(index)]
+        probes = (np.stack([self._unit(self.embedding.embed_query(text)) for text in texts]) if texts
+                  else np.zeros((0, self.index.dim), dtype=np.float32))
+        with self._lock:
+            self._probes = probes
+            self._fitted_counts = counts
+            self._fitted_generations = generations
+        info_logger.info(f"Router fitted {len(probes)} corpus probes on {sum(counts)} vectors "
+                         f"in {len(self.indexes)} indexes")
+
+    def _maybe_fit(self) -> None:
+        for index, fitted_count, fitted_generation in zip(self.indexes, self._fitted_counts,
+                                                          self._fitted_generations):
+            if (index.generation != fitted_generation
+                    or abs(index.count - fitted_count) > ROUTER_REFIT_FRACTION * max(fitted_count, 1)):
+                self.fit()
+                return
+
+    def _similarity(self, vector: np.ndarray, route: str) -> float:
+        candidates = list(self._examples[route])
+        if route == VECTORSTORE and len(self._probes):
+            candidates.extend(self._probes)
+        if not candidates:
+            return -1.0
+        return float(np.max(np.stack(candidates) @ vector))
+
+    def _scores(self, question: str) -> Tuple[Dict[str, float], np.ndarray]:
+        """Best cosine similarity of the question to each route, and its vector"""
+        for index in self.indexes:
+            index.refresh()
+        self._maybe_fit()
+        vector = self._unit(self.embedding.embed_query(question))
+        with self._lock:
+            return {route: self._similarity(vector, route) for route in (VECTORSTORE, WEBSEARCH)}, vector
+
+    def route(self, question: str) -> Dict[str, Any]:
+        """Return {"route", "confidence", "escalated", "scores", "seconds"}"""
+        started = time.perf_counter()
+        scores, vector = self._scores(question)
+        best = max(scores, key=scores.get)
+        confidence = abs(scores[VECTORSTORE] - scores[WEBSEARCH])
+        escalated = confidence < self.margin
+        if escalated:
+            try:
+                route = self.fallback(question)
+            except Exception as e:
+                warning_logger.warning(f"Router fallback failed, using embedding route: {str(e)}")
+                route = best
+                with self._lock:
+                    self._decisions["fallback_errors"] += 1
+            if route not in self._routes:
+                route = best
+            elif self.learn:
+                self._learn(route, vector)
+        else:
+            route = best
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._decisions["escalated" if escalated else "fast"] += 1
+            self._routes[route] += 1
+            (self._escalated_latency if escalated else self._fast_latency).append(elapsed)
+        debug_logger.debug("Routed to %s (scores %s, escalated %s) in %.3fs", route, scores, escalated, elapsed)
+        return {"route": route, "confidence": confidence, "escalated": escalated, "scores": scores, "seconds": elapsed}
+
+    def _learn(self, route: str, vector: np.ndarray) -> None:
+        with self._lock:
+            examples = self._examples[route]
+            examples.append(vector)
+            self._learned[route] += 1
+            # Oldest learned examples go first; the configured ones stay
+            if self._learned[route] > MAX_LEARNED_EXAMPLES:
+                del examples[len(examples) - self._learned[route]]
+                self._learned[route] -= 1
+
+    @staticmethod
+    def _latency(samples: deque) -> Dict[str, float]:
+        if not samples:
+            return {"count": 0}
+        values = np.asarray(samples)
+        return {
+            "count": len(values),
+            "mean_s": float(values.mean()),
+            "p50_s": float(np.percentile(values, 50)),
+            "p95_s": float(np.percentile(values, 95)),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._decisions["fast"] + self._decisions["escalated"]
+            return {
+                **self._decisions,
+                "escalation_rate": self._decisions["escalated"] / total if total else 0.0,
+                "routes": dict(self._routes),
+                "margin": self.margin,
+                "corpus_probes": len(self._probes),
+                "learned_examples": dict(self._learned),
+                "latency": {"fast": self._latency(self._fast_latency),
+                            "escalated": self._latency(self._escalated_latency)},
+            }
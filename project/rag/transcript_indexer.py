@@ -0,0 +1,133 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from rag.vector_index import VectorIndex
+from logger import debug_logger, info_logger
+
+# Chunks longer than this are split at segment boundaries, even within one turn
+MAX_CHUNK_CHARS = 1000
+# A pause longer than this starts a new chunk even if the speaker does not change
+MAX_TURN_GAP_S = 5.0
+
+# Fields of transcript chunks that get metadata indexes in the VectorIndex
+KEYWORD_FIELDS = ("recording", "speaker")
+RANGE_FIELDS = ("start", "end")
+
+_SPEAKER_PATTERN = re.compile(r"\bSPEAKER_\d+\b", re.IGNORECASE)
+# A bare number ("after 2020", "from 3 sources") is not a time: it needs "minute" before it or a unit after it
+_TIME_PATTERN = re.compile(
+    r"\b(after|before|since|until|from)\s+"
+    r"(?:minute\s+(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*(minutes?|mins?|m|seconds?|secs?|s)\b)",
+    re.IGNORECASE
+)
+_TRANSCRIPT_PATTERN = re.compile(
+    r"\b(transcripts?|recordings?|recorded|meetings?|calls?|interviews?|conversations?|podcasts?|audio|"
+    r"speakers?|said|say|says|mentioned|discussed|talked)\b",
+    re.IGNORECASE
+)
+
+
+def open_transcript_index(directory: str, dim: int) -> VectorIndex:
+    """Open a VectorIndex with the metadata indexes transcript chunks use"""
+    return VectorIndex(directory, dim, keyword_fields=KEYWORD_FIELDS, range_fields=RANGE_FIELDS)
+
+
+def chunk_turns(
+    recording_id: str,
+    segments: Sequence[Dict[str, Any]],
+    max_chars: int = MAX_CHUNK_CHARS,
+    max_gap_s: float = MAX_TURN_GAP_S
+) -> List[Dict[str, Any]]:
+    """Merge consecutive segments of the same speaker into chunks.
+
+    Each chunk is {"id", "text", "metadata"} with the recording, speaker
+    and start/end in seconds. Ids hash the recording, times and text, so
+    chunking the same transcript again yields the same ids.
+    """
+    chunks: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    for segment in segments:
+        text = str(segment.get("text", "")).strip()
+        if not text:
+            continue
+        speaker = str(segment.get("speaker", "UNKNOWN"))
+        start, end = float(segment.get("start", 0)), float(segment.get("end", 0))
+        if (current is not None and current["speaker"] == speaker
+                and start - current["end"] <= max_gap_s
+                and len(current["text"]) + len(text) < max_chars):
+            current["text"] += " " + text
+            current["end"] = max(current["end"], end)
+            continue
+        current = {"speaker": speaker, "start": start, "end": end, "text": text}
+        chunks.append(current)
+
+    return [
+        {
+            "id": hashlib.sha256(
+                f"{recording_id}\0{chunk['start']:.3f}\0{chunk['end']:.3f}\0{chunk['text']}".encode("utf-8")
+            ).hexdigest(),
+            "text": chunk["text"],
+            "metadata": {
+                "source": f"transcript:{recording_id}",
+                "recording": recording_id,
+                "speaker": chunk["speaker"],
+                "start": chunk["start"],
+                "end": chunk["end"],
+            },
+        }
+        for chunk in chunks
+    ]
+
+
+def transcript_filters(question: str) -> Dict[str, Any]:
+    """Metadata filter for VectorIndex.search(where=...) from a question.
+
+    Recognizes speaker labels ("SPEAKER_01") and times such as "after
+    minute 30", "before 90 seconds" or "from 12 min". Returns {} when the
+    question has neither.
+    """
+    where: Dict[str, Any] = {}
+    # Diarization labels are zero-padded to two digits (SPEAKER_01)
+    speakers = sorted({f"SPEAKER_{int(match.split('_')[1]):02d}" for match in _SPEAKER_PATTERN.findall(question)})
+    if speakers:
+        where["speaker"] = speakers
+    for word, minute, amount, unit in _TIME_PATTERN.findall(question):
+        seconds = float(minute) * 60 if minute else float(amount) * (1 if unit.lower().startswith("s") else 60)
+        if word.lower() in ("after", "since", "from"):
+            # The chunk must end after the point, even if it started before it
+            where["end"] = (seconds, None)
+        else:
+            where["start"] = (None, seconds)
+    return where
+
+
+def refers_to_transcripts(question: str) -> bool:
+    """Whether a question is about recorded speech, so searching transcripts is worthwhile.
+
+    True for speaker labels, times the transcript filters understand, and
+    words such as "meeting", "recording" or "said".
+    """
+    return bool(transcript_filters(question)) or bool(_TRANSCRIPT_PATTERN.search(question))
+
+
+class TranscriptIndexer:
+    """Adds diarized transcripts to a VectorIndex, embedding only unseen chunks"""
+
+    def __init__(self, index: VectorIndex, embedding):
+        self.index = index
+        self.embedding = embedding
+
+    def index_segments(self, recording_id: str, segments: Sequence[Dict[str, Any]],
+                       filename: Optional[str] = None) -> Dict[str, Any]:
+        chunks = chunk_turns(recording_id, segments)
+        new = [chunk for chunk in chunks if chunk["id"] not in self.index]
+        if new:
+            vectors = np.asarray(self.embedding.embed_documents([chunk["text"] for chunk in new]), dtype=np.float32)
+            metadatas = [{**chunk["metadata"], "filename": filename} if filename else chunk["metadata"]
+                         for chunk in new]
+            self.index.add([chunk["id"] for chunk in new], vectors, [chunk["text"] for chunk in new], metadatas)
+        debug_logger.debug("Transcript %s: %d chunks from %d segments", recording_id, len(chunks), len(segments))
+        info_logger.info(f"Indexed {len(new)} new transcript chunks for {recording_id} "
+                         f"({len(chunks) - len(new)} already present)")
+        return {"recording": recording_id, "chunks": len(chunks), "added": len(new)}
@@ -0,0 +1,530 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from logger import debug_logger, info_logger
+
+INITIAL_CAPACITY = 1024
+DEFAULT_VECTORS_FILE = "vectors.f32"
+# Below this many live vectors a full scan is as fast as probing IVF lists
+IVF_MIN_VECTORS = 4096
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns unit-norm centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=min(n_clusters, len(vectors)), replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32)
+
+
+class VectorIndex:
+    """Persistent vector index backed by a memory-mapped float32 matrix.
+
+    Layout of the index directory:
+      vectors.f32  rows of unit-normalized float32 vectors, opened with mmap;
+                   vectors.<generation>.f32 once compact() has run
+      log.jsonl    append-only add/delete records (id, row, text, metadata)
+                   after a compact marker naming the matrix file once
+                   compact() has run
+      ivf.npz      optional IVF centroids and row assignments
+
+    Opening an index maps the matrix and replays the log, so a cold start
+    does no embedding work. Rows are never moved: deletes only tombstone a
+    row until compact() rewrites the files. search() is exact by default;
+    with an IVF model trained, passing nprobe scans only the rows of the
+    nprobe closest lists (higher nprobe = better recall, more latency).
+
+    keyword_fields and range_fields name metadata fields that get in-memory
+    indexes (value -> rows, and rows sorted by value). A search with where=
+    then scores only the matching rows instead of scanning the matrix.
+    An index has one writing process; other processes may open it and
+    pick up new records, at most check_interval seconds late.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int,
+        keyword_fields: Sequence[str] = (),
+        range_fields: Sequence[str] = (),
+        check_interval: float = 1.0
+    ):
+        self.directory = directory
+        self.dim = dim
+        self.keyword_fields = tuple(keyword_fields)
+        self.range_fields = tuple(range_fields)
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(directory, DEFAULT_VECTORS_FILE)
+        self._log_path = os.path.join(directory, "log.jsonl")
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._ids: List[Optional[str]] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._log_offset = 0
+        # Bumped whenever rows are renumbered (compact), so derived indexes can rebuild
+        self.generation = 0
+        # First line of the log; compact() starts a new log with a new first line
+        self._log_head: Optional[bytes] = None
+        self._last_check = 0.0
+        self._reset_fields()
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    # --- storage ---
+
+    def _open(self) -> None:
+        self._read_log()
+        capacity = max(INITIAL_CAPACITY, len(self._ids))
+        if os.path.exists(self._vectors_path):
+            capacity = max(capacity, os.path.getsize(self._vectors_path) // (4 * self.dim))
+        self._map(capacity)
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self._ids)] = [doc_id is not None for doc_id in self._ids]
+        self._live = live
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as ivf:
+                self._centroids = ivf["centroids"]
+                assignments = ivf["assignments"]
+            self._assignments = np.full(capacity, -1, dtype=np.int32)
+            self._assignments[:len(assignments)] = assignments
+            # Rows added after the model was saved are assigned now
+            self._assign_rows(np.arange(len(assignments), len(self._ids)))
+        info_logger.info(f"Opened vector index {self.directory} with {self.count} vectors")
+
+    def _map(self, capacity: int) -> None:
+        size = capacity * self.dim * 4
+        mode = "r+b" if os.path.exists(self._vectors_path) else "w+b"
+        with open(self._vectors_path, mode) as f:
+            if os.path.getsize(self._vectors_path) < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._vectors.flush()
+        self._resize(capacity)
+
+    def _resize(self, capacity: int) -> None:
+        del self._vectors
+        self._map(capacity)
+        self._live = np.concatenate((self._live, np.zeros(capacity - len(self._live), dtype=bool)))
+        if self._centroids is not None:
+            extra = np.full(capacity - len(self._assignments), -1, dtype=np.int32)
+            self._assignments = np.concatenate((self._assignments, extra))
+
+    def _read_log(self) -> int:
+        """Apply complete records appended since the last read; returns how many"""
+        if not os.path.exists(self._log_path) or os.path.getsize(self._log_path) <= self._log_offset:
+            return 0
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # A line still being written by another process is picked up next time
+        end = data.rfind(b"\n") + 1
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        for record in records:
+            self._apply(record)
+        self._log_offset += end
+        if self._log_head is None:
+            self._log_head = self._read_head()
+        return len(records)
+
+    def _read_head(self) -> Optional[bytes]:
+        if not os.path.exists(self._log_path):
+            return None
+        with open(self._log_path, "rb") as f:
+            return f.readline() or None
+
+    def refresh(self, force: bool = False) -> None:
+        """Pick up records written by another process"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            if self._log_head is not None and self._read_head() != self._log_head:
+                # compact() rewrote the files underneath us; load them again
+                del self._vectors
+                self._ids, self._texts, self._metadatas, self._row_of = [], [], [], {}
+                self._centroids, self._log_offset, self._log_head = None, 0, None
+                self._vectors_path = os.path.join(self.directory, DEFAULT_VECTORS_FILE)
+                self._reset_fields()
+                self._open()
+                self.generation += 1
+                return
+            first = len(self._ids)
+            if not self._read_log():
+                return
+            n = len(self._ids)
+            if n > len(self._vectors):
+                self._resize(max(n, os.path.getsize(self._vectors_path) // (4 * self.dim)))
+            self._live[:n] = [doc_id is not None for doc_id in self._ids]
+            self._assign_rows(np.arange(first, n))
+            debug_logger.debug("Refreshed %s to %d vectors", self.directory, self.count)
+
+    def _reset_fields(self) -> None:
+        self._keyword_index: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.keyword_fields}
+        self._range_values: Dict[str, List[float]] = {field: [] for field in self.range_fields}
+        # Per range field: (values sorted ascending, their rows); rebuilt lazily after adds
+        self._range_sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if record["op"] == "add":
+            row = record["row"]
+            while len(self._ids) <= row:
+                self._ids.append(None)
+                self._texts.append("")
+                self._metadatas.append({})
+            self._ids[row] = record["id"]
+            self._texts[row] = record["text"]
+            self._metadatas[row] = metadata = record.get("metadata") or {}
+            self._row_of[record["id"]] = row
+            for field in self.keyword_fields:
+                if metadata.get(field) is not None:
+                    self._keyword_index[field].setdefault(metadata[field], []).append(row)
+            for field in self.range_fields:
+                values = self._range_values[field]
+                values.extend([np.nan] * (row + 1 - len(values)))
+                value = metadata.get(field)
+                values[row] = np.nan if value is None else float(value)
+            self._range_sorted = {}
+        elif record["op"] == "delete":
+            row = self._row_of.pop(record["id"], None)
+            if row is not None:
+                self._ids[row] = None
+                self._texts[row] = ""
+                self._metadatas[row] = {}
+        elif record["op"] == "compact" and record.get("vectors"):
+            self._vectors_path = os.path.join(self.directory, record["vectors"])
+
+    def _append_log(self, records: Iterable[Dict[str, Any]]) -> None:
+        with open(self._log_path, "ab") as f:
+            for record in records:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+            self._log_offset = f.tell()
+        if self._log_head is None:
+            self._log_head = self._read_head()
+
+    # --- updates ---
+
+    @property
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ) -> List[str]:
+        """Append vectors; ids that are already indexed are skipped. Returns the ids added"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            keep, seen = [], set()
+            for i, doc_id in enumerate(ids):
+                if doc_id not in self._row_of and doc_id not in seen:
+                    keep.append(i)
+                    seen.add(doc_id)
+            if not keep:
+                return []
+            first = len(self._ids)
+            rows = np.arange(first, first + len(keep))
+            self._grow(first + len(keep))
+
+            batch = vectors[keep]
+            norms = np.linalg.norm(batch, axis=1, keepdims=True)
+            self._vectors[rows] = batch / np.maximum(norms, 1e-12)
+            self._vectors.flush()
+
+            records = [
+                {"op": "add", "id": ids[i], "row": int(row), "text": texts[i], "metadata": metadatas[i]}
+                for i, row in zip(keep, rows)
+            ]
+            self._append_log(records)
+            for record in records:
+                self._apply(record)
+            self._live[rows] = True
+            if self._centroids is not None:
+                self._assign_rows(rows)
+            debug_logger.debug("Added %d vectors to %s", len(keep), self.directory)
+            return [ids[i] for i in keep]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Tombstone ids; their rows are skipped by search until compact()"""
+        with self._lock:
+            records = [{"op": "delete", "id": doc_id} for doc_id in ids if doc_id in self._row_of]
+            rows = [self._row_of[record["id"]] for record in records]
+            self._append_log(records)
+            for record in records:
+                self._apply(record)
+            self._live[rows] = False
+            return len(records)
+
+    def compact(self) -> None:
+        """Rewrite the matrix and log without deleted rows.
+
+        The new matrix goes to a new file and the new log to a temporary
+        file that replaces log.jsonl in one os.replace, which is the commit
+        point: a crash before it leaves the old index intact, a crash after
+        it the new one. The IVF model is removed before the commit (its rows
+        use the old numbering) and saved again after it.
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._live[:len(self._ids)])
+            vectors = np.array(self._vectors[rows])
+            capacity = max(INITIAL_CAPACITY, len(rows))
+            generation = uuid.uuid4().hex
+            vectors_file = f"vectors.{generation}.f32"
+            with open(os.path.join(self.directory, vectors_file), "wb") as f:
+                f.write(vectors.tobytes())
+                f.truncate(capacity * self.dim * 4)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The marker gives the new log a first line readers have not seen
+            records = [{"op": "compact", "generation": generation, "vectors": vectors_file}] + [
+                {"op": "add", "id": self._ids[row], "row": new_row, "text": self._texts[row],
+                 "metadata": self._metadatas[row]}
+                for new_row, row in enumerate(rows)
+            ]
+            tmp_log_path = f"{self._log_path}.tmp"
+            with open(tmp_log_path, "wb") as f:
+                for record in records:
+                    f.write((json.dumps(record) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            assignments = self._assignments[rows] if self._centroids is not None else None
+            if os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+            os.replace(tmp_log_path, self._log_path)
+
+            del self._vectors
+            self._ids, self._texts, self._metadatas, self._row_of = [], [], [], {}
+            self._reset_fields()
+            self._log_offset, self._log_head = 0, None
+            self.generation += 1
+            self._read_log()
+            self._map(capacity)
+            self._live = np.zeros(capacity, dtype=bool)
+            self._live[:len(rows)] = True
+            if assignments is not None:
+                self._assignments = np.full(capacity, -1, dtype=np.int32)
+                self._assignments[:len(rows)] = assignments
+                self._save_ivf()
+            self._remove_stale_vectors()
+            info_logger.info(f"Compacted vector index {self.directory} to {len(rows)} vectors")
+
+    def _remove_stale_vectors(self) -> None:
+        # Readers in other processes keep their mapping of a removed file until they refresh
+        for entry in os.scandir(self.directory):
+            if (entry.name.startswith("vectors") and entry.name.endswith(".f32")
+                    and entry.path != self._vectors_path):
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    debug_logger.debug("Could not remove %s yet: %s", entry.path, e)
+
+    # --- approximate search ---
+
+    def train_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 50000,
+                  seed: int = 0) -> None:
+        """Cluster the live vectors with spherical k-means for IVF search.
+
+        n_lists defaults to about sqrt(count). The model is saved next to
+        the matrix; later adds are assigned to their nearest list, so it only
+        needs retraining when the data drifts.
+        """
+        with self._lock:
+            sample = self.sample_vectors(sample_size, seed)
+            if len(sample) == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(self.count)))
+            centroids = spherical_kmeans(sample, n_lists, iterations, seed)
+            self._centroids = centroids
+            self._assignments = np.full(len(self._vectors), -1, dtype=np.int32)
+            self._assign_rows(np.arange(len(self._ids)))
+            self._save_ivf()
+            info_logger.info(f"Trained IVF with {len(centroids)} lists on {len(sample)} vectors")
+
+    def sample_vectors(self, sample_size: int, seed: int = 0) -> np.ndarray:
+        """Up to sample_size live vectors picked at random, as an in-memory array"""
+        with self._lock:
+            rows = np.flatnonzero(self._live[:len(self._ids)])
+            rows = np.random.default_rng(seed).permutation(rows)[:sample_size]
+            return np.array(self._vectors[rows])
+
+    def _assign_rows(self, rows: np.ndarray) -> None:
+        if len(rows) == 0 or self._centroids is None:
+            return
+        self._assignments[rows] = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+
+    def _save_ivf(self) -> None:
+        tmp_path = f"{self._ivf_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, centroids=self._centroids, assignments=self._assignments[:len(self._ids)])
+        os.replace(tmp_path, self._ivf_path)
+
+    # --- filtering ---
+
+    def _range_rows(self, field: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        if field not in self._range_sorted:
+            values = np.asarray(self._range_values[field], dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            # NaN (missing) sorts last and never matches a bound
+            order = order[~np.isnan(values[order])]
+            self._range_sorted[field] = (values[order], order)
+        values, rows = self._range_sorted[field]
+        lo = 0 if low is None else np.searchsorted(values, low, side="left")
+        hi = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return rows[lo:hi]
+
+    def rows_where(self, where: Dict[str, Any]) -> np.ndarray:
+        """Sorted live rows whose metadata matches every condition.
+
+        A condition is a value (or list of values) for a keyword field, or a
+        (low, high) tuple with inclusive, optional bounds for a range field.
+        Other fields fall back to comparing each row's metadata.
+        """
+        with self._lock:
+            n = len(self._ids)
+            result: Optional[np.ndarray] = None
+            for field, condition in where.items():
+                if field in self._keyword_index:
+                    values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+                    lists = [self._keyword_index[field].get(value, []) for value in values]
+                    rows = np.unique(np.concatenate([np.asarray(rows, dtype=np.int64) for rows in lists]))
+                elif field in self._range_values:
+                    low, high = condition
+                    rows = np.sort(self._range_rows(field, low, high))
+                else:
+                    rows = np.asarray([row for row in range(n)
+                                       if self._metadatas[row].get(field) == condition], dtype=np.int64)
+                result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if result is None:
+                result = np.arange(n)
+            return result[self._live[result]]
+
+    # --- search ---
+
+    def search_vectors(
+        self,
+        query: np.ndarray,
+        k: int = 4,
+        nprobe: Optional[int] = None,
+        row_filter: Optional[np.ndarray] = None,
+        where: Optional[Dict[str, Any]] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """Return the k best (row, cosine similarity) pairs for a query vector.
+
+        nprobe enables IVF search when a model is trained and the index is
+        large enough; otherwise every live row is scored. row_filter is an
+        optional boolean mask over rows and where a metadata filter (see
+        rows_where). rows is an explicit candidate list, e.g. from a
+        lexical prefilter. With where or rows only those rows are scored.
+        """
+        self.refresh()
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            n = len(self._ids)
+            if where or rows is not None:
+                if rows is not None:
+                    rows = np.unique(np.asarray(rows, dtype=np.int64))
+                    rows = rows[rows < n]
+                    rows = rows[self._live[rows]]
+                    if where:
+                        rows = np.intersect1d(rows, self.rows_where(where), assume_unique=True)
+                else:
+                    rows = self.rows_where(where)
+                if row_filter is not None:
+                    rows = rows[row_filter[rows]]
+                if len(rows) == 0:
+                    return []
+                scores = self._vectors[rows] @ query
+                return self._top_k(rows, scores, k)
+
+            candidates = self._live[:n]
+            if row_filter is not None:
+                candidates = candidates & row_filter[:n]
+            if nprobe and self._centroids is not None and self.count >= IVF_MIN_VECTORS:
+                lists = np.argsort(self._centroids @ query)[::-1][:nprobe]
+                candidates = candidates & np.isin(self._assignments[:n], lists)
+            rows = np.flatnonzero(candidates)
+            if len(rows) == 0:
+                return []
+            if len(rows) > n // 2:
+                # Scanning the contiguous prefix beats gathering most of the rows
+                scores = (self._vectors[:n] @ query)[rows]
+            else:
+                scores = self._vectors[rows] @ query
+        return self._top_k(rows, scores, k)
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def search(self, query: np.ndarray, k: int = 4, nprobe: Optional[int] = None,
+               row_filter: Optional[np.ndarray] = None,
+               where: Optional[Dict[str, Any]] = None,
+               rows: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Like search_vectors, but returns id, text, metadata and score per hit"""
+        return [self.hit(row, score) for row, score in self.search_vectors(query, k, nprobe, row_filter, where, rows)]
+
+    def hit(self, row: int, score: Optional[float] = None) -> Dict[str, Any]:
+        """Search result dict (id, text, metadata, score) for a row"""
+        return {"id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row], "score": score}
+
+    @property
+    def rows(self) -> int:
+        """Rows written so far, deleted ones included"""
+        return len(self._ids)
+
+    def texts(self, start: int = 0) -> List[str]:
+        """Texts of the rows from start on; deleted rows have empty text"""
+        with self._lock:
+            return self._texts[start:]
+
+    def live_mask(self) -> np.ndarray:
+        """Boolean mask over rows, False for deleted rows"""
+        with self._lock:
+            return self._live[:len(self._ids)].copy()
+
+    def metadatas(self) -> List[Dict[str, Any]]:
+        """Metadata of all live documents"""
+        return [meta for doc_id, meta in zip(self._ids, self._metadatas) if doc_id is not None]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": self.count,
+            "rows": len(self._ids),
+            "capacity": len(self._vectors),
+            "dim": self.dim,
+            "ivf_lists": 0 if self._centroids is None else len(self._centroids),
+        }
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from logger import debug_logger, info_logger, warning_logger
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of JSON results.
+
+    Each entry is one JSON file named after its key. When the total size
+    exceeds max_bytes, the least recently used entries (by mtime, which is
+    refreshed on every hit) are removed. With ttl_s, entries also expire
+    that long after they were stored.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_s: Optional[float] = None):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.json')
+        )
+
+    @staticmethod
+    def make_key(content_hash: str, **params: Any) -> str:
+        """Combine a content hash with the parameters that affect the result"""
+        fields = [content_hash] + [f"{name}={params[name]}" for name in sorted(params)]
+        return hashlib.sha256("|".join(fields).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            warning_logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self.ttl_s is not None:
+            # The mtime is refreshed on hits, so the store time is kept in the entry
+            if time.time() - value.pop('_stored_at', 0) > self.ttl_s:
+                self._remove(path)
+                with self._lock:
+                    self.misses += 1
+                    self.expirations += 1
+                return None
+
+        with self._lock:
+            self.hits += 1
+        debug_logger.debug("Result cache hit: %s", key)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if self.ttl_s is not None:
+            value = {**value, '_stored_at': time.time()}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            if os.path.exists(path):
+                self._total_bytes -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self._total_bytes += size
+        debug_logger.debug("Stored result cache entry %s (%s bytes)", key, size)
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        """Remove one entry, if present"""
+        self._remove(self._path(key))
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                self._remove(entry.path)
+
+    def _remove(self, path: str) -> None:
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')),
+                key=lambda entry: entry.stat().st_mtime
+            )
+            for entry in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                self._total_bytes -= size
+                self.evictions += 1
+        info_logger.info(f"Result cache evicted down to {self._total_bytes} bytes")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
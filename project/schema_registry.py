@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+import yaml
+import jsonschema
+from logger import debug_logger, info_logger
+
+EMPTY_SCHEMA: Dict[str, Any] = {}
+
+
+class SchemaRegistry:
+    """Parses schema.yml once and caches one compiled validator per schema.
+
+    The file is re-read only when its mtime changes. The mtime itself is
+    checked at most once per check_interval seconds, so lookups on the hot
+    path are dictionary reads.
+    """
+
+    def __init__(self, path: str = 'schema.yml', check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._validators: Dict[Tuple[str, str], Any] = {}
+        self._mtime = None
+        self._last_check = 0.0
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._mtime is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._mtime is not None and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r') as f:
+                schemas = yaml.safe_load(f)
+            self._schemas = schemas.get('schemas', {}) or {}
+            self._validators = {}
+            if self._mtime is not None:
+                info_logger.info(f"Reloaded {self.path}")
+            self._mtime = mtime
+            debug_logger.debug("Loaded %d schemas from %s", len(self._schemas), self.path)
+
+    def get_schemas(self, class_name: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (input_schema, output_schema) for a class"""
+        self._refresh()
+        schema = self._schemas.get(class_name, {})
+        return schema.get('input', EMPTY_SCHEMA), schema.get('output', EMPTY_SCHEMA)
+
+    def validator(self, class_name: str, kind: str):
+        """Return the compiled validator for a class's 'input' or 'output' schema"""
+        self._refresh()
+        key = (class_name, kind)
+        validator = self._validators.get(key)
+        if validator is None:
+            schema = self._schemas.get(class_name, {}).get(kind, EMPTY_SCHEMA)
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+            self._validators[key] = validator
+        return validator
+
+    def validate(self, class_name: str, kind: str, instance: Any) -> None:
+        """Raise jsonschema.exceptions.ValidationError if instance does not match"""
+        self.validator(class_name, kind).validate(instance)
+
+
+schema_registry = SchemaRegistry()
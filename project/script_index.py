@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, List
+from logger import debug_logger, info_logger
+
+
+class ScriptIndex:
+    """In-memory index of the runnable scripts under a directory.
+
+    The tree is built once and rebuilt only when a directory's mtime changes
+    (adding, removing or renaming an entry updates its parent's mtime).
+    Directory mtimes are checked at most once per check_interval seconds,
+    so lookups between checks are plain set and dict reads.
+    """
+
+    def __init__(self, root: str = 'tools', check_interval: float = 2.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._tree: Dict[str, List[str]] = {}
+        self._scripts: FrozenSet[str] = frozenset()
+        self._dir_mtimes: Dict[str, float] = {}
+        self._last_check = 0.0
+        self.rebuilds = 0
+
+    def _snapshot_is_current(self) -> bool:
+        for directory, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return bool(self._dir_mtimes)
+
+    def _rebuild(self) -> None:
+        script_tree = defaultdict(list)
+        dir_mtimes = {}
+        debug_logger.debug("Starting script discovery")
+
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            dir_mtimes[root] = os.stat(root).st_mtime
+            for file in files:
+                if not file.endswith('.py') or file == '__init__.py':
+                    continue
+                script_path = os.path.relpath(os.path.join(root, file)).replace('\\', '/')
+                category = script_path.split('/')[1]
+                script_tree[category].append(script_path)
+                debug_logger.debug("Found script: %s", script_path)
+
+        self._tree = dict(script_tree)
+        self._scripts = frozenset(path for paths in self._tree.values() for path in paths)
+        self._dir_mtimes = dir_mtimes
+        self.rebuilds += 1
+        info_logger.info(f"Indexed {len(self._scripts)} scripts under {self.root}")
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval and self._dir_mtimes:
+            return
+        with self._lock:
+            self._last_check = now
+            if force or not self._snapshot_is_current():
+                self._rebuild()
+
+    def tree(self) -> Dict[str, List[str]]:
+        """Scripts grouped by category (the first directory under root)"""
+        self.refresh()
+        return self._tree
+
+    def contains(self, script: str) -> bool:
+        self.refresh()
+        return script in self._scripts
+
+
+script_index = ScriptIndex()
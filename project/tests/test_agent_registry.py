@@ -0,0 +1,46 @@
+import sys
+import pytest
+
+pytest.importorskip("langchain_core")
+from agent_registry import AgentRegistry
+
+AGENTS = {
+    "LiveCaptionAgent": "tools.ai_runners.live_caption.main",
+    "TranscribeAudioAgent": "tools.ai_runners.transcribe_audio.main",
+}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    for attribute in ("_agents", "_metadata", "_declared", "_import_times"):
+        monkeypatch.setattr(AgentRegistry, attribute, {})
+    for module_path in AGENTS.values():
+        monkeypatch.delitem(sys.modules, module_path, raising=False)
+    for agent_name, module_path in AGENTS.items():
+        AgentRegistry.declare(agent_name, module_path)
+    return AgentRegistry
+
+
+def test_metadata_is_read_without_importing(registry):
+    metadata = registry.get_all_metadata()
+    assert metadata["LiveCaptionAgent"] == {
+        "name": "Live Caption",
+        "description": "Generates real-time captions from audio input",
+        "type": "LiveCaptionAgent",
+    }
+    assert not any(module_path in sys.modules for module_path in AGENTS.values())
+    assert registry.get_all_agents() == {}
+    assert sorted(registry.get_import_times()["pending"]) == sorted(AGENTS)
+
+
+def test_source_metadata_matches_the_class(registry):
+    for agent_name in AGENTS:
+        declared = dict(registry.get_metadata(agent_name))
+        agent_class = registry.get_agent(agent_name)
+        assert agent_class.get_class_metadata() == declared
+    assert sorted(registry.get_all_agents()) == sorted(AGENTS)
+
+
+def test_unknown_agent(registry):
+    assert registry.get_metadata("MissingAgent") is None
+    assert registry.get_agent("MissingAgent") is None
@@ -0,0 +1,38 @@
+import numpy as np
+from utils.audio_processing import detect_speech
+
+SR = 16000
+
+
+def tone(seconds: float, dbfs: float, rng) -> np.ndarray:
+    # White noise at the given RMS level stands in for speech
+    samples = rng.standard_normal(int(seconds * SR)).astype(np.float32)
+    return samples * np.float32(10 ** (dbfs / 20))
+
+
+def covered(regions: np.ndarray, start_s: float, end_s: float) -> float:
+    """Fraction of [start_s, end_s) inside the regions"""
+    mask = np.zeros(int(end_s * SR), dtype=bool)
+    for start, end in regions:
+        mask[start:end] = True
+    return float(mask[int(start_s * SR):].mean())
+
+
+def test_quiet_speaker_is_kept():
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([
+        tone(20, -18, rng), tone(0.3, -70, rng),
+        tone(15, -36, rng), tone(0.3, -70, rng),
+        tone(20, -18, rng),
+    ])
+    regions = detect_speech(audio, SR)
+    assert covered(regions, 20.3, 35.3) == 1.0
+
+
+def test_silence_is_trimmed():
+    rng = np.random.default_rng(1)
+    audio = np.concatenate([tone(5, -70, rng), tone(5, -20, rng), tone(5, -70, rng)])
+    regions = detect_speech(audio, SR)
+    assert len(regions) == 1
+    start, end = regions[0] / SR
+    assert 4.5 < start < 5.0 and 10.0 < end < 10.5
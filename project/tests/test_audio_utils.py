@@ -0,0 +1,87 @@
+import os
+import struct
+import threading
+import numpy as np
+import pytest
+from utils.audio_utils import _decode_wav, evict_pcm_files, load_or_decode_pcm, encode_wav, resample
+
+
+def sine(freq: float, sr: int, seconds: float = 1.0) -> np.ndarray:
+    t = np.arange(int(sr * seconds)) / sr
+    return np.sin(2 * np.pi * freq * t).astype(np.float32)
+
+
+def amplitude(audio: np.ndarray) -> float:
+    # Skip the edges, where the filter runs into the zero padding
+    middle = audio[len(audio) // 4:3 * len(audio) // 4]
+    return float(np.sqrt(2 * np.mean(np.square(middle))))
+
+
+@pytest.mark.parametrize("orig_sr", [8000, 22050, 32000, 44100, 48000])
+def test_resample_keeps_passband(orig_sr):
+    out = resample(sine(1000, orig_sr), orig_sr, 16000)
+    assert len(out) == 16000
+    assert amplitude(out) == pytest.approx(1.0, abs=0.01)
+
+
+@pytest.mark.parametrize("orig_sr", [22050, 44100, 48000])
+def test_resample_removes_content_above_nyquist(orig_sr):
+    # A 10 kHz tone would alias to 6 kHz at 16 kHz without the low-pass
+    assert amplitude(resample(sine(10000, orig_sr), orig_sr, 16000)) < 0.01
+
+
+def test_pcm_files_are_evicted_oldest_first(tmp_path):
+    pcm_dir = str(tmp_path)
+    wav = encode_wav(sine(440, 16000))
+    for i, name in enumerate(("a", "b", "c")):
+        load_or_decode_pcm(memoryview(wav), name, pcm_dir)
+        path = os.path.join(pcm_dir, f"{name}_16000.npy")
+        os.utime(path, (1000 + i, 1000 + i))
+    size = os.path.getsize(os.path.join(pcm_dir, "a_16000.npy"))
+    # Reusing "a" makes it the most recently used
+    load_or_decode_pcm(memoryview(wav), "a", pcm_dir)
+
+    assert evict_pcm_files(pcm_dir, 2 * size) == 1
+    assert sorted(os.listdir(pcm_dir)) == ["a_16000.npy", "c_16000.npy"]
+
+
+def test_concurrent_decodes_of_one_upload_share_the_pcm_file(tmp_path):
+    pcm_dir = str(tmp_path)
+    wav = encode_wav(sine(440, 48000, seconds=5), sr=48000)
+    barrier = threading.Barrier(4)
+    results, errors = [], []
+
+    def decode():
+        barrier.wait()
+        try:
+            results.append(np.asarray(load_or_decode_pcm(memoryview(wav), "same", pcm_dir)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=decode) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(np.array_equal(result, results[0]) for result in results)
+    assert os.listdir(pcm_dir) == ["same_16000.npy"]
+
+
+def wav_bytes(samples: np.ndarray, sr: int, channels: int, block_align: int, bits: int = 16) -> memoryview:
+    data = samples.astype("<i2").tobytes()
+    fmt = struct.pack("<HHIIHH", 1, channels, sr, sr * block_align, block_align, bits)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return memoryview(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+
+def test_decode_wav_mixes_channels():
+    stereo = np.array([[1000, 3000]] * 160, dtype=np.int16).ravel()
+    audio = _decode_wav(wav_bytes(stereo, 16000, channels=2, block_align=4), 16000)
+    np.testing.assert_allclose(audio, 2000 / 32768, rtol=1e-6)
+
+
+@pytest.mark.parametrize("channels, block_align", [(1, 0), (0, 2), (2, 2)])
+def test_decode_wav_leaves_inconsistent_headers_to_ffmpeg(channels, block_align):
+    samples = np.zeros(320, dtype=np.int16)
+    assert _decode_wav(wav_bytes(samples, 16000, channels, block_align), 16000) is None
@@ -0,0 +1,89 @@
+import threading
+import time
+import numpy as np
+from rag.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from rag.vector_index import VectorIndex
+
+DIM = 4
+
+
+def add(index: VectorIndex, texts):
+    ids = [f"doc{index.rows + i}" for i in range(len(texts))]
+    index.add(ids, np.ones((len(texts), DIM), dtype=np.float32), list(texts), [{} for _ in texts])
+    return ids
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the BM25 score of a Document?") == ["bm25", "score", "document"]
+
+
+def test_search_ranks_by_term_weight():
+    bm25 = BM25Index()
+    bm25.add(["apple banana", "apple apple apple", "cherry"])
+    hits = bm25.search("apple", k=5)
+    assert [row for row, _ in hits] == [1, 0]
+    assert bm25.search("durian") == [] and bm25.search("the") == []
+    assert [row for row, _ in bm25.search("apple", allowed=np.array([False, True]))] == [1]
+
+
+def test_sync_indexes_only_new_rows(tmp_path):
+    index = VectorIndex(str(tmp_path), DIM)
+    bm25 = BM25Index()
+    add(index, ["alpha beta", "gamma"])
+    assert bm25.sync(index) == 2
+    assert bm25.sync(index) == 0
+    add(index, ["alpha delta"])
+    assert bm25.sync(index) == 1
+    assert bm25.rows == 3
+    assert sorted(row for row, _ in bm25.search("alpha")) == [0, 2]
+
+
+class SlowTexts:
+    """VectorIndex whose texts() is slow enough for concurrent syncs to overlap"""
+
+    def __init__(self, index: VectorIndex):
+        self.index = index
+        self.generation = index.generation
+
+    def texts(self, start: int = 0):
+        time.sleep(0.05)
+        return self.index.texts(start)
+
+
+def test_concurrent_syncs_index_each_row_once(tmp_path):
+    vectors = VectorIndex(str(tmp_path), DIM)
+    add(vectors, [f"word{i} common" for i in range(200)])
+    index = SlowTexts(vectors)
+    bm25 = BM25Index()
+    barrier = threading.Barrier(4)
+
+    def sync():
+        barrier.wait()
+        bm25.sync(index)
+
+    threads = [threading.Thread(target=sync) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert bm25.rows == 200
+    assert [row for row, _ in bm25.search("word150")] == [150]
+
+
+def test_sync_rebuilds_after_compact(tmp_path):
+    index = VectorIndex(str(tmp_path), DIM)
+    bm25 = BM25Index()
+    ids = add(index, ["alpha", "beta", "gamma"])
+    bm25.sync(index)
+    index.delete([ids[0]])
+    index.compact()
+    # Rows were renumbered, so the postings are rebuilt rather than appended to
+    assert bm25.sync(index) == 2
+    assert bm25.rows == 2
+    assert bm25.search("alpha") == []
+    assert [index.hit(row)["text"] for row, _ in bm25.search("gamma")] == ["gamma"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]])
+    assert [row for row, _ in fused] == [1, 3, 2]
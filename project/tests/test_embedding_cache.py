@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_core")
+from rag.embedding_cache import DIGEST_SIZE, EmbeddingCache
+
+
+def nul_key(tag: int) -> bytes:
+    # Digests ending in NUL bytes are the ones an "S32" read would strip
+    return bytes([tag]) * 30 + b"\0\0"
+
+
+def test_reload_keeps_keys_ending_in_nul(tmp_path):
+    keys = [nul_key(1), nul_key(2)]
+    vectors = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    EmbeddingCache(str(tmp_path), "m").put_many(keys, vectors)
+
+    cache = EmbeddingCache(str(tmp_path), "m")
+    found = cache.get_many(keys)
+    np.testing.assert_array_equal(np.stack(found), vectors)
+
+
+def test_rows_stay_aligned_across_reloads(tmp_path):
+    a, b, c, d = nul_key(1), nul_key(1)[:-1] + b"\x01", nul_key(3), nul_key(4)
+    EmbeddingCache(str(tmp_path), "m").put_many([a, b], np.eye(4, dtype=np.float32)[:2])
+    EmbeddingCache(str(tmp_path), "m").put_many([c], np.eye(4, dtype=np.float32)[2:3])
+    EmbeddingCache(str(tmp_path), "m").put_many([d], np.eye(4, dtype=np.float32)[3:4])
+
+    cache = EmbeddingCache(str(tmp_path), "m")
+    np.testing.assert_array_equal(np.stack(cache.get_many([a, b, c, d])), np.eye(4, dtype=np.float32))
+    assert cache.stats()["rows"] == 4
+
+
+def test_two_instances_share_a_directory(tmp_path):
+    first = EmbeddingCache(str(tmp_path), "m")
+    second = EmbeddingCache(str(tmp_path), "m")
+    first.put_many([nul_key(1)], np.ones((1, 2), dtype=np.float32))
+    second.put_many([nul_key(2)], np.full((1, 2), 2, dtype=np.float32))
+    first.put_many([nul_key(3)], np.full((1, 2), 3, dtype=np.float32))
+
+    cache = EmbeddingCache(str(tmp_path), "m")
+    assert [float(v[0]) for v in cache.get_many([nul_key(1), nul_key(2), nul_key(3)])] == [1.0, 2.0, 3.0]
+    assert (tmp_path / cache.directory.split("/")[-1] / "keys.bin").stat().st_size == 3 * DIGEST_SIZE
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many([nul_key(1)], np.ones((1, 2), dtype=np.float32))
+    # A crash after the vector append but before the key append
+    with open(cache._vectors_path, "ab") as f:
+        f.write(np.full((1, 2), 9, dtype=np.float32).tobytes())
+
+    reopened = EmbeddingCache(str(tmp_path), "m")
+    reopened.put_many([nul_key(2)], np.full((1, 2), 2, dtype=np.float32))
+    assert float(EmbeddingCache(str(tmp_path), "m").get_many([nul_key(2)])[0][0]) == 2.0
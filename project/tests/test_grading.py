@@ -0,0 +1,58 @@
+import json
+import threading
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("langchain_core")
+from rag.grading import DocumentGrader
+
+
+class FakeLLM:
+    """Grades "no" for documents containing "off-topic"; "slow" ones wait for release"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def invoke(self, messages, config=None):
+        text = messages[-1].content
+        if "slow" in text:
+            self.release.wait(5)
+        score = "no" if "off-topic" in text else "yes"
+        return SimpleNamespace(content=json.dumps({"binary_score": score}))
+
+
+def docs(*texts):
+    return [SimpleNamespace(page_content=text) for text in texts]
+
+
+def test_grades_every_document_without_short_circuit():
+    llm = FakeLLM()
+    grader = DocumentGrader(llm, "instructions", "{document} {question}", max_workers=2)
+    documents = docs("about refine", "off-topic", "about data fetching")
+    graded = grader.grade("q", documents)
+    assert graded["documents"] == [documents[0], documents[2]]
+    assert graded["web_search"] == "Yes"
+    assert not graded["short_circuited"]
+
+
+def test_short_circuit_keeps_ungraded_documents():
+    llm = FakeLLM()
+    grader = DocumentGrader(llm, "instructions", "{document} {question}", max_workers=2)
+    documents = docs("off-topic", "slow but relevant", "queued", "also queued")
+    try:
+        graded = grader.grade("q", documents, short_circuit=True)
+    finally:
+        llm.release.set()
+    assert graded["short_circuited"]
+    assert graded["web_search"] == "Yes"
+    # Only the document graded "no" is dropped
+    assert graded["documents"] == documents[1:]
+    assert any(timing.get("skipped") for timing in graded["timings"])
+
+
+def test_all_relevant_needs_no_web_search():
+    grader = DocumentGrader(FakeLLM(), "instructions", "{document} {question}", max_workers=2)
+    documents = docs("a", "b")
+    graded = grader.grade("q", documents, short_circuit=True)
+    assert graded["documents"] == documents
+    assert graded["web_search"] == "No"
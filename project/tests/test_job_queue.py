@@ -0,0 +1,60 @@
+import threading
+from job_queue import CANCELLED, FAILED, SUCCEEDED, JobQueue
+
+
+def wait_finished(job, timeout=5.0):
+    seen = 0
+    while not job.finished:
+        events = job.wait_for_events(seen, timeout)
+        assert events, "job did not finish"
+        seen += len(events)
+
+
+def test_cancelled_queued_job_is_finished_and_cleaned_up():
+    release = threading.Event()
+    ran, finished = [], []
+
+    def handler(job):
+        ran.append(job.payload["n"])
+        release.wait(5)
+        return {"status": "success"}
+
+    jobs = JobQueue(handler, max_workers=1, max_queue_depth=2,
+                    on_finish=lambda job: finished.append(job.payload["n"]))
+    first = jobs.submit({"n": 1})
+    second = jobs.submit({"n": 2})
+    assert jobs.is_full()
+
+    jobs.cancel(second.id)
+    # Finished right away, without waiting for the worker, and its slot is free again
+    assert second.status == CANCELLED and finished == [2]
+    assert not jobs.is_full()
+
+    release.set()
+    wait_finished(first)
+    jobs._queue.join()
+    assert first.status == SUCCEEDED
+    assert ran == [1]
+    assert finished == [2, 1]
+    assert jobs.stats()["pending"] == 0
+
+
+def test_on_finish_runs_after_failures():
+    finished = []
+
+    def handler(job):
+        raise RuntimeError("boom")
+
+    jobs = JobQueue(handler, on_finish=finished.append)
+    job = jobs.submit({})
+    wait_finished(job)
+    assert job.error == "boom"
+    assert finished == [job]
+
+
+def test_handler_without_result_fails_the_job():
+    jobs = JobQueue(lambda job: None)
+    job = jobs.submit({})
+    wait_finished(job)
+    assert job.status == FAILED
+    assert job.error == "Job ended without a result"
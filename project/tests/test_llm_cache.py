@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.load import dumps
+from langchain_core.outputs import Generation
+from rag.llm_cache import LLMResponseCache, is_json_answer
+
+
+def test_is_json_answer():
+    assert is_json_answer('{"binary_score": "yes"}')
+    assert is_json_answer('{"datasource": "websearch"}')
+    assert not is_json_answer('{"binary_score": "yes"')
+    assert not is_json_answer('{"score": "yes"}')
+    assert not is_json_answer('["yes"]')
+
+
+def test_only_valid_answers_are_cached(tmp_path):
+    cache = LLMResponseCache(str(tmp_path))
+    cache.update("bad", "llm", [Generation(text="Sure! The answer is yes.")])
+    cache.update("good", "llm", [Generation(text='{"binary_score": "no"}')])
+
+    assert cache.lookup("bad", "llm") is None
+    assert cache.lookup("good", "llm")[0].text == '{"binary_score": "no"}'
+    assert cache.stats()["rejected"] == 1
+
+
+def test_invalid_entries_are_dropped_on_lookup(tmp_path):
+    cache = LLMResponseCache(str(tmp_path))
+    # An entry stored before answers were validated
+    cache.store.put(cache._key("old", "llm"), {"generations": [dumps(Generation(text="{}"))]})
+
+    assert cache.lookup("old", "llm") is None
+    assert cache.store.stats()["size_bytes"] == 0
@@ -0,0 +1,35 @@
+from model_pool import ModelPool
+
+
+def key(name: str):
+    # "align" entries are sized at 400 MB when no GPU memory is measured
+    return ("align", "default", "cpu", "default", name)
+
+
+def test_evicts_least_recently_used_over_budget():
+    pool = ModelPool(budget_mb=1000)
+    loads = []
+
+    def loader(name):
+        return lambda: loads.append(name) or name
+
+    pool.preload(key("en"), loader("en"))
+    pool.preload(key("de"), loader("de"))
+    # Using "en" again makes "de" the least recently used
+    with pool.lease(key("en"), loader("en")) as model:
+        assert model == "en"
+    pool.preload(key("fr"), loader("fr"))
+
+    assert pool.keys() == [key("en"), key("fr")]
+    assert loads == ["en", "de", "fr"]
+    assert pool.stats()["evictions"] == 1 and pool.stats()["hits"] == 1
+
+
+def test_leased_models_are_not_evicted():
+    pool = ModelPool(budget_mb=500)
+    with pool.lease(key("en"), lambda: "en"):
+        pool.preload(key("de"), lambda: "de")
+        # Over budget, but "en" is in use, so the idle "de" goes instead
+        assert pool.keys() == [key("en")]
+    pool.preload(key("fr"), lambda: "fr")
+    assert pool.keys() == [key("fr")]
@@ -0,0 +1,41 @@
+import os
+from result_cache import ResultCache
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    key = ResultCache.make_key("abc", language="en")
+    assert cache.get(key) is None
+    cache.put(key, {"segments": [{"text": "hi"}]})
+    assert cache.get(key) == {"segments": [{"text": "hi"}]}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    # Writes go through a temp file that is renamed into place
+    assert os.listdir(str(tmp_path)) == [f"{key}.json"]
+
+
+def test_key_depends_on_content_and_params_not_their_order():
+    key = ResultCache.make_key("abc", language="en", model="large-v3")
+    assert key == ResultCache.make_key("abc", model="large-v3", language="en")
+    assert key != ResultCache.make_key("abd", language="en", model="large-v3")
+    assert key != ResultCache.make_key("abc", language="de", model="large-v3")
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    for i, name in enumerate(("a", "b", "c")):
+        cache.put(name, {"value": "x" * 100})
+        os.utime(os.path.join(str(tmp_path), f"{name}.json"), (1000 + i, 1000 + i))
+    size = os.path.getsize(os.path.join(str(tmp_path), "a.json"))
+    assert cache.get("a") is not None
+
+    cache.max_bytes = 3 * size
+    cache.put("d", {"value": "x" * 100})
+    assert cache.get("b") is None
+    assert all(cache.get(name) is not None for name in ("a", "c", "d"))
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20, ttl_s=-1)
+    cache.put("a", {"value": 1})
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
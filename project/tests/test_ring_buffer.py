@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from utils.ring_buffer import RingBuffer
+
+
+def test_windows_are_contiguous_across_wraparound():
+    buffer = RingBuffer(capacity=8, window_size=4, hop=2)
+    buffer.write(np.arange(6, dtype=np.int16))
+    windows = []
+    for _ in range(2):
+        windows.append(buffer.read_window(timeout=0).tolist())
+        buffer.advance()
+    # The next samples wrap past the end of storage
+    buffer.write(np.arange(6, 10, dtype=np.int16))
+    while (window := buffer.read_window(timeout=0)) is not None:
+        windows.append(window.tolist())
+        buffer.advance()
+    assert windows == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7], [6, 7, 8, 9]]
+    assert buffer.overruns == 0 and buffer.available() == 2
+
+
+def test_overrun_drops_oldest_whole_hops():
+    buffer = RingBuffer(capacity=8, window_size=4, hop=2)
+    buffer.write(np.arange(7, dtype=np.int16))
+    buffer.write(np.arange(7, 12, dtype=np.int16))
+    # 12 samples into 8 slots: 4 lost, already a multiple of the hop
+    assert buffer.overruns == 1 and buffer.dropped_samples == 4
+    assert buffer.read_window(timeout=0).tolist() == [4, 5, 6, 7]
+
+
+def test_write_larger_than_capacity_keeps_the_tail():
+    buffer = RingBuffer(capacity=4, window_size=4)
+    buffer.write(np.arange(10, dtype=np.int16))
+    assert buffer.read_window(timeout=0).tolist() == [6, 7, 8, 9]
+    assert buffer.dropped_samples == 6
+
+
+def test_read_window_times_out_without_enough_samples():
+    buffer = RingBuffer(capacity=8, window_size=4)
+    buffer.write(np.arange(3, dtype=np.int16))
+    assert buffer.read_window(timeout=0.01) is None
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        RingBuffer(capacity=4, window_size=8)
+    with pytest.raises(ValueError):
+        RingBuffer(capacity=8, window_size=4, hop=5)
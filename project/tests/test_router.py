@@ -0,0 +1,57 @@
+import hashlib
+import numpy as np
+from rag.router import VECTORSTORE, WEBSEARCH, EmbeddingRouter
+from rag.vector_index import VectorIndex
+
+DIM = 64
+
+
+class AsymmetricEmbedding:
+    """Bag of words plus a large per-role offset, like search_query/search_document prefixes"""
+
+    def _embed(self, text: str, role: int) -> list:
+        vector = np.zeros(DIM)
+        for word in text.lower().replace("?", "").split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % (DIM - 2)] += 1
+        vector /= np.linalg.norm(vector)
+        vector[role] = 1.5
+        return list(vector)
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text, DIM - 2)
+
+    def embed_documents(self, texts) -> list:
+        return [self._embed(text, DIM - 1) for text in texts]
+
+
+def build_index(directory, texts):
+    embedding = AsymmetricEmbedding()
+    index = VectorIndex(str(directory), DIM)
+    index.add([f"id{i}" for i in range(len(texts))], embedding.embed_documents(texts), texts,
+              [{} for _ in texts])
+    return index
+
+
+def never_called(question):
+    raise AssertionError(f"escalated {question!r}")
+
+
+def test_corpus_questions_route_to_vectorstore(tmp_path):
+    index = build_index(tmp_path, [
+        "refine forms hooks handle form state and validation",
+        "refine data fetching hooks use data providers",
+        "refine data providers fetch records from a rest api",
+    ])
+    router = EmbeddingRouter(AsymmetricEmbedding(), index, fallback=never_called, n_centroids=2, learn=False)
+    assert router.route("how do refine forms hooks handle validation")["route"] == VECTORSTORE
+    assert router.route("what are today's top headlines")["route"] == WEBSEARCH
+    assert router.stats()["corpus_probes"] == 2
+
+
+def test_extra_indexes_add_probes(tmp_path):
+    index = build_index(tmp_path / "docs", ["refine forms hooks handle form state"])
+    transcripts = build_index(tmp_path / "transcripts", ["we agreed to ship the billing migration on friday"])
+    router = EmbeddingRouter(AsymmetricEmbedding(), index, fallback=never_called, n_centroids=1,
+                             learn=False, extra_indexes=[transcripts])
+    assert router.route("when do we ship the billing migration")["route"] == VECTORSTORE
+    assert router.stats()["corpus_probes"] == 2
@@ -0,0 +1,34 @@
+import os
+import jsonschema
+import pytest
+from schema_registry import SchemaRegistry
+
+
+def write_schema(path, required):
+    with open(path, "w") as f:
+        f.write(f"schemas:\n  Tool:\n    input:\n      type: object\n      required: [{required}]\n")
+
+
+def test_validators_are_cached_and_reloaded_after_touch(tmp_path):
+    path = str(tmp_path / "schema.yml")
+    write_schema(path, "a")
+    registry = SchemaRegistry(path, check_interval=0)
+    validator = registry.validator("Tool", "input")
+    assert registry.validator("Tool", "input") is validator
+    registry.validate("Tool", "input", {"a": 1})
+
+    write_schema(path, "b")
+    # Make sure the mtime changes even on coarse-grained filesystems
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        registry.validate("Tool", "input", {"a": 1})
+    assert registry.get_schemas("Tool")[0]["required"] == ["b"]
+
+
+def test_unknown_class_gets_empty_schemas(tmp_path):
+    path = str(tmp_path / "schema.yml")
+    write_schema(path, "a")
+    registry = SchemaRegistry(path)
+    assert registry.get_schemas("Missing") == ({}, {})
+    registry.validate("Missing", "input", {"anything": True})
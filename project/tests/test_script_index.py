@@ -0,0 +1,27 @@
+import os
+from script_index import ScriptIndex
+
+
+def write(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("print('hi')\n")
+
+
+def test_new_script_is_picked_up(tmp_path, monkeypatch):
+    # Script paths are relative to the working directory, as in the app
+    monkeypatch.chdir(tmp_path)
+    write("tools/audio/convert.py")
+    write("tools/audio/__init__.py")
+    index = ScriptIndex("tools", check_interval=0)
+    assert index.tree() == {"audio": ["tools/audio/convert.py"]}
+    assert index.rebuilds == 1
+
+    # No change: served from the snapshot
+    assert index.contains("tools/audio/convert.py")
+    assert index.rebuilds == 1
+
+    write("tools/text/summarize.py")
+    assert index.contains("tools/text/summarize.py")
+    assert index.rebuilds == 2
+    assert not index.contains("tools/audio/__init__.py")
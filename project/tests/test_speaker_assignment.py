@@ -0,0 +1,33 @@
+import numpy as np
+from utils.speaker_assignment import UNKNOWN_SPEAKER, dominant_speakers
+
+
+def turns(*tracks):
+    return (np.array([t[0] for t in tracks], dtype=np.float64),
+            np.array([t[1] for t in tracks], dtype=np.float64),
+            [t[2] for t in tracks])
+
+
+def test_picks_speaker_with_most_overlap():
+    diarization = turns((0, 4, "A"), (4, 10, "B"), (10, 12, "A"))
+    assert dominant_speakers([0, 3, 9, 10.5], [2, 8, 12, 11], diarization) == ["A", "B", "A", "A"]
+
+
+def test_overlap_is_summed_per_speaker():
+    # A has 1 + 1 seconds in the interval, B a single 1.5 second turn
+    diarization = turns((0, 1, "A"), (1, 2.5, "B"), (2.5, 3.5, "A"))
+    assert dominant_speakers([0], [3.5], diarization) == ["A"]
+
+
+def test_unsorted_and_nested_turns():
+    # A long turn that ends last must still be found for intervals past later-starting turns
+    diarization = turns((5, 6, "B"), (0, 20, "A"), (7, 8, "C"))
+    assert dominant_speakers([5, 7, 15], [6, 8, 16], diarization) == ["A", "A", "A"]
+    assert dominant_speakers([5.2], [5.4], turns((0, 5.3, "A"), (5.25, 6, "B"))) == ["B"]
+
+
+def test_unknown_for_gaps_nan_and_empty_turns():
+    diarization = turns((0, 1, "A"))
+    assert dominant_speakers([2, np.nan], [3, 1], diarization) == [UNKNOWN_SPEAKER, UNKNOWN_SPEAKER]
+    assert dominant_speakers([0], [1], turns()) == [UNKNOWN_SPEAKER]
+    assert dominant_speakers([], [], diarization) == []
@@ -0,0 +1,32 @@
+import numpy as np
+from tools.ai_runners.speaker_diarization.main import STREAM_SPEAKER_THRESHOLD, _track_speakers
+from utils.speaker_tracker import SpeakerTracker
+
+VOICE_A = np.array([1.0, 0.1, 0.0, 0.0])
+VOICE_B = np.array([0.0, 1.0, 0.1, 0.0])
+VOICE_C = np.array([0.0, 0.0, 0.1, 1.0])
+
+
+def turns(*tracks):
+    return (np.array([t[0] for t in tracks], dtype=np.float64),
+            np.array([t[1] for t in tracks], dtype=np.float64),
+            [t[2] for t in tracks])
+
+
+def test_speaker_silent_in_the_overlap_keeps_their_label():
+    tracker = SpeakerTracker(threshold=STREAM_SPEAKER_THRESHOLD)
+    first = _track_speakers(tracker, turns((0, 60, "SPEAKER_00"), (60, 120, "SPEAKER_01")),
+                            {"SPEAKER_00": VOICE_A, "SPEAKER_01": VOICE_B})
+    # Next window: only A talks in the 10 s overlap; B speaks again later, under another local label
+    second = _track_speakers(tracker, turns((0, 15, "SPEAKER_01"), (40, 90, "SPEAKER_00")),
+                             {"SPEAKER_00": VOICE_B + 0.05, "SPEAKER_01": VOICE_A + 0.05})
+    assert second == {"SPEAKER_01": first["SPEAKER_00"], "SPEAKER_00": first["SPEAKER_01"]}
+
+
+def test_new_speaker_gets_a_new_label_and_missing_embeddings_are_unknown():
+    tracker = SpeakerTracker(threshold=STREAM_SPEAKER_THRESHOLD)
+    _track_speakers(tracker, turns((0, 60, "SPEAKER_00")), {"SPEAKER_00": VOICE_A})
+    mapping = _track_speakers(tracker, turns((0, 30, "SPEAKER_00"), (30, 60, "SPEAKER_01"), (60, 61, "SPEAKER_02")),
+                              {"SPEAKER_00": VOICE_C, "SPEAKER_01": VOICE_A, "SPEAKER_02": np.full(4, np.nan)})
+    assert mapping == {"SPEAKER_00": "SPEAKER_01", "SPEAKER_01": "SPEAKER_00", "SPEAKER_02": "UNKNOWN"}
+    assert _track_speakers(tracker, turns(), {}) == {}
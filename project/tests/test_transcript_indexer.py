@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from rag.transcript_indexer import (
+    chunk_turns, open_transcript_index, refers_to_transcripts, transcript_filters
+)
+
+
+@pytest.mark.parametrize("question, where", [
+    ("What did SPEAKER_1 say?", {"speaker": ["SPEAKER_01"]}),
+    ("What did speaker_02 and SPEAKER_10 agree on?", {"speaker": ["SPEAKER_02", "SPEAKER_10"]}),
+    ("What was said after minute 30?", {"end": (1800.0, None)}),
+    ("Anything before 90 seconds?", {"start": (None, 90.0)}),
+    ("Topics from 12 min on", {"end": (720.0, None)}),
+    ("SPEAKER_03 until 45s", {"speaker": ["SPEAKER_03"], "start": (None, 45.0)}),
+])
+def test_transcript_filters(question, where):
+    assert transcript_filters(question) == where
+
+
+@pytest.mark.parametrize("question", [
+    "What changed after 2020?",
+    "Summarize the answer from 3 sources",
+    "Which hooks were added since 4.0?",
+    "How do forms work in refine?",
+])
+def test_bare_numbers_are_not_times(question):
+    assert transcript_filters(question) == {}
+
+
+def test_refers_to_transcripts():
+    assert refers_to_transcripts("What was discussed in the meeting?")
+    assert refers_to_transcripts("What did SPEAKER_01 think?")
+    assert refers_to_transcripts("Anything after minute 5?")
+    assert not refers_to_transcripts("What stack is used in data fetching in refine.dev?")
+
+
+def test_chunk_turns_merges_one_speakers_segments():
+    segments = [
+        {"speaker": "SPEAKER_00", "start": 0, "end": 2, "text": "Hello"},
+        {"speaker": "SPEAKER_00", "start": 2.5, "end": 4, "text": "there"},
+        {"speaker": "SPEAKER_01", "start": 4, "end": 6, "text": "Hi"},
+        {"speaker": "SPEAKER_01", "start": 20, "end": 22, "text": "Later"},
+    ]
+    chunks = chunk_turns("rec", segments)
+    assert [chunk["text"] for chunk in chunks] == ["Hello there", "Hi", "Later"]
+    assert chunks[0]["metadata"]["end"] == 4
+    assert [chunk["id"] for chunk in chunk_turns("rec", segments)] == [chunk["id"] for chunk in chunks]
+
+
+def test_rows_where_combines_keyword_and_range_filters(tmp_path):
+    index = open_transcript_index(str(tmp_path), dim=2)
+    metadatas = [
+        {"recording": "a", "speaker": "SPEAKER_00", "start": 0.0, "end": 10.0},
+        {"recording": "a", "speaker": "SPEAKER_01", "start": 10.0, "end": 20.0},
+        {"recording": "a", "speaker": "SPEAKER_00", "start": 20.0, "end": 30.0},
+        {"recording": "b", "speaker": "SPEAKER_00", "start": 0.0, "end": 5.0},
+    ]
+    index.add([f"id{i}" for i in range(4)], np.eye(2, dtype=np.float32)[[0, 1, 0, 1]],
+              [f"text {i}" for i in range(4)], metadatas)
+
+    assert index.rows_where({"speaker": "SPEAKER_00"}).tolist() == [0, 2, 3]
+    assert index.rows_where({"speaker": ["SPEAKER_00", "SPEAKER_01"], "recording": "a"}).tolist() == [0, 1, 2]
+    assert index.rows_where({"speaker": "SPEAKER_00", "end": (8.0, None)}).tolist() == [0, 2]
+    assert index.rows_where({"start": (None, 10.0)}).tolist() == [0, 1, 3]
+    index.delete(["id2"])
+    assert index.rows_where({"speaker": "SPEAKER_00"}).tolist() == [0, 3]
+    assert index.rows_where({"speaker": "SPEAKER_09"}).tolist() == []
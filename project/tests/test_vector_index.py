@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import pytest
+from rag.vector_index import VectorIndex
+
+DIM = 8
+
+
+def unit(i: int) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i % DIM] = 1
+    return vector
+
+
+def fill(index: VectorIndex, n: int, prefix: str = "doc") -> None:
+    index.add([f"{prefix}{i}" for i in range(n)], np.stack([unit(i) for i in range(n)]),
+              [f"text {prefix}{i}" for i in range(n)], [{"n": i} for i in range(n)])
+
+
+def top_id(index: VectorIndex, i: int) -> str:
+    return index.search(unit(i), k=1)[0]["id"]
+
+
+def test_log_replay_restores_adds_and_deletes(tmp_path):
+    index = VectorIndex(str(tmp_path), DIM)
+    fill(index, 5)
+    index.delete(["doc1", "doc3"])
+
+    reopened = VectorIndex(str(tmp_path), DIM)
+    assert reopened.count == 3 and reopened.rows == 5
+    assert "doc1" not in reopened and "doc4" in reopened
+    assert top_id(reopened, 4) == "doc4"
+    assert reopened.live_mask().tolist() == [True, False, True, False, True]
+
+
+def test_reader_refresh_picks_up_new_records(tmp_path):
+    writer = VectorIndex(str(tmp_path), DIM)
+    fill(writer, 2)
+    reader = VectorIndex(str(tmp_path), DIM, check_interval=0)
+    fill(writer, 4, prefix="more")
+    writer.delete(["doc0"])
+
+    reader.refresh(force=True)
+    assert reader.count == 5
+    assert "doc0" not in reader and top_id(reader, 3) == "more3"
+
+
+def test_compact_renumbers_rows_and_readers_follow(tmp_path):
+    writer = VectorIndex(str(tmp_path), DIM)
+    fill(writer, 6)
+    reader = VectorIndex(str(tmp_path), DIM, check_interval=0)
+    writer.delete(["doc0", "doc2"])
+    writer.compact()
+
+    assert writer.rows == 4 and writer.count == 4
+    assert top_id(writer, 5) == "doc5"
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".f32")] == [
+        os.path.basename(writer._vectors_path)
+    ]
+
+    generation = reader.generation
+    reader.refresh(force=True)
+    assert reader.generation == generation + 1
+    assert reader.rows == 4 and top_id(reader, 3) == "doc3"
+
+    reopened = VectorIndex(str(tmp_path), DIM)
+    assert [reopened.hit(row)["id"] for row in range(reopened.rows)] == ["doc1", "doc3", "doc4", "doc5"]
+    fill(reopened, 2, prefix="new")
+    assert VectorIndex(str(tmp_path), DIM).count == 6
+
+
+def test_failed_compact_leaves_the_index_intact(tmp_path, monkeypatch):
+    index = VectorIndex(str(tmp_path), DIM)
+    fill(index, 4)
+    index.delete(["doc1"])
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        index.compact()
+    monkeypatch.undo()
+
+    reopened = VectorIndex(str(tmp_path), DIM)
+    assert reopened.count == 3 and reopened.rows == 4
+    assert top_id(reopened, 2) == "doc2"
+
+
+def test_compact_keeps_the_ivf_model(tmp_path):
+    index = VectorIndex(str(tmp_path), DIM)
+    fill(index, 8)
+    index.train_ivf(n_lists=2)
+    index.delete(["doc0"])
+    index.compact()
+
+    reopened = VectorIndex(str(tmp_path), DIM)
+    assert reopened.stats()["ivf_lists"] == 2
+    assert (reopened._assignments[:reopened.rows] >= 0).all()
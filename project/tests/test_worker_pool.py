@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import textwrap
+from worker_pool import WorkerPool
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_workers_do_not_reimport_the_main_module(tmp_path):
+    # Stands in for main.py: every import of it is recorded
+    app = tmp_path / "app.py"
+    app.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {PROJECT_DIR!r})
+        with open({str(tmp_path / "imports")!r}, "a") as f:
+            f.write(__name__ + "\\n")
+        from worker_pool import WorkerPool
+
+        if __name__ == "__main__":
+            pool = WorkerPool(size=1, max_concurrent=1, timeout_s=30)
+            for kind, value in pool.run({str(tmp_path / "script.py")!r}):
+                print(kind, repr(value))
+            pool.shutdown()
+    """))
+    (tmp_path / "script.py").write_text("print('ran')\n")
+    result = subprocess.run([sys.executable, str(app)], cwd=tmp_path, capture_output=True, text=True, timeout=60)
+    assert "stdout 'ran'" in result.stdout, result.stderr
+    assert "exit 0" in result.stdout
+    assert (tmp_path / "imports").read_text().split() == ["__main__"]
+
+
+def test_reports_script_failures(tmp_path):
+    script = tmp_path / "fail.py"
+    script.write_text("raise SystemExit(3)\n")
+    pool = WorkerPool(size=0, max_concurrent=1, timeout_s=30)
+    events = list(pool.run(str(script)))
+    assert events[-1] == ("exit", 3)
+    assert pool.stats()["failed"] == 1
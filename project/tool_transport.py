@@ -0,0 +1,68 @@
+import json
+import uuid
+from typing import Any, Dict, Iterator, Sequence, Tuple
+from utils.audio_utils import read_stream
+
+BINARY_TYPES = (bytes, bytearray, memoryview)
+# Size of the slices binary response parts are written in
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_tool_request(request, binary_fields: Sequence[str]) -> Dict[str, Any]:
+    """Build a tool's input_data from a JSON, multipart or raw binary request.
+
+    multipart/form-data: a 'metadata' field holds the JSON parameters and
+    each file part becomes a memoryview under its field name.
+    application/octet-stream: the body becomes a memoryview under the
+    tool's first binary field; parameters come from the query string, with
+    a 'metadata' query parameter for JSON values.
+    """
+    mimetype = request.mimetype
+    if mimetype == "multipart/form-data":
+        input_data = json.loads(request.form.get("metadata") or "{}")
+        for field, file in request.files.items():
+            input_data[field] = read_stream(file.stream)
+        return input_data
+
+    if mimetype == "application/octet-stream":
+        if not binary_fields:
+            raise ValueError("This tool does not accept binary input")
+        input_data = {key: value for key, value in request.args.items() if key != "metadata"}
+        input_data.update(json.loads(request.args.get("metadata") or "{}"))
+        input_data[binary_fields[0]] = read_stream(request.stream)
+        return input_data
+
+    return request.get_json()
+
+
+def split_binary(result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Separate a tool result into JSON metadata and raw binary fields"""
+    metadata = {key: value for key, value in result.items() if not isinstance(value, BINARY_TYPES)}
+    binary = {key: value for key, value in result.items() if isinstance(value, BINARY_TYPES)}
+    return metadata, binary
+
+
+def iter_multipart(metadata: Dict[str, Any], binary: Dict[str, Any], boundary: str) -> Iterator[bytes]:
+    """Yield a multipart/mixed body: the JSON metadata part, then one part per binary field.
+
+    Binary parts are sliced through a memoryview and sent in
+    STREAM_CHUNK_SIZE pieces, so the whole payload is never copied at once.
+    """
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    yield delimiter
+    yield b"Content-Type: application/json\r\n\r\n"
+    yield json.dumps(metadata).encode("utf-8")
+    for field, value in binary.items():
+        view = memoryview(value).cast("B")
+        yield b"\r\n" + delimiter
+        yield (f"Content-Type: application/octet-stream\r\n"
+               f"Content-Disposition: attachment; name=\"{field}\"\r\n"
+               f"Content-Length: {view.nbytes}\r\n\r\n").encode("ascii")
+        for start in range(0, view.nbytes, STREAM_CHUNK_SIZE):
+            # WSGI servers only accept bytes
+            yield bytes(view[start:start + STREAM_CHUNK_SIZE])
+    yield f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+def new_boundary() -> str:
+    return uuid.uuid4().hex
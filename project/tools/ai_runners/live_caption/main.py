@@ -3,11 +3,11 @@ from agent_registry import AgentRegistry
 from typing import Dict, Any
 
 class LiveCaptionAgent(BaseAgent):
+    name = "Live Caption"
+    description = "Generates real-time captions from audio input"
+
     def __init__(self):
-        super().__init__(
-            name="Live Caption",
-            description="Generates real-time captions from audio input"
-        )
+        super().__init__()
     
     def _get_default_input(self):
         return {
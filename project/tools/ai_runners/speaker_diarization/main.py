@@ -1,34 +1,91 @@
+import logging
 import os
-from faster_whisper import download_model
-import whisperx
-import gc
-import torch
-from typing import Dict, Any
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, Optional
+import numpy as np
 from base_agent import BaseAgent
 from agent_registry import AgentRegistry
-from logger import debug_logger, error_logger
-
+from logger import debug_logger, info_logger, error_logger
+from model_pool import model_pool
+from tools.audio.audio_processing.main import AudioProcessingTool
+from utils.audio_utils import SAMPLE_RATE, iter_array_windows, iter_audio_windows
+from utils.speaker_assignment import UNKNOWN_SPEAKER, Turns, assign_speakers, turns_from_dataframe
+from utils.speaker_tracker import SpeakerTracker
 
+ASR_MODEL = "large-v3"
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+# Bump whenever a change alters the serialized output, to invalidate cached results
+PIPELINE_VERSION = "4"
+# Window length and overlap for streaming mode, in seconds
+STREAM_WINDOW_S = 120
+STREAM_OVERLAP_S = 10
+# Min cosine similarity of speaker embeddings to reuse a speaker from an earlier window
+STREAM_SPEAKER_THRESHOLD = 0.5
+# Cut non-speech out before ASR; segment times are mapped back to the original audio
+TRIM_SILENCE = os.getenv('DIARIZATION_TRIM_SILENCE', '1') == '1'
 
 
 class SpeakerDiarizationAgent(BaseAgent):
+    name = "Speaker Diarization"
+    description = "Transcribes audio with speaker identification"
+
     def __init__(self):
-        super().__init__(
-            name="Speaker Diarization",
-            description="Transcribes audio with speaker identification"
-        )
+        super().__init__()
+        # torch and whisperx are imported on use so that importing this module stays cheap
+        import torch
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.compute_type = "float16" if torch.cuda.is_available() else "int8"
         self.hf_token = os.getenv('HUGGINGFACE_TOKEN')
-        debug_logger.debug(f"Initialized Speaker Diarization agent with device: {self.device}")
+        self.preprocessor = AudioProcessingTool()
+        debug_logger.debug("Initialized Speaker Diarization agent with device: %s", self.device)
+
+    def _asr_key(self):
+        # Language is passed per transcribe call, so one ASR model serves all languages
+        return ("asr", ASR_MODEL, self.device, self.compute_type, "auto")
+
+    def _align_key(self, language_code):
+        return ("align", "default", self.device, "default", language_code)
+
+    def _diarize_key(self):
+        return ("diarize", DIARIZATION_MODEL, self.device, "default", "any")
+
+    def _load_asr(self):
+        import whisperx
+        return whisperx.load_model(ASR_MODEL, self.device, compute_type=self.compute_type)
+
+    def _load_align(self, language_code):
+        import whisperx
+        return whisperx.load_align_model(language_code=language_code, device=self.device)
+
+    def _load_diarizer(self):
+        if not self.hf_token:
+            debug_logger.warning("No Hugging Face token found")
+        import whisperx
+        return whisperx.DiarizationPipeline(
+            model_name=DIARIZATION_MODEL,
+            use_auth_token=self.hf_token,
+            device=self.device
+        )
+
+    def warm_up(self, languages=("en",)):
+        """Load the ASR, alignment and diarization models into the shared pool"""
+        info_logger.info(f"Warming up diarization models for languages: {list(languages)}")
+        model_pool.preload(self._asr_key(), self._load_asr)
+        for language_code in languages:
+            model_pool.preload(self._align_key(language_code),
+                               lambda code=language_code: self._load_align(code))
+        model_pool.preload(self._diarize_key(), self._load_diarizer)
 
     def _serialize_segments(self, segments, diarize_segments):
         """Convert segments and diarization data to JSON-serializable format"""
-        debug_logger.debug(f"Serializing {len(segments)} segments")
+        debug_logger.debug("Serializing %d segments", len(segments))
         try:
             serialized_segments = []
+            # Check the level once instead of building a log record per segment
+            log_each = debug_logger.isEnabledFor(logging.DEBUG)
             for i, segment in enumerate(segments):
-                debug_logger.debug(f"Serializing segment {i+1}/{len(segments)}")
+                if log_each:
+                    debug_logger.debug("Serializing segment %d/%d", i + 1, len(segments))
                 serialized_segment = {
                     "start": float(segment.get("start", 0)),
                     "end": float(segment.get("end", 0)),
@@ -43,85 +100,56 @@ class SpeakerDiarizationAgent(BaseAgent):
             error_logger.error(f"Serialization error: {str(e)}", exc_info=True)
             raise
 
-    def run(self, input_data: Dict[str, Any] = None) -> Dict[str, Any]:
-        debug_logger.debug(f"Run called with input: {input_data}")
+    def run(
+        self,
+        input_data: Dict[str, Any] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Transcribe, align and diarize an audio file.
+
+        input_data holds either audio_path or audio, a 16 kHz mono float32
+        waveform (possibly memory-mapped) that is used without decoding.
+        should_cancel is polled between pipeline stages and on_progress is
+        called with the name of each stage as it starts.
+        """
+        should_cancel = should_cancel or (lambda: False)
+        on_progress = on_progress or (lambda stage: None)
         
-        if not input_data or 'audio_path' not in input_data:
+        if not input_data or ('audio_path' not in input_data and 'audio' not in input_data):
             debug_logger.error("Missing audio_path in input")
             return self._handle_error("Audio path required")
 
-        audio_path = os.path.abspath(input_data['audio_path'])
         language = input_data.get('language', 'auto')
-        debug_logger.debug(f"Processing with language: {language}")
+        trim = bool(input_data.get('trim_silence', TRIM_SILENCE))
+        debug_logger.debug("Processing with language: %s", language)
 
-        if not os.path.exists(audio_path):
-            return self._handle_error(f"Audio file not found at {audio_path}")
+        if 'audio' in input_data:
+            audio_path = None
+        else:
+            debug_logger.debug("Run called with input: %s", input_data)
+            audio_path = os.path.abspath(input_data['audio_path'])
+            if not os.path.exists(audio_path):
+                return self._handle_error(f"Audio file not found at {audio_path}")
 
         try:
-            debug_logger.debug(f"Processing audio file: {audio_path} with language: {language}")
-            
-            debug_logger.debug(f"Model device: {self.device}, compute_type: {self.compute_type}")
-            debug_logger.debug("Loading WhisperX model")
-            model = whisperx.load_model("large-v3", self.device, compute_type=self.compute_type, )
-            debug_logger.debug("WhisperX model loaded successfully")
-            
-            debug_logger.debug(f"Loading audio from path: {audio_path}")
-            audio = whisperx.load_audio(audio_path)
+            if audio_path is None:
+                audio = np.asarray(input_data['audio'], dtype=np.float32)
+            else:
+                debug_logger.debug("Loading audio from path: %s", audio_path)
+                import whisperx
+                audio = whisperx.load_audio(audio_path)
             debug_logger.debug("Audio loaded successfully")
-            
-            debug_logger.debug("Starting transcription")
-            # Use selected language if not auto
-            transcribe_options = {"batch_size": 16}
-            if language != "auto":
-                transcribe_options["language"] = language
-            
-            debug_logger.debug("Starting transcription with options:")
-            debug_logger.debug(f"Transcription options: {transcribe_options}")
-            result = model.transcribe(audio, **transcribe_options)
-            debug_logger.debug(f"Detected language: {result.get('language')}")
-            
-            # Clear GPU memory
-            gc.collect()
-            torch.cuda.empty_cache()
-            del model
-
-            debug_logger.debug("Starting alignment")
-            # Align whisper output
-            model_a, metadata = whisperx.load_align_model(
-                language_code=result["language"], 
-                device=self.device
-            )
-            result = whisperx.align(
-                result["segments"],
-                model_a, 
-                metadata,
-                audio,
-                self.device,
-                return_char_alignments=False
-            )
 
-            # Clear GPU memory again
-            gc.collect()
-            torch.cuda.empty_cache()
-            del model_a
-
-            debug_logger.debug("Starting diarization with HF token")
-            if not self.hf_token:
-                debug_logger.warning("No Hugging Face token found")
-            # Diarize audio
-            diarize_model = whisperx.DiarizationPipeline(
-                use_auth_token=self.hf_token,
-                device=self.device
-            )
-
-            # Get speaker labels
-            diarize_segments = diarize_model(audio)
-            result = whisperx.assign_word_speakers(diarize_segments, result)
+            processed = self._process_audio(audio, language, should_cancel, on_progress, trim)
+            if processed is None:
+                return self._handle_cancel()
+            segments, diarize_segments, _, _ = processed
 
             # Before returning, serialize the data
-            serialized_result = self._serialize_segments(result["segments"], diarize_segments)
+            serialized_result = self._serialize_segments(segments, diarize_segments)
             
-            debug_logger.debug(f"Final result contains {len(serialized_result)} segments")
+            debug_logger.debug("Final result contains %d segments", len(serialized_result))
             debug_logger.debug("Processing complete")
             return {
                 "status": "success",
@@ -132,12 +160,212 @@ class SpeakerDiarizationAgent(BaseAgent):
             error_logger.error(f"Diarization error: {str(e)}", exc_info=True)
             return self._handle_error(str(e))
 
+    def run_stream(
+        self,
+        input_data: Dict[str, Any] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Diarize a recording in overlapping windows, yielding results as they complete.
+
+        Each window is decoded on its own (or sliced from input_data['audio']),
+        so memory stays bounded by the window size. Yields {"status": "partial", ...} per window with the
+        window's segments (in absolute time, with speaker labels consistent
+        across windows), then a final result like run() returns. Speakers are
+        linked across windows by their embeddings, so a speaker who is silent
+        in an overlap keeps their label when they speak again.
+        """
+        should_cancel = should_cancel or (lambda: False)
+        on_progress = on_progress or (lambda stage: None)
+
+        if not input_data or ('audio_path' not in input_data and 'audio' not in input_data):
+            yield self._handle_error("Audio path required")
+            return
+
+        language = input_data.get('language', 'auto')
+        trim = bool(input_data.get('trim_silence', TRIM_SILENCE))
+        window_s = float(input_data.get('window_s', STREAM_WINDOW_S))
+        overlap_s = float(input_data.get('overlap_s', STREAM_OVERLAP_S))
+
+        if 'audio' in input_data:
+            # Slicing a memory-mapped waveform only pages in the current window
+            windows = iter_array_windows(input_data['audio'], window_s, overlap_s)
+        else:
+            debug_logger.debug("Stream run called with input: %s", input_data)
+            audio_path = os.path.abspath(input_data['audio_path'])
+            if not os.path.exists(audio_path):
+                yield self._handle_error(f"Audio file not found at {audio_path}")
+                return
+            windows = iter_audio_windows(audio_path, window_s, overlap_s)
+
+        all_segments = []
+        tracker = SpeakerTracker(threshold=STREAM_SPEAKER_THRESHOLD)
+        try:
+            for index, (start_s, audio, is_last) in enumerate(windows):
+                if should_cancel():
+                    yield self._handle_cancel()
+                    return
+                if len(audio) == 0:
+                    break
+
+                end_s = start_s + len(audio) / SAMPLE_RATE
+                debug_logger.debug("Processing window %s (%.1fs - %.1fs)", index, start_s, end_s)
+                processed = self._process_audio(audio, language, should_cancel, on_progress, trim)
+                if processed is None:
+                    yield self._handle_cancel()
+                    return
+                segments, diarize_segments, speaker_embeddings, detected_language = processed
+                # Keep the language stable across windows once detected
+                language = detected_language
+                mapping = _track_speakers(tracker, turns_from_dataframe(diarize_segments), speaker_embeddings)
+
+                # Each window owns the middle of its overlaps with its neighbours
+                own_start = start_s + overlap_s / 2 if index > 0 else start_s
+                own_end = float("inf") if is_last else end_s - overlap_s / 2
+                window_segments = []
+                for segment in segments:
+                    segment_start = float(segment.get("start", 0)) + start_s
+                    segment_end = float(segment.get("end", 0)) + start_s
+                    if not own_start <= (segment_start + segment_end) / 2 < own_end:
+                        continue
+                    speaker = segment.get("speaker")
+                    window_segments.append({
+                        **segment,
+                        "start": segment_start,
+                        "end": segment_end,
+                        "speaker": mapping.get(speaker, UNKNOWN_SPEAKER) if speaker else UNKNOWN_SPEAKER
+                    })
+
+                serialized = self._serialize_segments(window_segments, diarize_segments)
+                all_segments.extend(serialized)
+                yield {
+                    "status": "partial",
+                    "window": index,
+                    "start": start_s,
+                    "end": end_s,
+                    "segments": serialized
+                }
+                if is_last:
+                    break
+
+            yield {
+                "status": "success",
+                "segments": all_segments
+            }
+
+        except Exception as e:
+            error_logger.error(f"Streaming diarization error: {str(e)}", exc_info=True)
+            yield self._handle_error(str(e))
+
+    def _process_audio(self, audio, language, should_cancel, on_progress, trim=TRIM_SILENCE):
+        """Run transcription, alignment and diarization on an in-memory waveform.
+
+        With trim, silence is removed first and the models only see speech;
+        all returned times are relative to the untrimmed waveform.
+        Returns (segments, diarize_segments, speaker_embeddings,
+        language_code), or None if cancelled between stages;
+        speaker_embeddings maps each diarization label to its embedding.
+        """
+        debug_logger.debug("Model device: %s, compute_type: %s", self.device, self.compute_type)
+
+        time_map = None
+        if trim:
+            on_progress("trimming")
+            duration_s = len(audio) / SAMPLE_RATE
+            audio, time_map = self.preprocessor.process(audio, ["trim_silence"])
+            info_logger.info(f"Trimmed {duration_s - time_map.kept_s:.1f}s of silence from {duration_s:.1f}s")
+            if len(audio) == 0:
+                import pandas as pd
+                return [], pd.DataFrame(columns=["start", "end", "speaker"]), {}, language
+
+        # Use selected language if not auto
+        transcribe_options = {"batch_size": 16}
+        if language != "auto":
+            transcribe_options["language"] = language
+
+        debug_logger.debug("Transcription options: %s", transcribe_options)
+        on_progress("transcribing")
+        with model_pool.lease(self._asr_key(), self._load_asr) as model:
+            result = model.transcribe(audio, **transcribe_options)
+        debug_logger.debug("Detected language: %s", result.get('language'))
+
+        if should_cancel():
+            return None
+        debug_logger.debug("Starting alignment")
+        on_progress("aligning")
+        language_code = result["language"]
+        import whisperx
+        with model_pool.lease(self._align_key(language_code),
+                              lambda: self._load_align(language_code)) as (model_a, metadata):
+            result = whisperx.align(
+                result["segments"],
+                model_a,
+                metadata,
+                audio,
+                self.device,
+                return_char_alignments=False
+            )
+
+        if should_cancel():
+            return None
+        debug_logger.debug("Starting diarization")
+        on_progress("diarizing")
+        with model_pool.lease(self._diarize_key(), self._load_diarizer) as diarize_model:
+            diarize_segments, speaker_embeddings = _diarize(diarize_model, audio)
+        segments = assign_speakers(result["segments"], turns_from_dataframe(diarize_segments), word_level=True)
+        if time_map is not None:
+            time_map.remap_segments(segments)
+            diarize_segments["start"] = time_map.to_original(diarize_segments["start"].to_numpy())
+            diarize_segments["end"] = time_map.to_original(diarize_segments["end"].to_numpy(), is_end=True)
+        return segments, diarize_segments, speaker_embeddings, language_code
+
     def _handle_error(self, message: str) -> Dict[str, Any]:
         return {
             "status": "error",
             "message": message
         }
 
+    def _handle_cancel(self) -> Dict[str, Any]:
+        debug_logger.debug("Diarization cancelled")
+        return {
+            "status": "cancelled",
+            "message": "Diarization cancelled"
+        }
+
+def _diarize(diarize_model, audio):
+    """Run a whisperx DiarizationPipeline, keeping the speaker embeddings pyannote computes.
+
+    Returns the turns as the DataFrame whisperx builds and {label: embedding}.
+    """
+    import pandas as pd
+    import torch
+    waveform = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)[None, :])
+    annotation, embeddings = diarize_model.model({"waveform": waveform, "sample_rate": SAMPLE_RATE},
+                                                 return_embeddings=True)
+    diarize_segments = pd.DataFrame(annotation.itertracks(yield_label=True), columns=["segment", "label", "speaker"])
+    diarize_segments["start"] = [segment.start for segment in diarize_segments["segment"]]
+    diarize_segments["end"] = [segment.end for segment in diarize_segments["segment"]]
+    # pyannote returns one embedding row per label, in the order of labels()
+    return diarize_segments, dict(zip(annotation.labels(), embeddings))
+
+def _track_speakers(tracker: SpeakerTracker, turns: Turns, speaker_embeddings) -> Dict[str, str]:
+    """Map a window's local speaker labels to labels that are stable across windows.
+
+    Each local speaker is matched to the tracker's centroids by its
+    embedding, weighted by how long it speaks in the window. Speakers
+    without an embedding map to UNKNOWN.
+    """
+    durations = defaultdict(float)
+    for start, end, label in zip(*turns):
+        durations[label] += float(end - start)
+    labels = [label for label in durations if speaker_embeddings.get(label) is not None]
+    mapping = {label: UNKNOWN_SPEAKER for label in durations}
+    if labels:
+        embeddings = np.stack([np.asarray(speaker_embeddings[label], dtype=np.float64) for label in labels])
+        mapping.update(tracker.update(labels, embeddings, [durations[label] for label in labels],
+                                      unknown=UNKNOWN_SPEAKER))
+    return mapping
+
 # Register the agent
 AgentRegistry.register(SpeakerDiarizationAgent)
 
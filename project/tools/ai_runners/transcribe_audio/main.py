@@ -1,15 +1,15 @@
-import pyaudio
 from typing import Dict, Any
 from base_agent import BaseAgent
 from agent_registry import AgentRegistry
 
 class TranscribeAudioAgent(BaseAgent):
+    name = "Audio Transcription"
+    description = "Transcribes audio files to text"
+
     def __init__(self):
-        super().__init__(
-            name="Audio Transcription",
-            description="Transcribes audio files to text"
-        )
-        self.p = pyaudio.PyAudio()
+        super().__init__()
+        # Opened in run(), so constructing the agent does not start a host audio session
+        self.p = None
     
     def list_input_devices(self):
         devices = []
@@ -51,6 +51,9 @@ class TranscribeAudioAgent(BaseAgent):
             return self._handle_error("Invalid input parameters")
 
         self.pre_run()
+        # Imported here so registering the agent does not load PortAudio
+        import pyaudio
+        self.p = pyaudio.PyAudio()
         try:
             devices = self.list_input_devices()
             output = self._create_output(devices)
@@ -62,6 +65,7 @@ class TranscribeAudioAgent(BaseAgent):
         finally:
             self.post_run()
             self.p.terminate()
+            self.p = None
 
 # Register the agent
 AgentRegistry.register(TranscribeAudioAgent)
@@ -0,0 +1,86 @@
+import base64
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from base_tool import BaseTool
+from tools_registry import ToolRegistry
+from logger import debug_logger, info_logger, error_logger
+from utils.audio_utils import SAMPLE_RATE, decode_audio, encode_wav
+from utils.audio_processing import TimeMap, normalize, reduce_noise, trim_silence
+
+
+class AudioProcessingTool(BaseTool):
+    name = "Audio Processing"
+    description = "Normalizes, denoises or trims silence from audio"
+    binary_fields = ("audio_data",)
+
+    def process(
+        self,
+        audio: np.ndarray,
+        operations: Sequence[str],
+        parameters: Optional[Dict[str, Any]] = None,
+        sr: int = SAMPLE_RATE
+    ) -> Tuple[np.ndarray, TimeMap]:
+        """Apply operations in order to a float32 waveform.
+
+        Returns the processed audio and a TimeMap from its timeline back to
+        the input's, so it can run as a stage in front of transcription.
+        """
+        parameters = parameters or {}
+        if list(operations).count("trim_silence") > 1:
+            raise ValueError("trim_silence can only be applied once")
+        time_map = TimeMap.identity(len(audio) / sr)
+        for operation in operations:
+            if operation == "normalize":
+                audio = normalize(audio, target_db=parameters.get("target_db", -20.0))
+            elif operation == "noise_reduction":
+                audio = reduce_noise(audio, noise_threshold=parameters.get("noise_threshold", 6.0))
+            elif operation == "trim_silence":
+                vad_options = {key: parameters[key] for key in ("threshold_db", "min_silence_ms", "padding_ms")
+                               if key in parameters}
+                duration_s = len(audio) / sr
+                audio, time_map = trim_silence(audio, sr, **vad_options)
+                debug_logger.debug("Kept %.1fs of speech out of %.1fs", time_map.kept_s, duration_s)
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+        return audio, time_map
+
+    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one operation on audio_data.
+
+        audio_data may be a base64 string, a raw encoded file as a bytes-like
+        buffer, or a decoded float32 NumPy waveform. processed_audio is
+        returned in the same form: base64 WAV, WAV bytes or a NumPy array.
+        """
+        if not self.validate_inputs(input_data):
+            return {"status": "error", "message": "Invalid input"}
+        operation = input_data["operation"]
+        audio_data = input_data["audio_data"]
+        try:
+            if isinstance(audio_data, np.ndarray):
+                audio = audio_data
+            elif isinstance(audio_data, str):
+                audio = decode_audio(memoryview(base64.b64decode(audio_data)))
+            else:
+                audio = decode_audio(memoryview(audio_data))
+            processed, time_map = self.process(audio, [operation], input_data.get("parameters"))
+            info_logger.info(f"Applied {operation} to {len(audio) / SAMPLE_RATE:.1f}s of audio")
+
+            if isinstance(audio_data, np.ndarray):
+                processed_audio = processed
+            elif isinstance(audio_data, str):
+                processed_audio = base64.b64encode(encode_wav(processed)).decode("ascii")
+            else:
+                processed_audio = encode_wav(processed)
+            return {
+                "status": "success",
+                "message": f"Applied {operation}",
+                "processed_audio": processed_audio,
+                "time_map": time_map.to_list()
+            }
+        except Exception as e:
+            error_logger.error(f"Audio processing error: {str(e)}", exc_info=True)
+            return {"status": "error", "message": str(e)}
+
+
+# Register the tool
+ToolRegistry.register(AudioProcessingTool)
@@ -1,14 +1,16 @@
 
-from typing import Dict, Type
+from typing import Any, Dict, Optional, Type
 from base_tool import BaseTool
 
 class ToolRegistry:
     _tools: Dict[str, Type[BaseTool]] = {}
+    _metadata: Dict[str, Dict[str, Any]] = {}
 
     @classmethod
     def register(cls, tool_class: Type[BaseTool]) -> None:
         """Register a new tool class"""
         cls._tools[tool_class.__name__] = tool_class
+        cls._metadata[tool_class.__name__] = tool_class.get_class_metadata()
         
     @classmethod
     def get_tool(cls, tool_name: str) -> Type[BaseTool]:
@@ -18,4 +20,14 @@ class ToolRegistry:
     @classmethod
     def get_all_tools(cls) -> Dict[str, Type[BaseTool]]:
         """Get all registered tools"""
-        return cls._tools
\ No newline at end of file
+        return cls._tools
+
+    @classmethod
+    def get_metadata(cls, tool_name: str) -> Optional[Dict[str, Any]]:
+        """Get precomputed tool metadata by name"""
+        return cls._metadata.get(tool_name)
+
+    @classmethod
+    def get_all_metadata(cls) -> Dict[str, Dict[str, Any]]:
+        """Get precomputed metadata for all registered tools"""
+        return cls._metadata
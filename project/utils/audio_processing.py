@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from utils.audio_utils import SAMPLE_RATE
+
+FRAME_MS = 30
+# Adaptive VAD threshold: this far above the noise floor, clamped to [MIN, MAX]
+VAD_MARGIN_DB = 12.0
+VAD_MIN_THRESHOLD_DB = -60.0
+# Even in a recording that is speech throughout, anything louder than this is kept
+VAD_MAX_THRESHOLD_DB = -45.0
+# The noise floor is the quietest of these windows' mean levels
+NOISE_FLOOR_WINDOW_MS = 500
+NOISE_FFT_SIZE = 512
+NOISE_HOP = 128
+EPS = 1e-10
+
+
+def frame_rms_db(audio: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS level in dBFS of consecutive non-overlapping frames; a partial last frame is zero-padded"""
+    n_frames = -(-len(audio) // frame_len)
+    frames = np.zeros(n_frames * frame_len, dtype=np.float32)
+    frames[:len(audio)] = audio
+    frames = frames.reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(rms + EPS)
+
+
+def noise_floor_db(levels: np.ndarray, frame_ms: int = FRAME_MS) -> float:
+    """Estimate the noise floor from frame levels: the quietest NOISE_FLOOR_WINDOW_MS window.
+
+    Averaging power over windows keeps single quiet frames (plosive gaps,
+    zero padding) from passing for the floor.
+    """
+    per_window = min(max(1, NOISE_FLOOR_WINDOW_MS // frame_ms), len(levels))
+    n_windows = len(levels) // per_window
+    power = np.power(10.0, levels[:n_windows * per_window] / 10)
+    window_power = power.reshape(n_windows, per_window).mean(axis=1)
+    return float(10 * np.log10(window_power.min() + EPS))
+
+
+def detect_speech(
+    audio: np.ndarray,
+    sr: int = SAMPLE_RATE,
+    threshold_db: Optional[float] = None,
+    frame_ms: int = FRAME_MS,
+    min_silence_ms: int = 500,
+    padding_ms: int = 200
+) -> np.ndarray:
+    """Find voiced regions with a frame-energy VAD.
+
+    Returns an (n, 2) array of [start, end) sample indices. Without
+    threshold_db the threshold adapts to the recording's noise floor (the
+    quietest half-second window), kept between VAD_MIN_THRESHOLD_DB and
+    VAD_MAX_THRESHOLD_DB so quiet speakers in recordings with little
+    silence are not cut. Regions are padded by padding_ms and gaps
+    shorter than min_silence_ms are kept, so words are not clipped.
+    """
+    if len(audio) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    levels = frame_rms_db(audio, frame_len)
+    if threshold_db is None:
+        threshold_db = float(np.clip(noise_floor_db(levels, frame_ms) + VAD_MARGIN_DB,
+                                     VAD_MIN_THRESHOLD_DB, VAD_MAX_THRESHOLD_DB))
+    voiced = levels > threshold_db
+
+    # Dilate voiced frames by the padding with a moving-window sum
+    pad = int(padding_ms / frame_ms)
+    if pad:
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) > 1:
+        keep_gap = (starts[1:] - ends[:-1]) * frame_ms >= min_silence_ms
+        starts = starts[np.concatenate(([True], keep_gap))]
+        ends = ends[np.concatenate((keep_gap, [True]))]
+    regions = np.stack((starts, ends), axis=1).astype(np.int64) * frame_len
+    return np.minimum(regions, len(audio))
+
+
+class TimeMap:
+    """Remap table from times in processed (trimmed) audio to times in the original.
+
+    Each kept region is a row of (original_start, trimmed_start, duration)
+    in seconds; lookups are a binary search over trimmed_start.
+    """
+
+    def __init__(self, original_starts: Sequence[float], trimmed_starts: Sequence[float],
+                 durations: Sequence[float]):
+        self.original_starts = np.asarray(original_starts, dtype=np.float64)
+        self.trimmed_starts = np.asarray(trimmed_starts, dtype=np.float64)
+        self.durations = np.asarray(durations, dtype=np.float64)
+
+    @classmethod
+    def identity(cls, duration_s: float) -> "TimeMap":
+        return cls([0.0], [0.0], [duration_s])
+
+    @classmethod
+    def from_regions(cls, regions: np.ndarray, sr: int = SAMPLE_RATE) -> "TimeMap":
+        lengths = (regions[:, 1] - regions[:, 0]) / sr
+        trimmed_starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        return cls(regions[:, 0] / sr, trimmed_starts, lengths)
+
+    @property
+    def kept_s(self) -> float:
+        return float(self.durations.sum())
+
+    def to_original(self, times, is_end: bool = False) -> np.ndarray:
+        """Map trimmed times to original times.
+
+        A time exactly on a region boundary maps to the start of the later
+        region, or with is_end to the end of the earlier one.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if len(self.trimmed_starts) == 0:
+            return times
+        side = "left" if is_end else "right"
+        idx = np.clip(np.searchsorted(self.trimmed_starts, times, side=side) - 1, 0, None)
+        return self.original_starts[idx] + (times - self.trimmed_starts[idx])
+
+    def remap_segments(self, segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rewrite start/end of segments and their words, in place"""
+        for items in [segments] + [segment.get("words") or [] for segment in segments]:
+            for key, is_end in (("start", False), ("end", True)):
+                indices = [i for i, item in enumerate(items) if item.get(key) is not None]
+                if not indices:
+                    continue
+                mapped = self.to_original([items[i][key] for i in indices], is_end=is_end)
+                for i, value in zip(indices, mapped):
+                    items[i][key] = float(value)
+        return segments
+
+    def to_list(self) -> List[Dict[str, float]]:
+        return [
+            {"original_start": float(o), "trimmed_start": float(t), "duration": float(d)}
+            for o, t, d in zip(self.original_starts, self.trimmed_starts, self.durations)
+        ]
+
+
+def trim_silence(audio: np.ndarray, sr: int = SAMPLE_RATE, **vad_options) -> "tuple[np.ndarray, TimeMap]":
+    """Drop non-speech regions; returns the trimmed audio and its TimeMap"""
+    regions = detect_speech(audio, sr, **vad_options)
+    if len(regions) == 0:
+        return np.empty(0, dtype=np.float32), TimeMap([], [], [])
+    # Gather all kept samples with one fancy-index instead of concatenating slices
+    lengths = regions[:, 1] - regions[:, 0]
+    offsets = np.repeat(regions[:, 0] - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    indices = np.arange(int(lengths.sum())) + offsets
+    return np.asarray(audio[indices], dtype=np.float32), TimeMap.from_regions(regions, sr)
+
+
+def normalize(audio: np.ndarray, target_db: float = -20.0, peak_limit: float = 0.99) -> np.ndarray:
+    """Scale to a target RMS level in dBFS, limited so the peak stays below peak_limit"""
+    if len(audio) == 0:
+        return np.asarray(audio, dtype=np.float32)
+    rms = np.sqrt(np.mean(np.square(audio, dtype=np.float64)))
+    peak = float(np.max(np.abs(audio)))
+    if peak < EPS:
+        return np.asarray(audio, dtype=np.float32)
+    gain = min(10 ** ((target_db - 20 * np.log10(rms + EPS)) / 20), peak_limit / peak)
+    return (audio * gain).astype(np.float32)
+
+
+def reduce_noise(
+    audio: np.ndarray,
+    noise_threshold: float = 6.0,
+    attenuation: float = 0.1,
+    n_fft: int = NOISE_FFT_SIZE,
+    hop: int = NOISE_HOP
+) -> np.ndarray:
+    """Spectral gating: attenuate STFT bins less than noise_threshold dB above the noise profile.
+
+    The noise profile is the mean spectrum of the quietest 20% of frames.
+    The STFT, gating and overlap-add are all done on whole arrays.
+    """
+    n = len(audio)
+    if n == 0:
+        return np.asarray(audio, dtype=np.float32)
+    # Periodic Hann window; its squares overlap-add to a constant for hop <= n_fft / 2
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    # Pad both ends by n_fft so every sample is covered by full window overlap
+    n_frames = -(-(n + n_fft) // hop) + 1
+    padded = np.zeros((n_frames - 1) * hop + n_fft, dtype=np.float32)
+    padded[n_fft:n_fft + n] = audio
+
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop] * window
+    spectrum = np.fft.rfft(frames, axis=1)
+    magnitude = np.abs(spectrum)
+
+    # Estimate the noise profile from frames that lie entirely inside the signal
+    inner = magnitude[n_fft // hop:n // hop + 1]
+    if len(inner) == 0:
+        inner = magnitude
+    frame_energy = inner.mean(axis=1)
+    noise_profile = inner[frame_energy <= np.percentile(frame_energy, 20)].mean(axis=0)
+    gate = noise_profile * 10 ** (noise_threshold / 20)
+    gain = np.where(magnitude > gate, 1.0, attenuation)
+
+    cleaned = np.fft.irfft(spectrum * gain, n=n_fft, axis=1) * window
+    positions = (np.arange(n_frames)[:, None] * hop + np.arange(n_fft)).ravel()
+    out = np.bincount(positions, weights=cleaned.ravel(), minlength=len(padded))
+    norm = np.bincount(positions, weights=np.tile(window ** 2, n_frames), minlength=len(padded))
+    return (out / np.maximum(norm, EPS))[n_fft:n_fft + n].astype(np.float32)
@@ -0,0 +1,277 @@
+import io
+import math
+import os
+import struct
+import subprocess
+import threading
+import wave
+from typing import BinaryIO, Iterator, Optional, Tuple
+import numpy as np
+
+SAMPLE_RATE = 16000
+# Resampling filter: input taps on each side per output sample, Kaiser beta, cutoff as a fraction of Nyquist
+RESAMPLE_HALF_TAPS = 16
+RESAMPLE_KAISER_BETA = 8.6
+RESAMPLE_ROLLOFF = 0.94
+RESAMPLE_CHUNK = 1 << 16
+
+
+def load_audio_window(path: str, start_s: float, duration_s: float, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode [start_s, start_s + duration_s) of a file to mono float32 PCM with ffmpeg.
+
+    Only the requested window is decoded, so memory use does not depend on
+    the length of the recording.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-ss", f"{start_s:.3f}", "-t", f"{duration_s:.3f}",
+        "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def iter_audio_windows(
+    path: str,
+    window_s: float,
+    overlap_s: float,
+    sr: int = SAMPLE_RATE
+) -> Iterator[Tuple[float, np.ndarray, bool]]:
+    """Yield (start_s, audio, is_last) for overlapping windows over a file.
+
+    Consecutive windows share overlap_s seconds. A window shorter than
+    window_s marks the end of the file.
+    """
+    if overlap_s >= window_s:
+        raise ValueError("overlap_s must be smaller than window_s")
+    hop_s = window_s - overlap_s
+    start_s = 0.0
+    while True:
+        audio = load_audio_window(path, start_s, window_s, sr)
+        is_last = len(audio) < int(window_s * sr)
+        yield start_s, audio, is_last
+        if is_last:
+            return
+        start_s += hop_s
+
+
+def iter_array_windows(
+    audio: np.ndarray,
+    window_s: float,
+    overlap_s: float,
+    sr: int = SAMPLE_RATE
+) -> Iterator[Tuple[float, np.ndarray, bool]]:
+    """Yield (start_s, audio, is_last) windows over an in-memory or memory-mapped waveform.
+
+    Only the current window is materialized as float32, so a memory-mapped
+    .npy file is paged in one window at a time.
+    """
+    if overlap_s >= window_s:
+        raise ValueError("overlap_s must be smaller than window_s")
+    window = int(window_s * sr)
+    hop = int((window_s - overlap_s) * sr)
+    start = 0
+    while True:
+        chunk = np.asarray(audio[start:start + window], dtype=np.float32)
+        is_last = start + window >= len(audio)
+        yield start / sr, chunk, is_last
+        if is_last:
+            return
+        start += hop
+
+
+def read_stream(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> memoryview:
+    """Return the contents of a binary stream, without copying in-memory buffers"""
+    if hasattr(stream, "getbuffer"):
+        return stream.getbuffer()
+    data = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        data += chunk
+    return memoryview(data)
+
+
+def _resample_filter(up: int, down: int) -> np.ndarray:
+    """Polyphase low-pass table: row p weights the input window for an output at phase p"""
+    half = int(math.ceil(RESAMPLE_HALF_TAPS * max(1.0, down / up)))
+    cutoff = RESAMPLE_ROLLOFF * 0.5 / max(up, down)
+    # Offsets, on the upsampled grid, of each tap from the output sample
+    t = np.arange(up)[:, None] + (half - 1 - np.arange(2 * half))[None, :] * up
+    window = np.i0(RESAMPLE_KAISER_BETA * np.sqrt(np.clip(1 - (t / (half * up)) ** 2, 0, None)))
+    taps = np.sinc(2 * cutoff * t) * window
+    # Unity gain at DC for every phase
+    return (taps / taps.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Resample a mono waveform with a polyphase windowed-sinc filter in NumPy.
+
+    The filter cuts off just below the lower of the two Nyquist rates, so
+    content that would alias when downsampling is removed first. Outputs
+    are computed RESAMPLE_CHUNK rows at a time to bound memory.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr:
+        return audio
+    g = math.gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    table = _resample_filter(up, down)
+    half = table.shape[1] // 2
+    padded = np.concatenate((np.zeros(half - 1, np.float32), audio, np.zeros(half, np.float32)))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half)
+    n_out = int(round(len(audio) * target_sr / orig_sr))
+    out = np.empty(n_out, dtype=np.float32)
+    # Every up-th output shares a phase and steps down input samples, so each phase is one strided matmul
+    for first in range(min(up, n_out)):
+        rows = windows[first * down // up::down]
+        weights = table[first * down % up]
+        count = len(range(first, n_out, up))
+        for start in range(0, count, RESAMPLE_CHUNK):
+            stop = min(start + RESAMPLE_CHUNK, count)
+            out[first + start * up:first + stop * up:up] = rows[start:stop] @ weights
+    return out
+
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _decode_wav(data: memoryview, sr: int) -> Optional[np.ndarray]:
+    """Decode a PCM or float WAV file in-process, or return None if it needs ffmpeg.
+
+    The RIFF chunks are walked directly so the samples are read from data
+    in place; the only copy is the conversion to float32.
+    """
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", data, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The real format code starts the SubFormat GUID
+                (sub_format,) = struct.unpack_from("<H", data, body + 24)
+                fmt = (sub_format,) + fmt[1:]
+        elif chunk_id == b"data" and fmt is not None:
+            format_code, channels, orig_sr, _, block_align, bits = fmt
+            if channels <= 0 or orig_sr <= 0 or bits <= 0 or block_align != channels * bits // 8:
+                # Inconsistent header; ffmpeg copes with (or rejects) it
+                return None
+            n_frames = min(chunk_size, len(data) - body) // block_align
+            count = n_frames * channels
+            if format_code == WAVE_FORMAT_PCM and bits == 8:
+                audio = (np.frombuffer(data, np.uint8, count, body).astype(np.float32) - 128.0) / 128.0
+            elif format_code == WAVE_FORMAT_PCM and bits == 16:
+                audio = np.frombuffer(data, "<i2", count, body).astype(np.float32) / 32768.0
+            elif format_code == WAVE_FORMAT_PCM and bits == 32:
+                audio = np.frombuffer(data, "<i4", count, body).astype(np.float32) / 2147483648.0
+            elif format_code == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                audio = np.frombuffer(data, "<f4", count, body).astype(np.float32)
+            else:
+                return None
+            if channels > 1:
+                audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            return resample(audio, orig_sr, sr)
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _decode_ffmpeg(data: memoryview, sr: int) -> np.ndarray:
+    """Decode any ffmpeg-supported format by piping bytes through stdin/stdout"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        "pipe:1"
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(data: memoryview, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode encoded audio bytes to mono float32 PCM at sr, without temp files.
+
+    PCM WAV is parsed and resampled in-process; other formats are piped
+    through ffmpeg.
+    """
+    if bytes(data[:4]) == b"RIFF" and bytes(data[8:12]) == b"WAVE":
+        audio = _decode_wav(data, sr)
+        if audio is not None:
+            return audio
+    return _decode_ffmpeg(data, sr)
+
+
+def load_or_decode_pcm(data: memoryview, content_hash: str, pcm_dir: Optional[str] = None,
+                       sr: int = SAMPLE_RATE, max_bytes: Optional[int] = None) -> np.ndarray:
+    """Decode audio, reusing a memory-mapped .npy copy in pcm_dir when one exists.
+
+    Without pcm_dir the decoded waveform is returned in memory. With
+    max_bytes, the least recently used .npy files (by mtime, refreshed on
+    reuse) are removed once the directory grows past it.
+    """
+    if not pcm_dir:
+        return decode_audio(data, sr)
+
+    path = os.path.join(pcm_dir, f"{content_hash}_{sr}.npy")
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        audio = decode_audio(data, sr)
+        os.makedirs(pcm_dir, exist_ok=True)
+        # Unique per thread: job workers in one process may decode the same upload at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp_path, audio)
+        os.replace(tmp_path, path)
+        if max_bytes is not None:
+            evict_pcm_files(pcm_dir, max_bytes, keep=path)
+    return np.load(path, mmap_mode="r")
+
+
+def evict_pcm_files(pcm_dir: str, max_bytes: int, keep: Optional[str] = None) -> int:
+    """Remove the oldest .npy files in pcm_dir until it holds at most max_bytes; returns how many"""
+    entries = sorted(
+        (entry for entry in os.scandir(pcm_dir) if entry.name.endswith(".npy") and ".tmp." not in entry.name),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    total = sum(entry.stat().st_size for entry in entries)
+    removed = 0
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry.path == keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            # Jobs still reading a removed file keep their mapping on POSIX
+            os.remove(entry.path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def encode_wav(audio: np.ndarray, sr: int = SAMPLE_RATE) -> bytes:
+    """Encode a mono float32 waveform as a 16-bit PCM WAV file"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sr)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
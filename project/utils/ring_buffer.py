@@ -0,0 +1,95 @@
+import threading
+from typing import Optional
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size single-producer/single-consumer audio ring buffer.
+
+    Storage is preallocated and mirrored (every sample is written at i and
+    i + capacity), so any window of up to capacity samples is one contiguous
+    slice and can be returned as a view without copying. The writer never
+    allocates; when it laps the reader, the oldest unread samples are
+    dropped and counted as an overrun.
+
+    Windows are window_size samples long and start hop samples apart, so
+    consecutive windows overlap by window_size - hop samples.
+    """
+
+    def __init__(self, capacity: int, window_size: int, hop: Optional[int] = None, dtype=np.int16):
+        hop = window_size if hop is None else hop
+        if not 0 < hop <= window_size <= capacity:
+            raise ValueError("Require 0 < hop <= window_size <= capacity")
+        self.capacity = capacity
+        self.window_size = window_size
+        self.hop = hop
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        # Monotonic sample counters; positions in storage are counter % capacity
+        self._written = 0
+        self._read = 0
+        self._ready = threading.Condition(threading.Lock())
+        self.overruns = 0
+        self.dropped_samples = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples. Called from the capture thread; never allocates."""
+        n = len(samples)
+        if n > self.capacity:
+            self.dropped_samples += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        pos = self._written % self.capacity
+        first = min(n, self.capacity - pos)
+        self._data[pos:pos + first] = samples[:first]
+        self._data[pos + self.capacity:pos + self.capacity + first] = samples[:first]
+        if first < n:
+            rest = n - first
+            self._data[:rest] = samples[first:]
+            self._data[self.capacity:self.capacity + rest] = samples[first:]
+
+        with self._ready:
+            self._written += n
+            unread = self._written - self._read
+            if unread > self.capacity:
+                # Writer lapped the reader: skip ahead to whole hops of fresh data
+                lost = unread - self.capacity
+                lost += (-lost) % self.hop
+                self._read += lost
+                self.overruns += 1
+                self.dropped_samples += lost
+            if self._written - self._read >= self.window_size:
+                self._ready.notify()
+
+    def available(self) -> int:
+        return self._written - self._read
+
+    def read_window(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """Return a view of the next window, or None if none is ready within timeout.
+
+        The view stays valid until the writer wraps around to it, so callers
+        should copy it (e.g. astype) before doing slow work on it; call
+        advance() once done to move on by one hop.
+        """
+        with self._ready:
+            if self._written - self._read < self.window_size:
+                self._ready.wait(timeout)
+            if self._written - self._read < self.window_size:
+                return None
+            start = self._read % self.capacity
+        return self._data[start:start + self.window_size]
+
+    def advance(self) -> None:
+        """Release the current window by moving the read position one hop forward"""
+        with self._ready:
+            self._read += self.hop
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "window_size": self.window_size,
+            "hop": self.hop,
+            "available": self.available(),
+            "overruns": self.overruns,
+            "dropped_samples": self.dropped_samples,
+        }
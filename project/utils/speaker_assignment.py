@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+UNKNOWN_SPEAKER = "UNKNOWN"
+
+# (starts, ends, labels) of diarization turns
+Turns = Tuple[np.ndarray, np.ndarray, List[str]]
+
+
+def turns_from_annotation(annotation) -> Turns:
+    """Build turn arrays from a pyannote Annotation"""
+    tracks = [(turn.start, turn.end, str(speaker)) for turn, _, speaker in annotation.itertracks(yield_label=True)]
+    return _turns_from_tuples(tracks)
+
+
+def turns_from_dataframe(diarize_segments) -> Turns:
+    """Build turn arrays from a whisperx diarization DataFrame"""
+    return (
+        diarize_segments["start"].to_numpy(dtype=np.float64),
+        diarize_segments["end"].to_numpy(dtype=np.float64),
+        [str(label) for label in diarize_segments["speaker"]],
+    )
+
+
+def _turns_from_tuples(tracks: Sequence[Tuple[float, float, str]]) -> Turns:
+    if not tracks:
+        return np.empty(0), np.empty(0), []
+    starts, ends, labels = zip(*tracks)
+    return np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64), list(labels)
+
+
+def dominant_speakers(
+    starts: Sequence[float],
+    ends: Sequence[float],
+    turns: Turns,
+    unknown: str = UNKNOWN_SPEAKER
+) -> List[str]:
+    """Return the speaker with the most overlap for each [start, end) interval.
+
+    Only (interval, turn) pairs that can overlap are visited: with turns
+    sorted by start, the candidates for an interval are a contiguous range
+    found by binary search on turn starts and on the running maximum of
+    turn ends. The whole computation is vectorized, so the cost is
+    O((intervals + turns) log turns + overlapping pairs) with no Python loop.
+    Intervals with a NaN bound or no overlap get the unknown label.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    turn_starts, turn_ends, turn_labels = turns
+    if len(starts) == 0:
+        return []
+    if len(turn_starts) == 0:
+        return [unknown] * len(starts)
+
+    order = np.argsort(turn_starts, kind="stable")
+    turn_starts = np.asarray(turn_starts, dtype=np.float64)[order]
+    turn_ends = np.asarray(turn_ends, dtype=np.float64)[order]
+    speakers, speaker_ids = np.unique(np.asarray(turn_labels, dtype=object)[order].astype(str), return_inverse=True)
+
+    # Candidate turns for interval i are [lo[i], hi[i])
+    hi = np.searchsorted(turn_starts, ends, side="left")
+    lo = np.searchsorted(np.maximum.accumulate(turn_ends), starts, side="right")
+    valid = ~(np.isnan(starts) | np.isnan(ends))
+    counts = np.where(valid, np.clip(hi - lo, 0, None), 0)
+
+    total = int(counts.sum())
+    overlap = np.zeros((len(starts), len(speakers)))
+    if total:
+        interval_idx = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        turn_idx = np.repeat(lo, counts) + offsets
+        duration = (np.minimum(ends[interval_idx], turn_ends[turn_idx])
+                    - np.maximum(starts[interval_idx], turn_starts[turn_idx]))
+        np.add.at(overlap, (interval_idx, speaker_ids[turn_idx]), np.clip(duration, 0, None))
+
+    best = overlap.argmax(axis=1)
+    has_overlap = overlap[np.arange(len(starts)), best] > 0
+    return [str(speakers[b]) if ok else unknown for b, ok in zip(best, has_overlap)]
+
+
+def assign_speakers(
+    segments: List[Dict[str, Any]],
+    turns: Turns,
+    word_level: bool = True,
+    unknown: str = UNKNOWN_SPEAKER
+) -> List[Dict[str, Any]]:
+    """Set a "speaker" key on each segment dict, and on its words if word_level.
+
+    Segments and words use "start"/"end" keys; words without timestamps
+    inherit the speaker of their segment. Segments are updated in place and
+    also returned.
+    """
+    if not segments:
+        return segments
+
+    segment_speakers = dominant_speakers(
+        [s.get("start", np.nan) for s in segments],
+        [s.get("end", np.nan) for s in segments],
+        turns,
+        unknown
+    )
+    for segment, speaker in zip(segments, segment_speakers):
+        if speaker != unknown:
+            segment["speaker"] = speaker
+
+    if word_level:
+        words = [(segment, word) for segment in segments for word in segment.get("words", [])]
+        word_speakers = dominant_speakers(
+            [w.get("start", np.nan) for _, w in words],
+            [w.get("end", np.nan) for _, w in words],
+            turns,
+            unknown
+        )
+        for (segment, word), speaker in zip(words, word_speakers):
+            if speaker != unknown:
+                word["speaker"] = speaker
+            elif "speaker" in segment:
+                word["speaker"] = segment["speaker"]
+    return segments
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+class SpeakerTracker:
+    """Keeps speaker labels stable across independently diarized chunks.
+
+    Each global speaker is represented by a running centroid of its
+    speaker embeddings. The speakers of a new chunk are matched to the
+    centroids by cosine similarity (one-to-one, best pairs first); matches
+    update their centroid online and unmatched speakers start a new one.
+    The cost per chunk depends only on the number of speakers, not on how
+    much audio has been processed.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        max_speakers: int = 32,
+        max_weight: float = 120.0,
+        label_format: str = "SPEAKER_{:02d}"
+    ):
+        # threshold: minimum cosine similarity to reuse an existing speaker
+        # max_weight: cap on accumulated weight (seconds of speech), so
+        # centroids keep adapting slowly instead of freezing
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.max_weight = max_weight
+        self.label_format = label_format
+        self._centroids: Optional[np.ndarray] = None
+        self._weights = np.zeros(0)
+        self.labels: List[str] = []
+
+    def update(
+        self,
+        local_labels: Sequence[str],
+        embeddings: np.ndarray,
+        durations: Optional[Sequence[float]] = None,
+        unknown: str = "UNKNOWN"
+    ) -> Dict[str, str]:
+        """Map a chunk's local speaker labels to global labels and update centroids.
+
+        embeddings has one row per local label. Rows containing NaN (pyannote
+        emits these for speakers with too little speech) map to unknown.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        if durations is None:
+            durations = np.ones(len(local_labels))
+        durations = np.maximum(np.asarray(durations, dtype=np.float64), 1e-3)
+
+        mapping = {label: unknown for label in local_labels}
+        valid = [i for i in range(len(local_labels)) if np.all(np.isfinite(embeddings[i]))]
+        if not valid:
+            return mapping
+
+        vectors = _normalize(embeddings[valid])
+        unmatched = set(range(len(valid)))
+        if self._centroids is not None and len(self._centroids):
+            similarity = vectors @ _normalize(self._centroids).T
+            used = set()
+            for flat in np.argsort(similarity, axis=None)[::-1]:
+                row, col = np.unravel_index(flat, similarity.shape)
+                if similarity[row, col] < self.threshold:
+                    break
+                if row not in unmatched or col in used:
+                    continue
+                unmatched.discard(row)
+                used.add(col)
+                self._absorb(col, vectors[row], durations[valid[row]])
+                mapping[local_labels[valid[row]]] = self.labels[col]
+
+        for row in sorted(unmatched):
+            label = local_labels[valid[row]]
+            if len(self.labels) < self.max_speakers:
+                mapping[label] = self._add(vectors[row], durations[valid[row]])
+            else:
+                # Out of speaker slots: fall back to the closest existing speaker
+                col = int(np.argmax(_normalize(self._centroids) @ vectors[row]))
+                self._absorb(col, vectors[row], durations[valid[row]])
+                mapping[label] = self.labels[col]
+        return mapping
+
+    def _add(self, vector: np.ndarray, weight: float) -> str:
+        label = self.label_format.format(len(self.labels))
+        if self._centroids is None:
+            self._centroids = vector[np.newaxis, :].copy()
+        else:
+            self._centroids = np.vstack([self._centroids, vector])
+        self._weights = np.append(self._weights, min(weight, self.max_weight))
+        self.labels.append(label)
+        return label
+
+    def _absorb(self, col: int, vector: np.ndarray, weight: float) -> None:
+        total = self._weights[col] + weight
+        self._centroids[col] = (self._centroids[col] * self._weights[col] + vector * weight) / total
+        self._weights[col] = min(total, self.max_weight)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import numpy as np
+
+
+class StageStats:
+    """Rolling latency statistics for one pipeline stage"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.count = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self._samples.append(seconds)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64) * 1000
+            count = self.count
+        if len(samples) == 0:
+            return {"count": count}
+        return {
+            "count": count,
+            "mean_ms": float(samples.mean()),
+            "p50_ms": float(np.percentile(samples, 50)),
+            "p95_ms": float(np.percentile(samples, 95)),
+            "max_ms": float(samples.max()),
+        }
+
+    def __str__(self) -> str:
+        summary = self.summary()
+        if "mean_ms" not in summary:
+            return f"{self.name}: no samples"
+        return (f"{self.name}: n={summary['count']} mean={summary['mean_ms']:.0f}ms "
+                f"p50={summary['p50_ms']:.0f}ms p95={summary['p95_ms']:.0f}ms")
@@ -0,0 +1,236 @@
+import collections
+import importlib.machinery
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+from logger import debug_logger, info_logger, warning_logger, error_logger
+from pool_worker import worker_main
+from utils.stage_stats import StageStats
+
+_start_lock = threading.Lock()
+
+
+def _start_without_main(process) -> None:
+    """Start a process without re-running the parent's __main__ module in it.
+
+    spawn and forkserver children re-import __main__ (as __mp_main__) so
+    objects defined there can be unpickled; for main.py that builds a second
+    app in every worker. Workers only need pool_worker, and multiprocessing
+    leaves __main__ alone when its spec is named "__main__".
+    """
+    main_module = sys.modules["__main__"]
+    with _start_lock:
+        spec = getattr(main_module, "__spec__", None)
+        main_module.__spec__ = importlib.machinery.ModuleSpec("__main__", None)
+        try:
+            process.start()
+        finally:
+            main_module.__spec__ = spec
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+
+class WorkerPool:
+    """Keeps warm worker processes ready to run tool scripts.
+
+    Each worker imports the preload modules before it is needed, then runs
+    one script as __main__ and exits, so scripts stay isolated from each
+    other while skipping interpreter start-up and heavy imports. On POSIX the
+    workers come from a forkserver that has already imported pool_worker and
+    the preload modules, which makes replacing a used worker cheap. Workers
+    never import the app's main module.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_concurrent: int = 4,
+        preload: Sequence[str] = (),
+        timeout_s: float = 60.0,
+        memory_limit_mb: Optional[int] = None
+    ):
+        self.size = size
+        self.max_concurrent = max_concurrent
+        self.preload = list(preload)
+        self.timeout_s = timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self.cwd = os.getcwd()
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._ctx = multiprocessing.get_context("forkserver")
+            self._ctx.set_forkserver_preload(["pool_worker", *self.preload])
+        else:
+            self._ctx = multiprocessing.get_context("spawn")
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._replenishing = False
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cold_starts = 0
+        self.wait_stats = StageStats("queue_wait")
+        self.run_stats = StageStats("run")
+
+    def start(self) -> None:
+        """Fill the idle pool in the background"""
+        self._replenish_async()
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(child_conn, self.preload, self.memory_limit_mb, self.cwd),
+            daemon=True
+        )
+        _start_without_main(process)
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _replenish(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if len(self._idle) >= self.size:
+                        return
+                worker = self._spawn()
+                # Wait until the preload imports are done before offering it
+                if worker.conn.poll(120) and worker.conn.recv()[0] == "ready":
+                    with self._lock:
+                        self._idle.append(worker)
+                else:
+                    warning_logger.warning("Worker failed to start, discarding it")
+                    worker.process.kill()
+                    return
+        except Exception as e:
+            error_logger.error(f"Failed to start worker: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._replenishing = False
+
+    def _replenish_async(self) -> None:
+        with self._lock:
+            if self._replenishing:
+                return
+            self._replenishing = True
+        threading.Thread(target=self._replenish, name="worker-pool-replenish", daemon=True).start()
+
+    def _take_worker(self) -> _Worker:
+        while True:
+            with self._lock:
+                worker = self._idle.popleft() if self._idle else None
+            if worker is None:
+                break
+            if worker.process.is_alive():
+                self._replenish_async()
+                return worker
+        # Pool is empty: start one on demand
+        self.cold_starts += 1
+        worker = self._spawn()
+        if not worker.conn.poll(120) or worker.conn.recv()[0] != "ready":
+            worker.process.kill()
+            raise RuntimeError("Worker failed to start")
+        self._replenish_async()
+        return worker
+
+    def run(self, script: str, timeout_s: Optional[float] = None) -> Iterator[Tuple[str, Any]]:
+        """Run a script in a warm worker, yielding output as it arrives.
+
+        Yields ("stdout" | "stderr", text) tuples, then one ("exit", code)
+        tuple. A timeout kills the worker and yields ("exit", "timeout").
+        """
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        self.wait_stats.record(time.perf_counter() - queued_at)
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout_s
+        worker = None
+        exit_code: Any = None
+        try:
+            worker = self._take_worker()
+            debug_logger.debug("Running %s in worker %s", script, worker.process.pid)
+            worker.conn.send(("run", script))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    exit_code = "timeout"
+                    warning_logger.warning(f"Script {script} timed out after {timeout_s}s")
+                    yield ("exit", exit_code)
+                    return
+                if not worker.conn.poll(min(remaining, 1.0)):
+                    if not worker.process.is_alive() and not worker.conn.poll():
+                        exit_code = worker.process.exitcode
+                        yield ("stderr", f"Worker exited unexpectedly (code {exit_code})\n")
+                        yield ("exit", exit_code)
+                        return
+                    continue
+                try:
+                    kind, payload = worker.conn.recv()
+                except EOFError:
+                    exit_code = worker.process.exitcode
+                    yield ("exit", exit_code)
+                    return
+                if kind == "exit":
+                    exit_code = payload
+                    yield (kind, payload)
+                    return
+                yield (kind, payload)
+        finally:
+            if worker is not None:
+                if worker.process.is_alive() and exit_code != 0:
+                    worker.process.kill()
+                worker.process.join(timeout=1)
+                worker.conn.close()
+            self.run_stats.record(time.perf_counter() - started)
+            with self._lock:
+                self.active -= 1
+                if exit_code == 0:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                    if exit_code == "timeout":
+                        self.timeouts += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "idle_workers": len(self._idle),
+                "pool_size": self.size,
+                "max_concurrent": self.max_concurrent,
+                "waiting": self.waiting,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "cold_starts": self.cold_starts,
+                "queue_wait": self.wait_stats.summary(),
+                "run": self.run_stats.summary(),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = list(self._idle)
+            self._idle.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker.process.join(timeout=1)
+        info_logger.info("Worker pool shut down")
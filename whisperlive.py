@@ -12,6 +12,13 @@ import sys
 import warnings
 import dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "project"))
+from utils.ring_buffer import RingBuffer
+from utils.stage_stats import StageStats
+from utils.speaker_assignment import dominant_speakers, turns_from_annotation
+from utils.speaker_tracker import SpeakerTracker
+from utils.audio_processing import trim_silence
+
 dotenv.load_dotenv(".env")  # load .env file 
 
 # --- Configuration ---
@@ -43,15 +50,22 @@ if not HF_TOKEN:
 CHUNK_DURATION_S = 5       # Process audio in X-second chunks
 SAMPLE_RATE = 16000        # Whisper standard sample rate
 CHUNK_SIZE = int(SAMPLE_RATE * CHUNK_DURATION_S) # Samples per chunk
-BUFFER_DURATION_S = CHUNK_DURATION_S # Size of the buffer for processing
-BUFFER_SIZE = int(SAMPLE_RATE * BUFFER_DURATION_S)
+HOP_DURATION_S = CHUNK_DURATION_S  # Seconds between window starts; less than CHUNK_DURATION_S gives overlap
+HOP_SIZE = int(SAMPLE_RATE * HOP_DURATION_S)
+RING_DURATION_S = 30       # Capture headroom before unprocessed audio is dropped
+RING_SIZE = int(SAMPLE_RATE * RING_DURATION_S)
+STAGE_QUEUE_SIZE = 2       # Chunks that may wait in front of each stage
+# What to give up when a stage falls behind: "drop_oldest", "skip_diarization" or "downshift"
+OVERLOAD_POLICY = "drop_oldest"
+DOWNSHIFT_MODEL_SIZE = "base.en"  # Smaller Whisper model used by the "downshift" policy
+STATS_EVERY_N_CHUNKS = 12  # Print per-stage latency stats this often
+SPEAKER_MATCH_THRESHOLD = 0.5  # Min cosine similarity to reuse a known speaker across chunks
+TRIM_SILENCE = True        # Transcribe only the voiced parts of each chunk; silent chunks are skipped
 FORMAT = pyaudio.paInt16   # Audio format
 CHANNELS = 1               # Mono audio
 
 # --- Global Variables ---
-audio_buffer = np.array([], dtype=np.int16)
-buffer_lock = threading.Lock()
-data_queue = queue.Queue()
+audio_ring = RingBuffer(RING_SIZE, CHUNK_SIZE, hop=HOP_SIZE, dtype=np.int16)
 running = True
 
 # --- Helper Functions ---
@@ -69,88 +83,250 @@ def find_device_index(p, name_part):
 
 def audio_callback(in_data, frame_count, time_info, status):
     """Callback function for PyAudio stream."""
-    global audio_buffer
-    new_data = np.frombuffer(in_data, dtype=np.int16)
-    with buffer_lock:
-        audio_buffer = np.append(audio_buffer, new_data)
-        # Keep buffer size manageable, discard oldest if too large
-        # A larger overlap might slightly improve context but increases memory
-        if len(audio_buffer) > BUFFER_SIZE * 2: # Keep a bit more than needed
-             audio_buffer = audio_buffer[-BUFFER_SIZE:] # Keep the last buffer's worth
-
-        # Check if we have enough data to process
-        if len(audio_buffer) >= BUFFER_SIZE:
-            # Put a copy of the buffer onto the queue for processing
-            data_queue.put(audio_buffer.copy())
-            # Clear the buffer after copying
-            audio_buffer = np.array([], dtype=np.int16)
-
+    # Copy straight into the preallocated ring; nothing is allocated on the audio thread
+    audio_ring.write(np.frombuffer(in_data, dtype=np.int16))
     return (in_data, pyaudio.paContinue)
 
-def process_audio_chunk(whisper_model, diarize_pipeline, audio_chunk_np):
-    """Transcribes and diarizes a single audio chunk."""
-    try:
-        # Convert to float32 for models
-        audio_float32 = audio_chunk_np.astype(np.float32) / 32768.0
-
-        # 1. Diarization
-        #    Need to reshape for pyannote [1, num_samples]
-        audio_for_diarize = torch.from_numpy(audio_float32).unsqueeze(0)
-        diarization = diarize_pipeline({"waveform": audio_for_diarize, "sample_rate": SAMPLE_RATE})
-
-        # 2. Transcription
-        segments, info = whisper_model.transcribe(
-            audio_float32,
-            beam_size=5,
-            language="en", # Assuming English for .en models, otherwise detect
-            # word_timestamps=True # Enable if you need word-level timestamps
-        )
-
-        # 3. Combine results (simple approach: assign speaker based on max overlap)
-        print("-" * 30)
-        for segment in segments:
-            start_time = segment.start
-            end_time = segment.end
-            text = segment.text.strip()
-
-            if not text:
+def diarize_chunk(diarize_pipeline, audio_float32):
+    """Runs pyannote diarization on a float32 chunk.
+
+    Returns the annotation and one speaker embedding per label, in the
+    order of annotation.labels().
+    """
+    # Need to reshape for pyannote [1, num_samples]
+    audio_for_diarize = torch.from_numpy(audio_float32).unsqueeze(0)
+    return diarize_pipeline({"waveform": audio_for_diarize, "sample_rate": SAMPLE_RATE},
+                            return_embeddings=True)
+
+def track_speakers(tracker, diarization, embeddings):
+    """Renames a chunk's local speaker labels to labels that are stable across chunks."""
+    labels = diarization.labels()
+    if not labels:
+        return diarization
+    durations = [diarization.label_duration(label) for label in labels]
+    mapping = tracker.update(labels, embeddings[:len(labels)], durations)
+    return diarization.rename_labels(mapping=mapping)
+
+def transcribe_chunk(whisper_model, audio_float32):
+    """Transcribes a float32 chunk and returns the finished segments."""
+    segments, info = whisper_model.transcribe(
+        audio_float32,
+        beam_size=5,
+        language="en", # Assuming English for .en models, otherwise detect
+        # word_timestamps=True # Enable if you need word-level timestamps
+    )
+    # faster-whisper decodes lazily, so consume the generator inside this stage
+    return list(segments)
+
+def print_chunk(segments, diarization, time_map=None):
+    """Combines transcription and diarization results and prints them.
+
+    Segment times are relative to the trimmed audio when time_map is given
+    and are mapped back to chunk time first.
+    """
+    segments = [segment for segment in segments if segment.text.strip()]
+    starts = [s.start for s in segments]
+    ends = [s.end for s in segments]
+    if time_map is not None:
+        starts = time_map.to_original(starts)
+        ends = time_map.to_original(ends, is_end=True)
+    # Assign each segment the speaker with the largest overlap, in one vectorized pass
+    turns = turns_from_annotation(diarization) if diarization is not None else ([], [], [])
+    speakers = dominant_speakers(starts, ends, turns)
+
+    print("-" * 30)
+    for segment, start, end, speaker in zip(segments, starts, ends, speakers):
+        print(f"[{speaker}] ({start:.2f}s -> {end:.2f}s): {segment.text.strip()}")
+
+class Chunk:
+    """A window of audio moving through the pipeline stages."""
+    def __init__(self, chunk_id, audio_float32, captured_at):
+        self.id = chunk_id
+        self.audio = audio_float32
+        # What the transcription stage sees: the voiced audio and its map back to chunk time
+        self.speech = audio_float32
+        self.time_map = None
+        self.captured_at = captured_at
+        self.diarize = True
+        self.dropped = False
+        self.segments = []
+        self.diarization = None
+        self.transcribed = threading.Event()
+        self.diarized = threading.Event()
+
+    def drop(self):
+        self.dropped = True
+        self.transcribed.set()
+        self.diarized.set()
+
+class StagedPipeline:
+    """Runs transcription and diarization of each chunk concurrently.
+
+    Chunks go through bounded per-stage queues to the two stage threads,
+    and a merge thread prints the results in capture order. When a stage
+    queue is full, OVERLOAD_POLICY decides what to give up to keep up with
+    real time.
+    """
+    def __init__(self, whisper_model, diarize_pipeline):
+        self.whisper_model = whisper_model
+        self.diarize_pipeline = diarize_pipeline
+        self.transcribe_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+        self.diarize_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+        # Large enough for every chunk that can be queued or in flight
+        self.merge_queue = queue.Queue(maxsize=2 * STAGE_QUEUE_SIZE + 2)
+        self.stats = {name: StageStats(name) for name in ("transcribe", "diarize", "merge", "end_to_end")}
+        self.dropped_chunks = 0
+        self.skipped_diarizations = 0
+        self.silent_chunks = 0
+        self.downshifted = False
+        self.speaker_tracker = SpeakerTracker(threshold=SPEAKER_MATCH_THRESHOLD)
+        self._next_id = 0
+        self._threads = [
+            threading.Thread(target=self._transcribe_worker, name="transcribe", daemon=True),
+            threading.Thread(target=self._diarize_worker, name="diarize", daemon=True),
+            threading.Thread(target=self._merge_worker, name="merge", daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        # None is the shutdown sentinel for every stage
+        self.transcribe_queue.put(None)
+        self.diarize_queue.put(None)
+        self.merge_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, audio_float32, captured_at):
+        chunk = Chunk(self._next_id, audio_float32, captured_at)
+        self._next_id += 1
+
+        if TRIM_SILENCE:
+            chunk.speech, chunk.time_map = trim_silence(audio_float32, SAMPLE_RATE)
+            if len(chunk.speech) == 0:
+                self.silent_chunks += 1
+                return
+
+        if self.transcribe_queue.full() or self.diarize_queue.full():
+            self._handle_overload(chunk)
+
+        if not chunk.diarize:
+            chunk.diarized.set()
+        self.merge_queue.put(chunk)
+        self.transcribe_queue.put(chunk)
+        if chunk.diarize:
+            self.diarize_queue.put(chunk)
+
+    def _handle_overload(self, chunk):
+        if OVERLOAD_POLICY == "skip_diarization" and not self.transcribe_queue.full():
+            chunk.diarize = False
+            self.skipped_diarizations += 1
+            return
+        if OVERLOAD_POLICY == "downshift" and not self.downshifted:
+            self.downshifted = True
+            threading.Thread(target=self._downshift, daemon=True).start()
+        # Otherwise (and while a downshift loads) drop the oldest waiting chunk
+        for stage_queue in (self.transcribe_queue, self.diarize_queue):
+            if stage_queue.full():
+                try:
+                    oldest = stage_queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if oldest is not None and not oldest.dropped:
+                    oldest.drop()
+                    self.dropped_chunks += 1
+
+    def _downshift(self):
+        print(f"Processing is behind real time, switching to Whisper model {DOWNSHIFT_MODEL_SIZE}...")
+        try:
+            self.whisper_model = load_whisper_model(DOWNSHIFT_MODEL_SIZE)
+        except Exception as e:
+            print(f"Error loading downshift model: {e}", file=sys.stderr)
+
+    def _transcribe_worker(self):
+        while True:
+            chunk = self.transcribe_queue.get()
+            if chunk is None:
+                return
+            if chunk.dropped:
                 continue
+            try:
+                with self.stats["transcribe"].time():
+                    chunk.segments = transcribe_chunk(self.whisper_model, chunk.speech)
+            except Exception as e:
+                print(f"Error transcribing chunk {chunk.id}: {e}", file=sys.stderr)
+            finally:
+                chunk.transcribed.set()
+
+    def _diarize_worker(self):
+        while True:
+            chunk = self.diarize_queue.get()
+            if chunk is None:
+                return
+            if chunk.dropped:
+                continue
+            try:
+                with self.stats["diarize"].time():
+                    chunk.diarization = diarize_chunk(self.diarize_pipeline, chunk.audio)
+            except Exception as e:
+                print(f"Error diarizing chunk {chunk.id}: {e}", file=sys.stderr)
+            finally:
+                chunk.diarized.set()
+
+    def _merge_worker(self):
+        while True:
+            chunk = self.merge_queue.get()
+            if chunk is None:
+                return
+            chunk.transcribed.wait()
+            chunk.diarized.wait()
+            if chunk.dropped:
+                continue
+            try:
+                with self.stats["merge"].time():
+                    diarization = None
+                    if chunk.diarization is not None:
+                        # Runs in capture order, so the tracker sees chunks sequentially
+                        diarization = track_speakers(self.speaker_tracker, *chunk.diarization)
+                    print_chunk(chunk.segments, diarization, chunk.time_map)
+            except Exception as e:
+                print(f"Error processing chunk {chunk.id}: {e}", file=sys.stderr)
+            self.stats["end_to_end"].record(time.monotonic() - chunk.captured_at)
+            if chunk.id and chunk.id % STATS_EVERY_N_CHUNKS == 0:
+                self.print_stats()
+
+    def print_stats(self):
+        print(" | ".join(str(stat) for stat in self.stats.values()))
+        print(f"dropped chunks: {self.dropped_chunks}, skipped diarizations: {self.skipped_diarizations}, "
+              f"silent chunks: {self.silent_chunks}, "
+              f"ring overruns: {audio_ring.overruns}, known speakers: {len(self.speaker_tracker.labels)}")
+
+def load_whisper_model(model_size):
+    # On CPU split the cores between the two concurrent stages
+    cpu_threads = max(1, (os.cpu_count() or 2) // 2) if DEVICE == "cpu" else 0
+    return WhisperModel(model_size, device=DEVICE, compute_type=COMPUTE_TYPE, cpu_threads=cpu_threads)
+
+def main_processing_loop(pipeline):
+    """Main loop to take windows from the ring buffer and feed the pipeline."""
+    reported_overruns = 0
+    while running or audio_ring.available() >= audio_ring.window_size:
+        try:
+            # Wait up to 1 second for a full window
+            window = audio_ring.read_window(timeout=1)
+            if window is None:
+                continue
+            # Convert to float32 for models; this copy frees the ring slot right away
+            audio_float32 = window.astype(np.float32) / 32768.0
+            audio_ring.advance()
 
-            # Find speaker for this segment
-            segment_speakers = []
-            for turn, _, speaker in diarization.itertracks(yield_label=True):
-                # Check for overlap between transcription segment and diarization turn
-                overlap_start = max(start_time, turn.start)
-                overlap_end = min(end_time, turn.end)
-                overlap_duration = overlap_end - overlap_start
-
-                if overlap_duration > 0:
-                    segment_speakers.append({"speaker": speaker, "duration": overlap_duration})
-
-            # Assign the speaker with the maximum overlap duration
-            if segment_speakers:
-                dominant_speaker = max(segment_speakers, key=lambda x: x['duration'])['speaker']
-            else:
-                dominant_speaker = "UNKNOWN" # Handle cases with no speaker overlap
-
-            print(f"[{dominant_speaker}] ({segment.start:.2f}s -> {segment.end:.2f}s): {text}")
-
-    except Exception as e:
-        print(f"Error processing chunk: {e}", file=sys.stderr)
+            if audio_ring.overruns > reported_overruns:
+                reported_overruns = audio_ring.overruns
+                print(f"Warning: processing fell behind, dropped {audio_ring.dropped_samples / SAMPLE_RATE:.1f}s "
+                      f"of audio so far ({audio_ring.overruns} overruns)", file=sys.stderr)
 
-def main_processing_loop(whisper_model, diarize_pipeline):
-    """Main loop to fetch data from queue and process it."""
-    while running or not data_queue.empty():
-        try:
-            # Get data from the queue, wait up to 1 second
-            audio_chunk = data_queue.get(timeout=1)
-            process_audio_chunk(whisper_model, diarize_pipeline, audio_chunk)
-            data_queue.task_done() # Mark task as done
-        except queue.Empty:
-            # If the queue is empty and we are no longer running, break
-            if not running:
-                break
-            continue # Continue waiting if running
+            pipeline.submit(audio_float32, time.monotonic())
         except Exception as e:
             print(f"Error in processing loop: {e}", file=sys.stderr)
             # Optionally add a small sleep to prevent tight error loops
@@ -181,7 +357,7 @@ if __name__ == "__main__":
     # Load Faster Whisper model
     print(f"Loading Whisper model: {MODEL_SIZE} on {DEVICE} ({COMPUTE_TYPE})...")
     try:
-        whisper = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
+        whisper = load_whisper_model(MODEL_SIZE)
         print("Whisper model loaded.")
     except Exception as e:
         print(f"Error loading Whisper model: {e}", file=sys.stderr)
@@ -206,6 +382,9 @@ if __name__ == "__main__":
         # Send pipeline to GPU if available
         if DEVICE == "cuda":
             diarization_pipeline.to(torch.device("cuda"))
+        else:
+            # Leave the other half of the cores to the transcription stage
+            torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
         print("Pyannote pipeline loaded.")
     except Exception as e:
         print(f"Error loading Pyannote pipeline: {e}", file=sys.stderr)
@@ -226,8 +405,10 @@ if __name__ == "__main__":
     print("Starting audio stream... Press Ctrl+C to stop.")
     stream.start_stream()
 
-    # Start the processing thread
-    processing_thread = threading.Thread(target=main_processing_loop, args=(whisper, diarization_pipeline))
+    # Start the pipeline stages and the thread feeding them
+    pipeline = StagedPipeline(whisper, diarization_pipeline)
+    pipeline.start()
+    processing_thread = threading.Thread(target=main_processing_loop, args=(pipeline,))
     processing_thread.start()
 
     try:
@@ -241,9 +422,11 @@ if __name__ == "__main__":
         processing_thread.join(timeout=CHUNK_DURATION_S + 2) # Wait a bit longer than chunk duration
         if processing_thread.is_alive():
              print("Warning: Processing thread did not finish gracefully.")
+        pipeline.stop(timeout=CHUNK_DURATION_S + 2)
+        pipeline.print_stats()
 
         # Stop and close the stream
         stream.stop_stream()
         stream.close()
         p.terminate()
-        print("Audio stream stopped.")
\ No newline at end of file
+        print(f"Audio stream stopped. Ring buffer stats: {audio_ring.stats()}")
\ No newline at end of file